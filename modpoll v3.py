@@ -1,14 +1,24 @@
-import customtkinter as ctk
+import time
+# Captured before the remaining imports so the startup trace covers module load too
+_STARTUP_T0 = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, font as tkfont
-import serial.tools.list_ports
 import subprocess
 import threading
 import os
+import sys
 import queue
-import webbrowser  # For opening URLs
-import winreg  # For registry access
+import io
 import re  # For regex matching
+import json
+import struct
+import math
+import heapq
+import bisect
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 
 import shlex  # For parsing command line arguments
 import datetime
@@ -17,24 +27,2689 @@ import datetime
 # Avoid embedding "download an exe from the internet" logic in the GUI binary.
 # That pattern is a common trigger for AV/ML false positives.
 #
+# Heavy or platform-specific modules (customtkinter, pySerial, winreg, webbrowser)
+# are imported on first use so startup only pays for what the first frame needs.
+ctk = None
+
+# Startup budget (script start -> main window mapped), checked by --startup-trace.
+# Measured against a cold PyInstaller build; keep new startup work out of this path.
+STARTUP_BUDGET_S = 1.5
+
+# Precompiled patterns used on hot paths (parsing every modpoll output line)
+_DATA_LINE_RE = re.compile(r'^\[\s*(\d+)\s*\]\s*:')
+_COM_PORT_RE = re.compile(r'COM\d+')
+_IPV4_RE = re.compile(r'[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}')
+_TRAILING_DIGITS_RE = re.compile(r"(\d+)$")
+_DIGIT_RUN_RE = re.compile(r"(\d+)")
+
+
+# Per-user settings (small JSON file; caches that let later launches skip slow work)
+SETTINGS_DIR = os.path.join(os.environ.get("APPDATA") or os.path.expanduser("~"), "ModPollingTool")
+SETTINGS_PATH = os.path.join(SETTINGS_DIR, "settings.json")
+
+
+def load_settings():
+    """Read the settings file; a missing or corrupt file yields an empty dict."""
+    try:
+        with open(SETTINGS_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def update_settings(**values):
+    """Merge values into the settings file (atomic replace; best-effort)."""
+    try:
+        settings = load_settings()
+        settings.update(values)
+        os.makedirs(SETTINGS_DIR, exist_ok=True)
+        tmp_path = SETTINGS_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(settings, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, SETTINGS_PATH)
+    except Exception:
+        pass
+
+
+# Plant database queried by the Units tab; blank-password users tried in this order
+MYSQL_HOST = "127.0.0.1"
+MYSQL_UNITS_USERS = ("iwmac", "root")
+# mysql client errors that mean the server was not reached (as opposed to a refused login)
+_MYSQL_CONNECT_ERROR_RE = re.compile(r"\bERROR (2002|2003|2005|2006|2013)\b")
+
+
+def is_mysql_connect_error(stderr_text):
+    """True if mysql's stderr says the server could not be reached; other credentials won't help."""
+    return bool(_MYSQL_CONNECT_ERROR_RE.search(stderr_text or ""))
+
+
+def font_directories_stamp():
+    """Cheap fingerprint of the installed fonts (font directory mtimes; no enumeration)."""
+    if os.name == "nt":
+        dirs = [
+            os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts"),
+            os.path.join(os.environ.get("LOCALAPPDATA", ""), "Microsoft", "Windows", "Fonts"),
+        ]
+    else:
+        dirs = ["/usr/share/fonts", "/usr/local/share/fonts", os.path.expanduser("~/.fonts"),
+                os.path.expanduser("~/.local/share/fonts"), "/Library/Fonts", os.path.expanduser("~/Library/Fonts")]
+    stamp = []
+    for d in dirs:
+        try:
+            stamp.append(int(os.stat(d).st_mtime))
+        except OSError:
+            stamp.append(0)
+    return stamp
+
+
+def load_gui_toolkit():
+    """Import and configure CustomTkinter on first use (headless modes never load it)."""
+    global ctk
+    if ctk is not None:
+        return ctk
+
+    import customtkinter
+
+    # Set CustomTkinter appearance and smooth animations
+    customtkinter.set_appearance_mode("dark")  # Modes: "System" (default), "Dark", "Light"
+    customtkinter.set_default_color_theme("blue")  # Themes: "blue" (default), "green", "dark-blue"
+
+    # Enable smooth animations - set widget scaling for better performance
+    customtkinter.set_widget_scaling(1.0)  # Perfect scaling for smooth animations
+
+    # Deactivate automatic dpi awareness for smoother animations (Windows-specific)
+    try:
+        customtkinter.deactivate_automatic_dpi_awareness()
+    except:
+        pass  # Not critical if it fails
+
+    ctk = customtkinter
+    return ctk
+
+
+def hidden_window_popen_kwargs():
+    """Popen keyword arguments that prevent a console window from opening (Windows only)."""
+    if os.name != "nt":
+        return {}
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return {"startupinfo": startupinfo, "creationflags": subprocess.CREATE_NO_WINDOW}
+
+
+def open_url(url):
+    """Open a URL in the default browser (webbrowser is only imported when a link is clicked)."""
+    import webbrowser
+    webbrowser.open(url)
+
+
+# ---------------- Serial Port Discovery ----------------
+
+SERIALCOMM_KEY = r"HARDWARE\DEVICEMAP\SERIALCOMM"
+
+
+def natural_sort_key(text):
+    """Sort key that orders embedded numbers numerically (COM2 before COM10)."""
+    return [int(part) if part.isdigit() else part.lower() for part in _DIGIT_RUN_RE.split(str(text))]
+
+
+def read_registry_com_ports():
+    """
+    Read COM ports from the SERIALCOMM registry key (HKEY_LOCAL_MACHINE).
+    This includes COM ports managed by external tools like NPort Administrator.
+    Raises on registry errors; returns [] on non-Windows platforms.
+    """
+    if os.name != "nt":
+        return []
+    import winreg  # Windows-only; imported on first scan
+    com_ports = []
+    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, SERIALCOMM_KEY) as key:
+        for i in range(0, winreg.QueryInfoKey(key)[1]):
+            com_ports.append(winreg.EnumValue(key, i)[1])
+    return com_ports
+
+
+def list_serial_ports():
+    """
+    Enumerate serial ports from pySerial and the Windows registry.
+    Returns (ports, registry_ok): de-duplicated, naturally sorted port names and
+    whether the registry scan succeeded. Safe to call from a worker thread.
+    """
+    try:
+        from serial.tools import list_ports
+        ports = {port.device for port in list_ports.comports()}
+    except ImportError:
+        # pySerial not installed: registry scan (or /dev scan, or manual entry) still works
+        ports = set()
+        if os.name != "nt":
+            import glob
+            for pattern in ("/dev/ttyUSB*", "/dev/ttyACM*", "/dev/ttyRS485*", "/dev/ttyS[0-9]*"):
+                ports.update(glob.glob(pattern))
+
+    registry_ok = True
+    try:
+        ports.update(read_registry_com_ports())
+    except Exception:
+        registry_ok = False
+    return sorted(ports, key=natural_sort_key), registry_ok
+
+
+class SerialPortWatcher:
+    """
+    Background watcher that reports serial ports only when devices change.
+
+    - Windows: waits on a registry change notification for the SERIALCOMM key
+      (USB-RS485 adapters and NPort virtual ports register there).
+    - POSIX: stats /dev and /dev/serial/by-id (udev updates them on hot-plug)
+      and re-enumerates only when their mtimes change.
+    on_change(ports) is called from the watcher thread.
+    """
+
+    def __init__(self, on_change, poll_interval_s=1.0):
+        self.on_change = on_change
+        self.poll_interval_s = poll_interval_s
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_ports = None
+
+    def start(self, initial_ports=None):
+        if self._thread is not None:
+            return
+        self._last_ports = list(initial_ports) if initial_ports is not None else None
+        self._thread = threading.Thread(target=self._run, name="serial-port-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _report_if_changed(self):
+        ports, _registry_ok = list_serial_ports()
+        if ports != self._last_ports:
+            self._last_ports = ports
+            try:
+                self.on_change(ports)
+            except Exception:
+                pass
+
+    def _run(self):
+        try:
+            if os.name == "nt" and self._run_registry_notifications():
+                return
+        except Exception:
+            pass
+        self._run_stat_polling()
+
+    def _run_registry_notifications(self):
+        """Block on RegNotifyChangeKeyValue; returns False if notifications are unavailable."""
+        import ctypes
+        import winreg
+        from ctypes import wintypes
+
+        advapi32 = ctypes.WinDLL("advapi32")
+        kernel32 = ctypes.WinDLL("kernel32")
+        kernel32.CreateEventW.restype = wintypes.HANDLE
+        REG_NOTIFY_CHANGE_NAME = 0x1
+        REG_NOTIFY_CHANGE_LAST_SET = 0x4
+        WAIT_OBJECT_0 = 0
+
+        try:
+            key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, SERIALCOMM_KEY, 0, winreg.KEY_NOTIFY | winreg.KEY_READ)
+        except OSError:
+            return False
+        event = kernel32.CreateEventW(None, False, False, None)
+        if not event:
+            key.Close()
+            return False
+        try:
+            while not self._stop.is_set():
+                rc = advapi32.RegNotifyChangeKeyValue(
+                    wintypes.HKEY(key.handle), False,
+                    REG_NOTIFY_CHANGE_NAME | REG_NOTIFY_CHANGE_LAST_SET,
+                    wintypes.HANDLE(event), True,
+                )
+                if rc != 0:
+                    return False
+                # Wake up periodically so stop() is honored
+                while not self._stop.is_set():
+                    if kernel32.WaitForSingleObject(wintypes.HANDLE(event), 1000) == WAIT_OBJECT_0:
+                        break
+                if self._stop.is_set():
+                    break
+                # Devices often register in bursts; let the key settle before rescanning
+                self._stop.wait(0.3)
+                self._report_if_changed()
+            return True
+        finally:
+            kernel32.CloseHandle(wintypes.HANDLE(event))
+            key.Close()
+
+    def _run_stat_polling(self):
+        watch_paths = ["/dev", "/dev/serial/by-id"] if os.name != "nt" else []
+
+        def stamp():
+            result = []
+            for path in watch_paths:
+                try:
+                    result.append(os.stat(path).st_mtime_ns)
+                except OSError:
+                    result.append(0)
+            return result
+
+        last = stamp()
+        while not self._stop.wait(self.poll_interval_s if watch_paths else 5.0):
+            current = stamp()
+            # Without anything cheap to watch (registry notifications unavailable), rescan slowly
+            if current != last or not watch_paths:
+                last = current
+                self._report_if_changed()
+
+
+# ---------------- Equipment Presets ----------------
+
+# Built-in presets (serial settings only). External preset files extend/override these
+# and may also carry Modbus defaults (address, start_reference, num_registers,
+# register_type) and register maps.
+BUILTIN_EQUIPMENT_PRESETS = {
+    "ADAM": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "AERMEC": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "AKCC250": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "AKCC350": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "AKCC55": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "AKCC550A": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "AKPC420": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "ANYBUS": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "ATLANTIUM": {"baudrate": "115200", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "AWD3": {"baudrate": "19200", "stop_bits": "2", "data_bits": "8", "parity": "none"},
+    "BELIMO": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "CAREL": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "CIAT2": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "CIRCUTOR": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "CLIMAVENTA": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "CLIVET": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "CORRIGO": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "CORRIGO34": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "CVM10": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "CVM96": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "CVMC": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "DAIKIN": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "none"},  # '0A' treated as 'none'
+    "DIXELL": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "DUPLINE": {"baudrate": "115200", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "EDMK": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "Carlo Gavazzi EM100": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "Carlo Gavazzi EM21": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "Carlo Gavazzi EM210": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "Carlo Gavazzi EM23": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "Carlo Gavazzi EM24": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "Carlo Gavazzi EM24TCP": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "Carlo Gavazzi EM26": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "Carlo Gavazzi EM270": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "Carlo Gavazzi EM330": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "Carlo Gavazzi EM4": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "Carlo Gavazzi EM540": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "EW": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "FLAKTWOODS": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "FLEXIT": {"baudrate": "9600", "stop_bits": "2", "data_bits": "8", "parity": "none"},
+    "GREENCOOL": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "GRFOS": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "HECU": {"baudrate": "19200", "stop_bits": "2", "data_bits": "8", "parity": "none"},
+    "IEM3250": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "INEPRO": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "INTESIS": {"baudrate": "9600", "stop_bits": "2", "data_bits": "8", "parity": "none"},
+    "IR33PLUS": {"baudrate": "19200", "stop_bits": "2", "data_bits": "8", "parity": "none"},
+    "IVPRODUKT": {"baudrate": "9600", "stop_bits": "2", "data_bits": "8", "parity": "none"},
+    "IWT": {"baudrate": "57600", "stop_bits": "2", "data_bits": "8", "parity": "none"},
+    "KAMSTRUP": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "LANDIS": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "LDS": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "LEMMENS": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "LIEBHERR": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "MKD": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "MODBUS": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "NEMO96": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "NETAVENT": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "NOVAGG": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "OJEXHAUST": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "PIIGAB": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "PMGOLD": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "POWERTAG": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "PR100T": {"baudrate": "19200", "stop_bits": "2", "data_bits": "8", "parity": "none"},
+    "QALCOSONIC": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "REGIN": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "REGINRCF": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "SCHNEIDER": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "SLV AHT": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
+    "SOLARLOG": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "SWEGON": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "TROX": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "UH50": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "UNISAB3": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "VENT": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "VIESSMANN": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "WM14": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+    "WTRANS": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
+}
+
+
+class PresetLibrary:
+    """
+    Equipment presets merged from the built-ins and external JSON files.
+
+    Files are read in order, later ones overriding earlier ones per model:
+      1. equipment_presets.json next to the script/executable (bundled library)
+      2. equipment_presets.json in the settings folder (site overrides)
+      3. presets/*.json in the settings folder (vendor libraries)
+
+    File format:
+      {"version": 1, "presets": {"<model>": {"baudrate": "9600", "parity": "none",
+        "data_bits": "8", "stop_bits": "1", "address": "1", "start_reference": "100",
+        "num_registers": "1", "register_type": "3", "register_map": [...]}}}
+
+    has_changed() compares file mtimes/sizes only, so it is cheap enough to poll.
+    """
+
+    FILE_NAME = "equipment_presets.json"
+    STRING_FIELDS = ("baudrate", "parity", "data_bits", "stop_bits",
+                     "address", "start_reference", "num_registers", "register_type")
+
+    def __init__(self, builtin, search_dirs=None):
+        self.builtin = dict(builtin)
+        self.search_dirs = search_dirs
+        self.errors = []
+        self._stamp = None
+
+    def candidate_files(self):
+        """Preset files that currently exist, in load order."""
+        if self.search_dirs is not None:
+            bundled_dirs, user_dir = list(self.search_dirs), None
+        else:
+            bundled_dirs = []
+            for d in (getattr(sys, "_MEIPASS", None),
+                      os.path.dirname(sys.executable) if getattr(sys, "frozen", False) else None,
+                      os.path.dirname(os.path.abspath(__file__))):
+                if d and d not in bundled_dirs:
+                    bundled_dirs.append(d)
+            user_dir = SETTINGS_DIR
+
+        files = [os.path.join(d, self.FILE_NAME) for d in bundled_dirs]
+        if user_dir:
+            files.append(os.path.join(user_dir, self.FILE_NAME))
+            vendor_dir = os.path.join(user_dir, "presets")
+            try:
+                files.extend(sorted(
+                    os.path.join(vendor_dir, name) for name in os.listdir(vendor_dir)
+                    if name.lower().endswith(".json")
+                ))
+            except OSError:
+                pass
+        return [f for f in files if os.path.isfile(f)]
+
+    def _current_stamp(self):
+        stamp = []
+        for path in self.candidate_files():
+            try:
+                st = os.stat(path)
+                stamp.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                pass
+        return stamp
+
+    def has_changed(self):
+        """True if preset files were added, removed or modified since the last load()."""
+        return self._current_stamp() != self._stamp
+
+    def load(self):
+        """Return the merged {model: settings} dict; problems are collected in self.errors."""
+        self.errors = []
+        self._stamp = self._current_stamp()
+        presets = dict(self.builtin)
+        for path, _mtime, _size in self._stamp:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                entries = data.get("presets", {}) if isinstance(data, dict) else None
+                if not isinstance(entries, dict):
+                    raise ValueError('expected an object with a "presets" mapping')
+            except Exception as e:
+                self.errors.append(f"{os.path.basename(path)}: {e}")
+                continue
+            for name, entry in entries.items():
+                if not isinstance(entry, dict):
+                    self.errors.append(f"{os.path.basename(path)}: preset '{name}' is not an object")
+                    continue
+                merged = dict(presets.get(name, {}))
+                for key, value in entry.items():
+                    merged[key] = str(value) if key in self.STRING_FIELDS else value
+                presets[str(name)] = merged
+        return presets
+
+
+# ---------------- Register Map Decoding ----------------
+
+# type -> (registers per value, struct code for a big-endian buffer)
+REGISTER_VALUE_TYPES = {
+    "uint16": (1, "H"),
+    "int16": (1, "h"),
+    "uint32": (2, "I"),
+    "int32": (2, "i"),
+    "float32": (2, "f"),
+    "uint64": (4, "Q"),
+    "int64": (4, "q"),
+    "float64": (4, "d"),
+}
+
+
+class RegisterField:
+    """One decoded value from a register map entry (see CompiledRegisterMap)."""
+    __slots__ = ("ref", "name", "type", "registers", "scale", "offset", "unit", "enum", "decimals")
+
+    def __init__(self, entry):
+        self.ref = int(entry["ref"])
+        self.name = str(entry.get("name") or f"[{self.ref}]")
+        self.type = str(entry.get("type", "uint16")).lower()
+        if self.type not in REGISTER_VALUE_TYPES:
+            raise ValueError(f"unknown register type '{self.type}' at ref {self.ref}")
+        self.registers = REGISTER_VALUE_TYPES[self.type][0]
+        self.scale = float(entry.get("scale", 1))
+        if self.scale == 0:
+            raise ValueError(f"scale must not be 0 at ref {self.ref} (use a negative scale to invert)")
+        self.offset = float(entry.get("offset", 0))
+        self.unit = str(entry.get("unit") or "")
+        enum = entry.get("enum") or {}
+        self.enum = {str(k): str(v) for k, v in enum.items()} if isinstance(enum, dict) else {}
+        decimals = entry.get("decimals")
+        if decimals is None and abs(self.scale) < 1:
+            decimals = max(0, -int(math.floor(math.log10(abs(self.scale)))))
+        self.decimals = None if decimals is None else int(decimals)
+
+    def scaled(self, raw):
+        """Engineering value of a raw decoded number (scale and offset applied)."""
+        return raw * self.scale + self.offset if (self.scale != 1 or self.offset) else raw
+
+    def format(self, raw):
+        """Render a raw decoded number as text (enum label, or scaled value + unit)."""
+        if self.enum:
+            label = self.enum.get(str(raw))
+            if label is not None:
+                return label
+        value = self.scaled(raw)
+        if isinstance(value, float):
+            if math.isnan(value) or math.isinf(value):
+                text = str(value)
+            elif self.decimals is not None:
+                text = f"{value:.{self.decimals}f}"
+            else:
+                text = f"{value:.6g}"
+        else:
+            text = str(value)
+        return f"{text} {self.unit}" if self.unit else text
+
+
+class CompiledRegisterMap:
+    """
+    A preset register map compiled against one polled block (-r start, -c count).
+
+    Decoding a block is two C-level struct calls regardless of the field count:
+    the 16-bit register values are packed once, an itemgetter gathers the bytes of
+    every field in normalized (big-endian word + byte) order, and one precompiled
+    Struct unpacks all fields. Only the final formatting loops per field.
+
+    Entry keys: ref (modpoll reference, as printed in "[ref]: value"), name, type
+    (uint16/int16/uint32/int32/float32/uint64/int64/float64), word_order
+    ("big" = high word first, default; "little" = low word first), byte_order
+    ("big" default; "little" swaps the bytes inside each register), scale,
+    offset, unit, enum ({"raw value": "label"}), decimals.
+    """
+
+    def __init__(self, register_map, start_reference, count):
+        self.start_reference = int(start_reference)
+        self.count = int(count)
+        self.fields = []
+        gather = []
+        codes = []
+        end_reference = self.start_reference + self.count
+        for entry in register_map or []:
+            field = RegisterField(entry)
+            if field.ref < self.start_reference or field.ref + field.registers > end_reference:
+                continue  # Not covered by this poll block
+            base = (field.ref - self.start_reference) * 2
+            words = list(range(field.registers))
+            if str(entry.get("word_order", "big")).lower() == "little":
+                words.reverse()
+            swap_bytes = str(entry.get("byte_order", "big")).lower() == "little"
+            for w in words:
+                hi, lo = base + 2 * w, base + 2 * w + 1
+                gather.extend((lo, hi) if swap_bytes else (hi, lo))
+            codes.append(REGISTER_VALUE_TYPES[field.type][1])
+            self.fields.append(field)
+
+        self._block = struct.Struct(f">{self.count}H")
+        self._fields = struct.Struct(">" + "".join(codes))
+        # itemgetter with a single index returns a scalar; fields always span >= 2 bytes
+        self._gather = itemgetter(*gather) if gather else None
+
+    def __bool__(self):
+        return bool(self.fields)
+
+    def decode(self, values):
+        """
+        Decode one block. `values` maps reference -> 16-bit register value.
+        Returns [(field, raw_value, text)]; fields with missing registers are skipped.
+        """
+        if not self.fields:
+            return []
+        start = self.start_reference
+        block = [values.get(start + i) for i in range(self.count)]
+        missing = None in block
+        if missing:
+            # Decode everything with zeros in the gaps, then drop fields that touched a gap
+            present = [v is not None for v in block]
+            block = [0 if v is None else v for v in block]
+        raw = self._block.pack(*[v & 0xFFFF for v in block])
+        numbers = self._fields.unpack(bytes(self._gather(raw)))
+        results = []
+        for field, num in zip(self.fields, numbers):
+            if missing:
+                i = field.ref - start
+                if not all(present[i:i + field.registers]):
+                    continue
+            results.append((field, num, field.format(num)))
+        return results
+
+
+# ---------------- Scan-List Scheduler ----------------
+
+_SCAN_ENTRY_RE = re.compile(r'^(\d+)\s*:\s*(\d+)\s*@\s*(\d+(?:\.\d*)?|\.\d+)\s*(ms|s)?$', re.IGNORECASE)
+
+
+class ScanBlock:
+    """One -r/-c block of a scan list with its own poll period and timing statistics."""
+
+    __slots__ = ("ref", "count", "period_s", "next_due", "last_start", "runs",
+                 "busy_s", "answered", "answered_s", "late_runs", "skipped", "max_late_s")
+
+    MIN_PERIOD_S = 0.05
+
+    def __init__(self, ref, count, period_s):
+        self.ref = int(ref)
+        self.count = int(count)
+        self.period_s = max(self.MIN_PERIOD_S, float(period_s))
+        self.next_due = 0.0
+        self.last_start = 0.0
+        self.runs = 0
+        self.busy_s = 0.0
+        self.answered = 0  # Runs the slave answered (data or exception response) and their total time
+        self.answered_s = 0.0
+        self.late_runs = 0
+        self.skipped = 0
+        self.max_late_s = 0.0
+
+    @property
+    def label(self):
+        return f"{self.ref}:{self.count}@{self.period_s:g}s"
+
+    @property
+    def average_s(self):
+        return self.busy_s / self.runs if self.runs else 0.0
+
+    def record_answer(self, elapsed_s):
+        """Count a run the slave answered; timeouts stay out of the answered average."""
+        self.answered += 1
+        self.answered_s += max(0.0, elapsed_s)
+
+
+def parse_scan_list(text):
+    """
+    Parse "ref:count@period" entries separated by commas/semicolons, e.g.
+    "100:10@0.2, 200:4@30" or "100:10@200ms". Raises ValueError on bad entries.
+    """
+    blocks = []
+    for entry in re.split(r'[,;\n]+', text or ""):
+        entry = entry.strip()
+        if not entry:
+            continue
+        m = _SCAN_ENTRY_RE.match(entry)
+        if not m:
+            raise ValueError(f"invalid scan entry '{entry}' (expected ref:count@period)")
+        ref, count, period, unit = m.groups()
+        period_s = float(period) / 1000.0 if (unit or "").lower() == "ms" else float(period)
+        if int(count) < 1 or period_s <= 0:
+            raise ValueError(f"invalid scan entry '{entry}' (count and period must be positive)")
+        blocks.append(ScanBlock(ref, count, period_s))
+    return blocks
+
+
+class ScanScheduler:
+    """
+    Earliest-due-first scheduler for scan blocks sharing one bus.
+
+    Blocks sit in a heap keyed by (due time, last start). Blocks run one at a
+    time, so the bus is never shared between overlapping requests. When a block
+    runs late, the periods it missed are skipped: it is rescheduled at the moment it
+    finished, not in the past. This avoids a burst of catch-up polls. Because
+    other overdue blocks keep their older due times, they are served first. So a
+    fast block can never starve a slow one: under overload every block still
+    runs once per sweep. Late starts and skipped periods are counted per block,
+    and `overrun_report()` summarises them.
+    """
+
+    LATE_TOLERANCE_S = 0.05
+    OVERRUN_REPORT_INTERVAL_S = 10.0
+
+    def __init__(self, blocks, now=None):
+        if not blocks:
+            raise ValueError("scan list is empty")
+        now = time.monotonic() if now is None else now
+        self.blocks = list(blocks)
+        self._heap = []
+        self._seq = 0
+        for block in self.blocks:
+            block.next_due = now
+            self._push(block)
+        self._last_report = now
+
+    def _push(self, block):
+        self._seq += 1
+        heapq.heappush(self._heap, (block.next_due, block.last_start, self._seq, block))
+
+    def next_block(self, now=None):
+        """Return (block, wait_s): the block to poll next and how long to wait before starting it."""
+        now = time.monotonic() if now is None else now
+        block = self._heap[0][3]
+        return block, max(0.0, block.next_due - now)
+
+    def complete(self, block, started, finished):
+        """Record a finished poll of `block` (the heap head) and schedule its next run."""
+        heapq.heappop(self._heap)
+        late = started - block.next_due
+        if late > max(self.LATE_TOLERANCE_S, block.period_s * 0.1):
+            block.late_runs += 1
+            block.max_late_s = max(block.max_late_s, late)
+        block.runs += 1
+        block.busy_s += max(0.0, finished - started)
+        block.last_start = started
+        next_due = block.next_due + block.period_s
+        if next_due < finished:
+            missed = int((finished - next_due) // block.period_s) + 1
+            block.skipped += missed
+            next_due = finished
+        block.next_due = next_due
+        self._push(block)
+
+    def skip(self, block, now):
+        """Reschedule `block` (the heap head) without polling it: no run, busy time or overrun is counted."""
+        heapq.heappop(self._heap)
+        block.next_due = max(block.next_due + block.period_s, now)
+        self._push(block)
+
+    def utilization(self):
+        """Requested bus load: sum of average poll duration / period (>1.0 = cannot keep up)."""
+        return sum(b.average_s / b.period_s for b in self.blocks if b.runs)
+
+    def overrun_report(self, now=None):
+        """Return a one-line overrun summary at most every OVERRUN_REPORT_INTERVAL_S, else None."""
+        now = time.monotonic() if now is None else now
+        if now - self._last_report < self.OVERRUN_REPORT_INTERVAL_S:
+            return None
+        self._last_report = now
+        behind = [b for b in self.blocks if b.late_runs or b.skipped]
+        if not behind:
+            return None
+        details = ", ".join(
+            f"{b.label} skipped {b.skipped} (max {b.max_late_s * 1000:.0f} ms late, avg poll {b.average_s * 1000:.0f} ms)"
+            for b in behind
+        )
+        for b in behind:
+            b.late_runs = b.skipped = 0
+            b.max_late_s = 0.0
+        return f"Scan overrun: bus load {self.utilization():.0%} of requested rates; {details}"
+
+
+def scan_block_arguments(arguments, block):
+    """Copy of modpoll `arguments` polling `block` (-r/-c replaced, -1 one-shot appended)."""
+    args = []
+    skip_value = False
+    for arg in arguments:
+        if skip_value:
+            skip_value = False
+            continue
+        if arg in ("-r", "-c"):
+            skip_value = True
+            continue
+        if arg.startswith(("-r", "-c")) and arg[2:].isdigit():
+            continue
+        args.append(arg)
+    args += [f"-r{block.ref}", f"-c{block.count}"]
+    if "-1" not in args:
+        args.append("-1")
+    return args
+
+
+# ---------------- RS-485 Bus Capacity Model ----------------
+
+class BusCapacityModel:
+    """
+    Wire-time model of Modbus RTU read transactions on one serial line.
+
+    A transaction is: request frame + silent gap + device turnaround + response
+    frame + silent gap. The frame sizes follow from the function code implied by
+    -t and the -c count. The character time follows from baud, data, parity and
+    stop bits. `turnaround_s` is the time from request end to response start. When
+    it is measured from a live session, modpoll's start-up (spawn to first output)
+    is subtracted, but opening the port and process exit remain, so it errs long.
+    """
+
+    DEFAULT_TURNAROUND_S = 0.05
+    SATURATION_LOAD = 0.9  # Above this the line has no slack for retries or late devices
+
+    def __init__(self, baudrate, parity="none", stopbits="1", databits="8", turnaround_s=None):
+        self.baudrate = int(baudrate)
+        if self.baudrate <= 0:
+            raise ValueError("baudrate must be positive")
+        self.parity = str(parity or "none").lower()
+        self.stopbits = int(stopbits)
+        self.databits = int(databits)
+        self.turnaround_s = self.DEFAULT_TURNAROUND_S if turnaround_s is None else max(0.0, float(turnaround_s))
+        bits = 1 + self.databits + (0 if self.parity in ("none", "n", "0") else 1) + self.stopbits
+        self.char_s = bits / self.baudrate
+        # Modbus RTU: 3.5 character silent interval, fixed at 1.75 ms above 19200 baud
+        self.gap_s = 3.5 * self.char_s if self.baudrate <= 19200 else 0.00175
+
+    @property
+    def line_label(self):
+        return f"{self.baudrate} {self.databits}{self.parity[:1].upper()}{self.stopbits}"
+
+    @staticmethod
+    def frame_bytes(register_type, count):
+        """(request bytes, response bytes) for one read of `count` values of modpoll type -t."""
+        base, _, variant = str(register_type or "4").strip().lower().partition(":")
+        count = max(1, int(count))
+        if base in ("0", "1"):  # Coils / discrete inputs: 8 bits per byte
+            data = (count + 7) // 8
+        else:
+            # 32-bit types (int, mod = modulo-10000, float) read register pairs; hex is 16-bit
+            data = 2 * count * (2 if variant in ("int", "mod", "float") else 1)
+        # Request: addr, fc, start(2), qty(2), crc(2); response: addr, fc, byte count, data, crc(2)
+        return 8, 5 + data
+
+    def transaction_s(self, register_type, count):
+        """Predicted time one read of `count` values occupies the bus."""
+        request, response = self.frame_bytes(register_type, count)
+        return (request + response) * self.char_s + 2 * self.gap_s + self.turnaround_s
+
+    def cycle_s(self, polls):
+        """Predicted time to poll every (register_type, count) in `polls` once, back to back."""
+        return sum(self.transaction_s(t, c) for t, c in polls)
+
+    def live_report(self, blocks, register_type):
+        """Compare requested scan rates with the model and measured poll times: (message, saturated)."""
+        polled = [b for b in blocks if b.runs]
+        if not polled:
+            return None, False
+        wire_s = {id(b): self.transaction_s(register_type, b.count) - self.turnaround_s for b in polled}
+        requested = sum(self.transaction_s(register_type, b.count) / b.period_s for b in polled)
+        measured = sum(b.average_s / b.period_s for b in polled)
+        avg_poll = sum(b.average_s for b in polled) / len(polled)
+        avg_wire = sum(wire_s.values()) / len(polled)
+        saturated = requested >= self.SATURATION_LOAD or measured >= 1.0
+        message = (
+            f"Bus {self.line_label}: requested rates need {requested:.0%} of the line by the model, "
+            f"{measured:.0%} as measured (avg poll {avg_poll * 1000:.0f} ms, {avg_wire * 1000:.0f} ms on the wire)"
+            + (" - SATURATED" if saturated else "")
+        )
+        return message, saturated
+
+    def measured_turnaround_s(self, blocks, register_type, startup_s=0.0):
+        """
+        Average answered poll time minus wire time and `startup_s` (the per-run
+        modpoll start-up, see OneShotOverhead.startup_s): the device turnaround plus
+        port open/close. Timed-out and skipped polls are left out.
+        """
+        polled = [b for b in blocks if b.answered]
+        if not polled:
+            return None
+        extra = [b.answered_s / b.answered - (self.transaction_s(register_type, b.count) - self.turnaround_s)
+                 for b in polled]
+        return max(0.0, sum(extra) / len(extra) - startup_s)
+
+
+# ---------------- Adaptive Timeouts ----------------
+
+class _TargetTiming:
+    __slots__ = ("samples", "failures", "retry_at", "backoff_s", "widened_s")
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.failures = 0
+        self.retry_at = 0.0
+        self.backoff_s = 0.0
+        self.widened_s = 0.0
+
+
+class AdaptiveTimeoutTracker:
+    """
+    Learns each target's response times and picks the modpoll -o timeout for it.
+
+    Targets are keyed by (port or host, slave address). Once MIN_SAMPLES answers
+    have been seen, the timeout is the PERCENTILE response time times MARGIN plus
+    MARGIN_S. It never goes below the caller's wire-time floor and stays within
+    modpoll's 0.01-10 s range. Samples are whole one-shot run times, which include
+    process start-up, so the learned timeout errs on the long side. A miss on a
+    learned timeout doubles it (up to MAX_S) for the next tries, so a device that
+    got slower is caught; each answer then shrinks the widening by WIDEN_DECAY
+    while its slower samples take over the percentile. After BACKOFF_AFTER
+    consecutive failures a target is skipped for BACKOFF_BASE_S, doubling per
+    further failure up to BACKOFF_MAX_S; one answer clears it.
+    """
+
+    WINDOW = 64
+    MIN_SAMPLES = 5
+    PERCENTILE = 0.95
+    MARGIN = 1.5
+    MARGIN_S = 0.05
+    DEFAULT_S = 1.0  # modpoll's own default
+    MIN_S = 0.01
+    MAX_S = 10.0
+    BACKOFF_AFTER = 3
+    BACKOFF_BASE_S = 2.0
+    BACKOFF_MAX_S = 60.0
+    WIDEN_DECAY = 0.9
+
+    def __init__(self):
+        self._targets = {}
+
+    def _target(self, key):
+        target = self._targets.get(key)
+        if target is None:
+            target = self._targets[key] = _TargetTiming(self.WINDOW)
+        return target
+
+    def timeout_s(self, key, floor_s=0.0):
+        """Request timeout for `key` in seconds (modpoll's default until enough samples)."""
+        target = self._targets.get(key)
+        if target is None or len(target.samples) < self.MIN_SAMPLES:
+            return max(self.DEFAULT_S, floor_s)
+        ordered = sorted(target.samples)
+        high = ordered[min(len(ordered) - 1, int(len(ordered) * self.PERCENTILE))]
+        return min(self.MAX_S, max(self.MIN_S, floor_s, target.widened_s, high * self.MARGIN + self.MARGIN_S))
+
+    def record(self, key, elapsed_s, ok, now=None, timeout_used_s=None):
+        """
+        Record one poll; returns the new backoff in seconds when the target just got
+        backed off, else 0. `timeout_used_s` is the -o the poll ran with; a miss
+        widens it before counting toward the backoff.
+        """
+        now = time.monotonic() if now is None else now
+        target = self._target(key)
+        if ok:
+            target.samples.append(elapsed_s)
+            target.failures = 0
+            target.backoff_s = 0.0
+            target.retry_at = 0.0
+            target.widened_s *= self.WIDEN_DECAY
+            return 0.0
+        if timeout_used_s is not None and len(target.samples) >= self.MIN_SAMPLES:
+            target.widened_s = min(self.MAX_S, max(target.widened_s, 2.0 * timeout_used_s))
+        target.failures += 1
+        if target.failures < self.BACKOFF_AFTER:
+            return 0.0
+        target.backoff_s = min(self.BACKOFF_MAX_S, target.backoff_s * 2 if target.backoff_s else self.BACKOFF_BASE_S)
+        target.retry_at = now + target.backoff_s
+        return target.backoff_s
+
+    def backoff_remaining(self, key, now=None):
+        """Seconds until a backed-off target may be polled again (0 if it may be polled now)."""
+        target = self._targets.get(key)
+        if target is None or not target.retry_at:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(0.0, target.retry_at - now)
+
+
+def has_timeout_argument(arguments):
+    """True if modpoll `arguments` already set -o (the user's timeout wins over the adaptive one)."""
+    return any(arg == "-o" or (arg.startswith("-o") and arg[2:].replace(".", "", 1).isdigit()) for arg in arguments)
+
+
+# ---------------- Pseudo-terminal Streaming ----------------
+
+# ConPTY output carries VT sequences (cursor moves, title, colors); they are not modpoll text
+_VT_ESCAPE_RE = re.compile(r"\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])")
+
+
+def pty_streaming_available():
+    """True if modpoll can run under a pseudo-terminal here: pty on POSIX, ConPTY via pywinpty on Windows."""
+    try:
+        if os.name == "nt":
+            import winpty  # noqa: F401  (optional: pip install pywinpty)
+        else:
+            import pty  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class PtyLineReader:
+    """
+    readline()/close() over the master side of a POSIX pty. When the child exits and
+    the slave side closes, Linux reports EIO instead of EOF; both end the stream.
+    `tap` sees every line (used to capture the session).
+    """
+
+    def __init__(self, fd, tap=None):
+        self._fd = fd
+        self._buffer = bytearray()
+        self._eof = False
+        self._tap = tap
+
+    def readline(self):
+        while True:
+            newline = self._buffer.find(b"\n")
+            if newline >= 0:
+                raw = bytes(self._buffer[:newline + 1])
+                del self._buffer[:newline + 1]
+            elif self._eof:
+                raw = bytes(self._buffer)
+                self._buffer.clear()
+                if not raw:
+                    return ""
+            else:
+                try:
+                    chunk = os.read(self._fd, 65536)
+                except OSError:
+                    chunk = b""
+                if chunk:
+                    self._buffer += chunk
+                else:
+                    self._eof = True
+                continue
+            line = raw.decode("utf-8", "replace").replace("\r\n", "\n")
+            if self._tap is not None:
+                self._tap(line)
+            return line
+
+    def close(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+
+class _WinPtyProcess:
+    """pywinpty's PtyProcess behind the Popen calls stop_polling() makes, plus readline()/close() for read_stream()."""
+
+    def __init__(self, cmd, env, tap=None):
+        from winpty import PtyProcess
+
+        self._proc = PtyProcess.spawn(subprocess.list2cmdline(cmd), env=env, dimensions=(50, 250))
+        self._tap = tap
+
+    def poll(self):
+        return None if self._proc.isalive() else self._proc.exitstatus
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._proc.isalive():
+            if deadline is not None and time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired("modpoll", timeout)
+            time.sleep(0.05)
+        return self._proc.exitstatus
+
+    def terminate(self):
+        self._proc.terminate()
+
+    def kill(self):
+        self._proc.terminate(force=True)
+
+    def readline(self):
+        try:
+            line = self._proc.readline()
+        except EOFError:
+            return ""
+        line = _VT_ESCAPE_RE.sub("", line).replace("\r\n", "\n") or "\n"
+        if self._tap is not None:
+            self._tap(line)
+        return line
+
+    def close(self):
+        try:
+            self._proc.close()
+        except Exception:
+            pass
+
+
+def spawn_pty_process(cmd, env=None, tap=None):
+    """
+    Start `cmd` with stdout/stderr on a pseudo-terminal, so the C runtime line-buffers
+    its output as it would in a console. Returns (process, line stream); the process has
+    poll/wait/terminate/kill, the stream readline/close.
+    """
+    if os.name == "nt":
+        proc = _WinPtyProcess(cmd, env, tap)
+        return proc, proc
+    import pty
+
+    master_fd, slave_fd = pty.openpty()
+    try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=slave_fd, stderr=slave_fd, env=env,
+                                close_fds=True, start_new_session=True)
+    except Exception:
+        os.close(master_fd)
+        raise
+    finally:
+        os.close(slave_fd)
+    return proc, PtyLineReader(master_fd, tap)
+
+
+# ---------------- One-shot Runs ----------------
+
+def read_process_output(proc, timeout_s):
+    """
+    Read a run's merged stdout to EOF. Returns (output, seconds to the first byte or None,
+    timed out). The process is killed if it is still running after `timeout_s`.
+    """
+    expired = threading.Event()
+
+    def _expire():
+        expired.set()
+        try:
+            proc.kill()
+        except Exception:
+            pass
+
+    timer = threading.Timer(timeout_s, _expire)
+    timer.daemon = True
+    t0 = time.perf_counter()
+    timer.start()
+    try:
+        first = proc.stdout.read(1)
+        first_byte_s = time.perf_counter() - t0 if first else None
+        out = first + proc.stdout.read() if first else ""
+        proc.wait()
+    finally:
+        timer.cancel()
+        try:
+            proc.stdout.close()
+        except Exception:
+            pass
+    return out, first_byte_s, expired.is_set()
+
+
+class OneShotOverhead:
+    """Session totals of where one-shot attempts spend their time, for the end-of-session report."""
+
+    __slots__ = ("attempts", "answered", "spawn_s", "first_byte_s", "run_s", "parse_s", "started")
+
+    def __init__(self, now=None):
+        self.attempts = self.answered = 0
+        self.spawn_s = self.run_s = self.parse_s = 0.0
+        self.first_byte_s = 0.0  # Spawn start to first output, summed over the runs that printed anything
+        self.started = time.monotonic() if now is None else now
+
+    def startup_s(self):
+        """Mean spawn-to-first-output time of a run, i.e. modpoll's start-up before it touches the port."""
+        if not self.answered:
+            return 0.0
+        return self.first_byte_s / self.answered
+
+    def report(self, now=None):
+        if not self.attempts:
+            return None
+        elapsed = max(1e-9, (time.monotonic() if now is None else now) - self.started)
+        n = self.attempts
+        return (
+            f"Per attempt: spawn {self.spawn_s / n * 1000:.1f} ms, first output "
+            f"{self.startup_s() * 1000:.0f} ms after start, "
+            f"run {self.run_s / n * 1000:.0f} ms, parse {self.parse_s / n * 1000:.1f} ms; "
+            f"spawn + parse = {(self.spawn_s + self.parse_s) / elapsed * 100:.1f}% of polling time"
+        )
+
+
+# ---------------- Session Capture / Replay ----------------
+
+CAPTURE_DIR = os.path.join(SETTINGS_DIR, "captures")
+CAPTURE_MAGIC = b"MPCAP\x00\x01\n"
+_CAPTURE_RECORD = struct.Struct("<dBI")  # wall-clock time, record kind, payload length
+
+CAPTURE_META = 0     # JSON: command line and serial/TCP settings of the session
+CAPTURE_RUN = 1      # JSON: one one-shot modpoll run starts (arguments, scan block label)
+CAPTURE_OUTPUT = 2   # UTF-8: the stdout of that run, exactly as fed to read_stream()
+CAPTURE_TIMEOUT = 3  # empty: the run was killed by the communicate() guard
+
+
+class SessionCapture:
+    """
+    Append-only capture file: CAPTURE_MAGIC, then records of
+    _CAPTURE_RECORD header + payload. Every record is flushed, so a crash leaves
+    at most one truncated record at the end, which the reader ignores.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(CAPTURE_MAGIC)
+        self.records = 0
+
+    @classmethod
+    def new_session(cls):
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        return cls(os.path.join(CAPTURE_DIR, f"session-{stamp}.mpcap"))
+
+    def write(self, kind, payload=b"", timestamp=None):
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        elif isinstance(payload, dict):
+            payload = json.dumps(payload).encode("utf-8")
+        timestamp = time.time() if timestamp is None else timestamp
+        self._file.write(_CAPTURE_RECORD.pack(timestamp, kind, len(payload)) + payload)
+        self._file.flush()
+        self.records += 1
+
+    def close(self):
+        try:
+            self._file.close()
+        except Exception:
+            pass
+
+
+def read_capture(path):
+    """Yield (timestamp, kind, payload bytes) records of a capture file; raises ValueError if not a capture."""
+    with open(path, "rb") as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{os.path.basename(path)} is not a ModPolling Tool capture")
+        header_size = _CAPTURE_RECORD.size
+        while True:
+            header = f.read(header_size)
+            if len(header) < header_size:
+                return
+            timestamp, kind, length = _CAPTURE_RECORD.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return  # Truncated tail (capture interrupted mid-write)
+            yield timestamp, kind, payload
+
+
+# ---------------- Modbus Slave Simulator ----------------
+
+def _crc16_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC16_TABLE = _crc16_table()
+
+
+def modbus_crc16(data):
+    """Modbus RTU CRC-16 of `data` (low byte is sent first)."""
+    crc = 0xFFFF
+    table = _CRC16_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+MODBUS_ILLEGAL_FUNCTION = 1
+MODBUS_ILLEGAL_DATA_ADDRESS = 2
+MODBUS_ILLEGAL_DATA_VALUE = 3
+
+
+class SimulatedSlave:
+    """
+    Register banks of one simulated slave. Unwritten addresses read a
+    deterministic pattern (registers: address * 1000 + offset, coils: odd offsets
+    set), so any block can be polled without configuring it first. Writes are
+    kept in small overlay dicts.
+    """
+
+    BANK_SIZE = 65536
+
+    def __init__(self, address, holding=None, inputs=None, coils=None, discrete=None):
+        self.address = int(address)
+        self.holding = {int(k): int(v) & 0xFFFF for k, v in (holding or {}).items()}
+        self.inputs = {int(k): int(v) & 0xFFFF for k, v in (inputs or {}).items()}
+        self.coils = {int(k): bool(v) for k, v in (coils or {}).items()}
+        self.discrete = {int(k): bool(v) for k, v in (discrete or {}).items()}
+
+    def read_registers(self, bank, start, count):
+        base = (self.address * 1000) & 0xFFFF
+        get = bank.get
+        return [get(i, (base + i) & 0xFFFF) for i in range(start, start + count)]
+
+    def read_bits(self, bank, start, count):
+        get = bank.get
+        return [get(i, bool(i & 1)) for i in range(start, start + count)]
+
+
+class ModbusSimulator:
+    """
+    Protocol core shared by the TCP and RTU front ends: PDU in, PDU out.
+
+    Supports FC1-6, 15 and 16 with the standard exception responses. Faults can be
+    injected per request: `latency_s` delay, `timeout_rate` (no reply),
+    `crc_error_rate` (RTU only: corrupted CRC) and `exception_rate` (reply with
+    `exception_code`). Rates are probabilities between 0 and 1, drawn from a seeded RNG so runs repeat.
+    """
+
+    def __init__(self, slaves, latency_s=0.0, timeout_rate=0.0, crc_error_rate=0.0,
+                 exception_rate=0.0, exception_code=MODBUS_ILLEGAL_DATA_ADDRESS, seed=None):
+        import random
+
+        self.slaves = {s.address: s for s in slaves}
+        self.latency_s = max(0.0, float(latency_s))
+        self.timeout_rate = float(timeout_rate)
+        self.crc_error_rate = float(crc_error_rate)
+        self.exception_rate = float(exception_rate)
+        self.exception_code = int(exception_code)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.replies = 0
+
+    def _roll(self, rate):
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def handle(self, unit, pdu):
+        """Response PDU for request `pdu` to slave `unit`, or None for no reply (unknown slave / injected timeout)."""
+        with self._lock:
+            self.requests += 1
+        if not pdu:
+            return None
+        fc = pdu[0]
+        if unit == 0:
+            # Broadcast: apply writes to every slave, never reply
+            if fc in (5, 6, 15, 16):
+                for each in self.slaves.values():
+                    self._execute(each, fc, pdu)
+            return None
+        slave = self.slaves.get(unit)
+        if slave is None or self._roll(self.timeout_rate):
+            return None
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if self._roll(self.exception_rate):
+            response = bytes((fc | 0x80, self.exception_code))
+        else:
+            response = self._execute(slave, fc, pdu)
+        with self._lock:
+            self.replies += 1
+        return response
+
+    def _execute(self, slave, fc, pdu):
+        def exception(code):
+            return bytes((fc | 0x80, code))
+
+        try:
+            if fc in (1, 2, 3, 4):
+                start, count = struct.unpack_from(">HH", pdu, 1)
+                limit = 2000 if fc in (1, 2) else 125
+                if not 1 <= count <= limit:
+                    return exception(MODBUS_ILLEGAL_DATA_VALUE)
+                if start + count > SimulatedSlave.BANK_SIZE:
+                    return exception(MODBUS_ILLEGAL_DATA_ADDRESS)
+                if fc in (1, 2):
+                    bits = slave.read_bits(slave.coils if fc == 1 else slave.discrete, start, count)
+                    data = bytearray((count + 7) // 8)
+                    for i, bit in enumerate(bits):
+                        if bit:
+                            data[i >> 3] |= 1 << (i & 7)
+                    return bytes((fc, len(data))) + bytes(data)
+                values = slave.read_registers(slave.holding if fc == 3 else slave.inputs, start, count)
+                return bytes((fc, 2 * count)) + struct.pack(f">{count}H", *values)
+            if fc == 5:
+                address, value = struct.unpack_from(">HH", pdu, 1)
+                if value not in (0x0000, 0xFF00):
+                    return exception(MODBUS_ILLEGAL_DATA_VALUE)
+                slave.coils[address] = value == 0xFF00
+                return bytes(pdu[:5])
+            if fc == 6:
+                address, value = struct.unpack_from(">HH", pdu, 1)
+                slave.holding[address] = value
+                return bytes(pdu[:5])
+            if fc in (15, 16):
+                start, count, byte_count = struct.unpack_from(">HHB", pdu, 1)
+                data = pdu[6:6 + byte_count]
+                expected = (count + 7) // 8 if fc == 15 else 2 * count
+                if count < 1 or byte_count != expected or len(data) != byte_count:
+                    return exception(MODBUS_ILLEGAL_DATA_VALUE)
+                if start + count > SimulatedSlave.BANK_SIZE:
+                    return exception(MODBUS_ILLEGAL_DATA_ADDRESS)
+                if fc == 15:
+                    for i in range(count):
+                        slave.coils[start + i] = bool(data[i >> 3] & (1 << (i & 7)))
+                else:
+                    for i, value in enumerate(struct.unpack(f">{count}H", data)):
+                        slave.holding[start + i] = value
+                return bytes(pdu[:5])
+        except struct.error:
+            return exception(MODBUS_ILLEGAL_DATA_VALUE)
+        return exception(MODBUS_ILLEGAL_FUNCTION)
+
+    # ---- Front ends ----
+
+    def serve_tcp(self, host="127.0.0.1", port=5020):
+        """Create (not start) a threaded Modbus TCP server; call serve_forever() / shutdown() on it."""
+        import socketserver
+
+        simulator = self
+
+        class _Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                sock = self.request
+                while True:
+                    header = _recv_exact(sock, 7)
+                    if header is None:
+                        return
+                    transaction, protocol, length, unit = struct.unpack(">HHHB", header)
+                    pdu = _recv_exact(sock, length - 1) if length > 1 else b""
+                    if pdu is None:
+                        return
+                    if protocol != 0:
+                        continue
+                    response = simulator.handle(unit, pdu)
+                    if response is not None:
+                        sock.sendall(struct.pack(">HHHB", transaction, 0, len(response) + 1, unit) + response)
+
+        class _Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        return _Server((host, int(port)), _Handler)
+
+    def serve_rtu_pty(self, baudrate=9600):
+        """
+        Open a pseudo-terminal pair and answer RTU frames on it (POSIX only).
+        Returns (device path for the client, stop function); serving runs on a daemon thread.
+        """
+        import pty
+        import select
+        import tty
+
+        master_fd, slave_fd = pty.openpty()
+        tty.setraw(slave_fd)
+        device = os.ttyname(slave_fd)
+        # Inter-frame silence: 3.5 characters of 11 bits, at least 2 ms (a pty has no real line timing)
+        gap_s = max(0.002, 3.5 * 11 / float(baudrate))
+        stop = threading.Event()
+
+        def _serve():
+            buffer = bytearray()
+            while not stop.is_set():
+                ready, _, _ = select.select([master_fd], [], [], gap_s if buffer else 0.2)
+                if ready:
+                    try:
+                        chunk = os.read(master_fd, 512)
+                    except OSError:
+                        return
+                    buffer += chunk
+                    frame_len = _rtu_request_length(buffer)
+                    if frame_len is None or len(buffer) < frame_len:
+                        continue
+                    frame, buffer = bytes(buffer[:frame_len]), bytearray(buffer[frame_len:])
+                elif buffer:
+                    frame, buffer = bytes(buffer), bytearray()  # Silence ended an unknown-length frame
+                else:
+                    continue
+                if len(frame) < 4 or modbus_crc16(frame[:-2]) != int.from_bytes(frame[-2:], "little"):
+                    continue  # Corrupt request: a real slave stays silent
+                response = self.handle(frame[0], frame[1:-2])
+                if response is None:
+                    continue
+                reply = bytes((frame[0],)) + response
+                crc = modbus_crc16(reply)
+                if self._roll(self.crc_error_rate):
+                    crc ^= 0xFFFF
+                os.write(master_fd, reply + crc.to_bytes(2, "little"))
+
+        def _stop():
+            stop.set()
+            for fd in (master_fd, slave_fd):
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+        threading.Thread(target=_serve, daemon=True).start()
+        return device, _stop
+
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        try:
+            chunk = sock.recv(size - len(data))
+        except OSError:
+            return None
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _rtu_request_length(buffer):
+    """Expected length of the RTU request at the start of `buffer`, or None if not known yet."""
+    if len(buffer) < 2:
+        return None
+    fc = buffer[1]
+    if fc in (1, 2, 3, 4, 5, 6):
+        return 8
+    if fc in (15, 16):
+        return 9 + buffer[6] if len(buffer) >= 7 else None
+    return None
+
+
+def parse_slave_addresses(text):
+    """Parse "1-10,20,247" into a sorted list of slave addresses (1-247)."""
+    addresses = set()
+    for part in str(text).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        low, _, high = part.partition("-")
+        low, high = int(low), int(high or low)
+        if not 1 <= low <= high <= 247:
+            raise ValueError(f"invalid slave range '{part}' (1-247)")
+        addresses.update(range(low, high + 1))
+    return sorted(addresses)
+
+
+def run_simulator(mode, slaves="1", latency_ms=0.0, timeout_rate=0.0, crc_error_rate=0.0,
+                  exception_rate=0.0, exception_code=MODBUS_ILLEGAL_DATA_ADDRESS, seed=None):
+    """Serve the simulator in the foreground until Ctrl+C (mode: "tcp", "tcp:PORT" or "rtu[:BAUD]")."""
+    simulator = ModbusSimulator(
+        [SimulatedSlave(a) for a in parse_slave_addresses(slaves)],
+        latency_s=latency_ms / 1000.0,
+        timeout_rate=timeout_rate,
+        crc_error_rate=crc_error_rate,
+        exception_rate=exception_rate,
+        exception_code=exception_code,
+        seed=seed,
+    )
+    kind, _, option = str(mode).lower().partition(":")
+    summary = f"{len(simulator.slaves)} slave(s) [{slaves}]"
+    try:
+        if kind == "tcp":
+            server = simulator.serve_tcp(port=int(option or 5020))
+            host, port = server.server_address[:2]
+            print(f"Simulating {summary} on Modbus TCP {host}:{port} - e.g. modpoll -m tcp {host}:{port} -a1 -r1 -c10", flush=True)
+            try:
+                server.serve_forever()
+            finally:
+                server.server_close()
+        elif kind == "rtu":
+            if os.name == "nt":
+                print("RTU simulation needs a POSIX pseudo-terminal; use a com0com pair with the TCP mode on Windows.",
+                      file=sys.stderr)
+                return 2
+            device, stop = simulator.serve_rtu_pty(int(option or 9600))
+            print(f"Simulating {summary} on RTU device {device} - e.g. modpoll -b{option or 9600} -pnone {device}",
+                  flush=True)
+            try:
+                while True:
+                    time.sleep(1.0)
+            finally:
+                stop()
+        else:
+            print(f"Unknown simulator mode '{mode}' (use tcp[:port] or rtu[:baud])", file=sys.stderr)
+            return 2
+    except KeyboardInterrupt:
+        pass
+    print(f"Simulator stopped: {simulator.requests} requests, {simulator.replies} replies", flush=True)
+    return 0
+
+
+# ---------------- Modbus TCP-to-RTU Gateway ----------------
+
+MODBUS_SERVER_BUSY = 6
+MODBUS_GATEWAY_TARGET_FAILED = 11
+MODBUS_WRITE_FUNCTIONS = (5, 6, 15, 16)
+
+
+class RtuBusMaster:
+    """
+    Modbus RTU master on an open serial port (a pyserial Serial or anything with
+    read/write/flush/reset_input_buffer and a settable `timeout`). One transaction at
+    a time; keeps the 3.5-character silence between frames.
+    """
+
+    BROADCAST_DELAY_S = 0.1  # Slaves need time to act on a broadcast; nothing is returned
+
+    def __init__(self, port, baudrate, bits_per_char=11):
+        self.port = port
+        self.char_s = bits_per_char / float(baudrate)
+        # t3.5; the spec fixes it at 1.75 ms above 19200 baud
+        self.gap_s = max(0.00175, 3.5 * self.char_s)
+        self._idle_at = 0.0
+
+    def _read(self, size, deadline):
+        data = b""
+        while len(data) < size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            self.port.timeout = remaining
+            chunk = self.port.read(size - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def transact(self, unit, pdu, timeout_s):
+        """
+        Send `pdu` to slave `unit` and return the response PDU; None when the slave stays
+        silent (or for a broadcast). Raises ValueError for a corrupt or foreign reply.
+        """
+        frame = bytes((unit,)) + bytes(pdu)
+        frame += modbus_crc16(frame).to_bytes(2, "little")
+        wait_s = self._idle_at - time.perf_counter()
+        if wait_s > 0:
+            time.sleep(wait_s)
+        port = self.port
+        port.reset_input_buffer()
+        port.write(frame)
+        port.flush()
+        if unit == 0:
+            time.sleep(self.BROADCAST_DELAY_S)
+            self._idle_at = time.perf_counter() + self.gap_s
+            return None
+        try:
+            deadline = time.perf_counter() + len(frame) * self.char_s + timeout_s
+            reply = self._read(3, deadline)
+            if len(reply) < 3:
+                return None
+            fc = reply[1]
+            if fc & 0x80:
+                total = 5
+            elif fc in (1, 2, 3, 4):
+                total = 5 + reply[2]
+            elif fc in (5, 6, 15, 16):
+                total = 8
+            else:
+                raise ValueError(f"unsupported function {fc} in reply")
+            reply += self._read(total - 3, deadline)
+            if len(reply) < total:
+                raise ValueError("truncated reply")
+            if modbus_crc16(reply[:-2]) != int.from_bytes(reply[-2:], "little"):
+                raise ValueError("CRC error")
+            if reply[0] != unit:
+                raise ValueError(f"reply from slave {reply[0]}")
+            return reply[1:-2]
+        finally:
+            self._idle_at = time.perf_counter() + self.gap_s
+
+
+class ReadResponseCache:
+    """
+    Read responses (FC1-4) kept for `max_age_s`, keyed on (port, slave, function,
+    start, count). A request inside a fresh cached block is answered by slicing
+    that block (the most recent one when several cover it). Writes to a slave drop
+    its entries and bump its generation, so a reply read before the write is not
+    stored afterwards; a broadcast does this for every slave. `max_age_s` 0
+    disables storing (lookups then always miss).
+
+    Also keeps the gateway's hit statistics, including the bus time each hit or
+    coalesced request did not spend.
+    """
+
+    MAX_BLOCKS = 64  # Per (port, slave, function); the oldest block goes first
+
+    def __init__(self, port="", max_age_s=0.0):
+        self.port = str(port)
+        self.max_age_s = max(0.0, float(max_age_s))
+        self._lock = threading.Lock()
+        self._blocks = {}  # (port, unit, fc) -> {(start, count): (stored_at, data, cost_s)}
+        self._generations = {}  # unit -> writes seen
+        self._epoch = 0  # broadcasts seen
+        self.lookups = self.hits = self.slice_hits = self.coalesced = 0
+        self.saved_s = 0.0
+
+    def key(self, unit, pdu):
+        """(port, slave, function, start, count) for a cacheable read, else None."""
+        if unit == 0 or len(pdu) != 5 or pdu[0] not in (1, 2, 3, 4):
+            return None
+        start, count = struct.unpack(">HH", pdu[1:5])
+        if count == 0:
+            return None
+        return (self.port, unit, pdu[0], start, count)
+
+    @staticmethod
+    def _slice(fc, block_start, data, start, count):
+        offset = start - block_start
+        if fc in (3, 4):
+            part = data[offset * 2:(offset + count) * 2]
+            return bytes((fc, len(part))) + part
+        bits = (int.from_bytes(data, "little") >> offset) & ((1 << count) - 1)
+        size = (count + 7) // 8
+        return bytes((fc, size)) + bits.to_bytes(size, "little")
+
+    def lookup(self, key):
+        """Cached response PDU for `key` (exact or sliced from a covering block), or None."""
+        if key is None:
+            return None
+        port, unit, fc, start, count = key
+        now = time.monotonic()
+        with self._lock:
+            self.lookups += 1
+            if not self.max_age_s:
+                return None
+            blocks = self._blocks.get((port, unit, fc))
+            if not blocks:
+                return None
+            found = None
+            for (block_start, block_count), (stored_at, data, cost_s) in list(blocks.items()):
+                if now - stored_at > self.max_age_s:
+                    del blocks[(block_start, block_count)]
+                elif block_start <= start and start + count <= block_start + block_count:
+                    if found is None or stored_at >= found[0]:
+                        found = (stored_at, block_start, block_count, data, cost_s)
+            if found is None:
+                return None
+            _stored_at, block_start, block_count, data, cost_s = found
+            self.hits += 1
+            # Credit the share of the block's bus time this request would have needed
+            self.saved_s += cost_s * count / block_count
+            if (block_start, block_count) == (start, count):
+                return bytes((fc, len(data))) + data
+            self.slice_hits += 1
+        return self._slice(fc, block_start, data, start, count)
+
+    def generation(self, unit):
+        """Token that changes whenever `unit` is invalidated; take it before the bus transaction."""
+        with self._lock:
+            return self._epoch, self._generations.get(unit, 0)
+
+    def store(self, key, response, cost_s, generation=None):
+        """
+        Keep a well-formed read response for `key`; exceptions and short replies are
+        ignored, and so is a reply read under an older `generation`.
+        """
+        if key is None or not self.max_age_s or not response or response[0] != key[2]:
+            return
+        fc, count = key[2], key[4]
+        expected = count * 2 if fc in (3, 4) else (count + 7) // 8
+        if len(response) != 2 + expected or response[1] != expected:
+            return
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations.get(key[1], 0)):
+                return
+            blocks = self._blocks.setdefault(key[:3], {})
+            blocks.pop(key[3:], None)
+            blocks[key[3:]] = (time.monotonic(), bytes(response[2:]), cost_s)
+            if len(blocks) > self.MAX_BLOCKS:
+                del blocks[next(iter(blocks))]
+
+    def invalidate(self, unit):
+        """Forget slave `unit` (every slave for a broadcast) after a write."""
+        with self._lock:
+            if unit == 0:
+                self._epoch += 1
+                self._blocks.clear()
+            else:
+                self._generations[unit] = self._generations.get(unit, 0) + 1
+                for group in [g for g in self._blocks if g[1] == unit]:
+                    del self._blocks[group]
+
+    def record_coalesced(self, followers, cost_s):
+        with self._lock:
+            self.coalesced += followers
+            self.saved_s += followers * cost_s
+
+    def report(self):
+        with self._lock:
+            rate = (self.hits + self.coalesced) / self.lookups * 100 if self.lookups else 0.0
+            return (f"Cache (max age {self.max_age_s * 1000:.0f} ms): {self.lookups} reads, {self.hits} hits "
+                    f"({self.slice_hits} sliced from a wider block), {self.coalesced} coalesced in flight, "
+                    f"{rate:.0f}% of reads kept off the bus, ~{self.saved_s:.1f} s of bus time saved")
+
+
+class _GatewayClient:
+    __slots__ = ("name", "sock", "outbox", "pending", "keys", "last_tag", "closed", "stalled",
+                 "requests", "replies", "failures", "rejected", "wait_s", "max_wait_s")
+
+    def __init__(self, name, sock, outbox_limit=64):
+        self.name = name
+        self.sock = sock
+        self.outbox = queue.Queue(maxsize=outbox_limit)  # Reply frames for this client's writer thread
+        self.pending = 0
+        self.keys = {}  # cache key -> requests of this client pending for it (queued or joined)
+        self.last_tag = 0
+        self.closed = False
+        self.stalled = False
+        self.requests = self.replies = self.failures = self.rejected = 0
+        self.wait_s = self.max_wait_s = 0.0
+
+
+class ModbusGateway:
+    """
+    Modbus TCP server in front of one RTU bus, so several programs (plant server,
+    this GUI, scripts) can share a COM port.
+
+    One bus thread serves all connections with start-time fair queuing. Each request
+    is tagged max(virtual time, the client's previous tag + 1), where virtual time is
+    the tag of the request on the bus, and the lowest tag goes next. A client that
+    pipelines many requests gets one bus turn per round, like everyone else, and a
+    client that was idle does not build up credit. A client may have MAX_PENDING
+    requests queued; more are answered with exception 6 (server busy). A request
+    that waited longer than `queue_timeout_s` for the bus, or whose slave did not
+    answer within `rtu_timeout_s`, is answered with exception 11 (gateway target
+    failed to respond), like a hardware gateway.
+
+    Reads go through `cache` (a ReadResponseCache) first. A read that is the same
+    as one another client already queued does not queue again: it waits for that
+    request and gets its reply (single flight). Joining is charged like queuing
+    (the client's tag and pending count) and only allowed when the queued request
+    is due no later than the joiner's own turn. A client that already has the same
+    read pending queues its copy normally, so pipelining identical reads does not
+    buy a client more than one reply per bus turn. With the cache enabled this
+    also covers the request on the wire. A queued write to a slave fences its
+    reads: later reads neither join an earlier one nor hit the cache.
+    """
+
+    MAX_PENDING = 32
+    OUTBOX_LIMIT = 64  # Unsent replies a client may have; one that stops reading is disconnected
+
+    def __init__(self, bus, rtu_timeout_s=1.0, queue_timeout_s=5.0, cache=None):
+        self.bus = bus
+        self.rtu_timeout_s = float(rtu_timeout_s)
+        self.queue_timeout_s = float(queue_timeout_s)
+        self.cache = cache if cache is not None else ReadResponseCache()
+        self._inflight = {}  # cache key -> (client, waiters list, tag) of the queued request copies may join
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (tag, seq, queued_at, client, transaction, unit, pdu, waiters)
+        self._seq = 0
+        self._vtime = 0  # tag of the request last taken to the bus
+        self._clients = []
+        self._retired = _GatewayClient("closed connections", None, 1)  # Counters of pruned clients
+        self._retired_count = self._stalled_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._connections = 0
+        self.started = time.monotonic()
+        self.transactions = 0
+        self.bus_busy_s = 0.0
+
+    def register(self, sock, name):
+        client = _GatewayClient(name, sock, self.OUTBOX_LIMIT)
+        with self._cond:
+            self._clients.append(client)
+            self._connections += 1
+        return client
+
+    def unregister(self, client):
+        with self._cond:
+            client.closed = True  # Its queued requests are dropped when they reach the head
+            if not client.pending:
+                self._retire(client)
+        try:
+            client.outbox.put_nowait(None)  # The writer stops after what is already queued
+        except queue.Full:
+            self._disconnect(client)
+
+    def _retire(self, client):
+        """Fold a closed client with no queued work into the aggregate counters (lock held)."""
+        try:
+            self._clients.remove(client)
+        except ValueError:
+            return
+        total = self._retired
+        total.requests += client.requests
+        total.replies += client.replies
+        total.failures += client.failures
+        total.rejected += client.rejected
+        total.wait_s += client.wait_s
+        total.max_wait_s = max(total.max_wait_s, client.max_wait_s)
+        self._retired_count += 1
+        self._stalled_count += client.stalled
+
+    @staticmethod
+    def _disconnect(client):
+        """Shut the client's socket down (does not block), which ends its reader and writer threads."""
+        import socket
+
+        client.closed = True
+        try:
+            client.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def submit(self, client, transaction, unit, pdu):
+        key = self.cache.key(unit, pdu)
+        rejected = False
+        with self._cond:
+            client.requests += 1
+            if pdu[0] in MODBUS_WRITE_FUNCTIONS:
+                self._fence_reads(unit)
+            cached = self.cache.lookup(key)
+            group = self._inflight.get(key) if key is not None else None
+            waiters = None
+            if cached is not None:
+                client.replies += 1
+            elif client.pending >= self.MAX_PENDING:
+                client.rejected += 1
+                rejected = True
+            else:
+                client.last_tag = max(self._vtime, client.last_tag + 1)
+                client.pending += 1
+                if key is not None:
+                    joinable = group is not None and group[2] <= client.last_tag and not client.keys.get(key)
+                    client.keys[key] = client.keys.get(key, 0) + 1
+                    if joinable:
+                        group[1].append((client, transaction, unit))
+                        return
+                self._seq += 1
+                if key is not None and group is None:
+                    waiters = []
+                    self._inflight[key] = (client, waiters, client.last_tag)
+                heapq.heappush(self._queue, (client.last_tag, self._seq, time.monotonic(), client, transaction, unit, pdu,
+                                             waiters))
+                self._cond.notify()
+        if cached is not None:
+            self._reply(client, transaction, unit, cached)
+        elif rejected:
+            self._reply(client, transaction, unit, bytes((pdu[0] | 0x80, MODBUS_SERVER_BUSY)) if pdu else None)
+
+    def _fence_reads(self, unit):
+        """A write to `unit` (0: all) was queued: later reads must not get a reply read before it (lock held)."""
+        self.cache.invalidate(unit)
+        for key in [k for k in self._inflight if unit == 0 or k[1] == unit]:
+            del self._inflight[key]
+
+    @staticmethod
+    def _release_key(client, key):
+        """One of the client's requests for `key` was taken to the bus or answered (lock held)."""
+        if key is not None:
+            left = client.keys.get(key, 0) - 1
+            if left > 0:
+                client.keys[key] = left
+            else:
+                client.keys.pop(key, None)
 
-# Set CustomTkinter appearance and smooth animations
-ctk.set_appearance_mode("dark")  # Modes: "System" (default), "Dark", "Light"
-ctk.set_default_color_theme("blue")  # Themes: "blue" (default), "green", "dark-blue"
+    def _detach(self, key, waiters):
+        """Stop new copies from joining this request (lock held); a newer request for the key keeps its entry."""
+        group = self._inflight.get(key) if key is not None else None
+        if group is not None and group[1] is waiters:
+            del self._inflight[key]
+
+    def _reply(self, client, transaction, unit, pdu):
+        """Queue a response for the client's writer; never waits on the socket."""
+        if pdu is None or client.closed:
+            return
+        try:
+            client.outbox.put_nowait(struct.pack(">HHHB", transaction, 0, len(pdu) + 1, unit) + pdu)
+        except queue.Full:
+            # Not reading its replies: drop it instead of holding up the bus for everyone
+            client.stalled = True
+            self._disconnect(client)
+
+    def _send_replies(self, client):
+        """Writer thread of one connection: sends the queued replies in order."""
+        while True:
+            frame = client.outbox.get()
+            if frame is None:
+                return
+            try:
+                client.sock.sendall(frame)
+            except OSError:
+                self._disconnect(client)
+                return
 
-# Enable smooth animations - set widget scaling for better performance
-ctk.set_widget_scaling(1.0)  # Perfect scaling for smooth animations
+    def _serve_bus(self):
+        while not self._stop.is_set():
+            with self._cond:
+                if not self._queue:
+                    self._cond.wait(0.5)
+                    continue
+                tag, _seq, queued_at, client, transaction, unit, pdu, waiters = heapq.heappop(self._queue)
+                client.pending -= 1
+                key = self.cache.key(unit, pdu)
+                self._release_key(client, key)
+                if client.closed and not waiters:
+                    self._detach(key, waiters)
+                    if not client.pending:
+                        self._retire(client)
+                    continue
+                if not self.cache.max_age_s:
+                    # No cache: a copy arriving from now on may not get an older reply
+                    self._detach(key, waiters)
+                generation = self.cache.generation(unit)
+                self._vtime = tag
+            waited = time.monotonic() - queued_at
+            client.wait_s += waited
+            client.max_wait_s = max(client.max_wait_s, waited)
+            if pdu[0] in MODBUS_WRITE_FUNCTIONS:
+                self.cache.invalidate(unit)  # Also drops replies stored by reads that ran before it
+            response = None
+            cost_s = 0.0
+            if waited <= self.queue_timeout_s:
+                t0 = time.perf_counter()
+                try:
+                    response = self.bus.transact(unit, pdu, self.rtu_timeout_s)
+                except (ValueError, OSError):
+                    response = None
+                cost_s = time.perf_counter() - t0
+                self.bus_busy_s += cost_s
+                self.transactions += 1
+            if self.cache.max_age_s:
+                with self._cond:
+                    self.cache.store(key, response, cost_s, generation)
+                    self._detach(key, waiters)
+            followers = waiters or []
+            if followers:
+                self.cache.record_coalesced(len(followers), cost_s)
+                with self._cond:
+                    for waiting, _transaction, _unit in followers:
+                        waiting.pending -= 1
+                        self._release_key(waiting, key)
+            if unit != 0:  # A broadcast is never answered
+                failed = response is None
+                if failed:
+                    response = bytes((pdu[0] | 0x80, MODBUS_GATEWAY_TARGET_FAILED))
+                for waiting, waiting_transaction, waiting_unit in [(client, transaction, unit)] + followers:
+                    if waiting.closed:
+                        continue
+                    if failed:
+                        waiting.failures += 1
+                    else:
+                        waiting.replies += 1
+                    self._reply(waiting, waiting_transaction, waiting_unit, response)
+            done = [c for c in [client] + [w[0] for w in followers] if c.closed and not c.pending]
+            if done:
+                with self._cond:
+                    for c in done:
+                        self._retire(c)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve_bus, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def serve_tcp(self, host="127.0.0.1", port=5020):
+        """Create (not start) the threaded Modbus TCP front end; call serve_forever() / shutdown() on it."""
+        import socket
+        import socketserver
+
+        gateway = self
+
+        class _Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                sock = self.request
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                client = gateway.register(sock, "%s:%s" % self.client_address[:2])
+                writer = threading.Thread(target=gateway._send_replies, args=(client,), daemon=True)
+                writer.start()
+                try:
+                    while True:
+                        header = _recv_exact(sock, 7)
+                        if header is None:
+                            return
+                        transaction, protocol, length, unit = struct.unpack(">HHHB", header)
+                        pdu = _recv_exact(sock, length - 1) if length > 1 else b""
+                        if pdu is None:
+                            return
+                        if protocol == 0 and pdu:
+                            gateway.submit(client, transaction, unit, pdu)
+                finally:
+                    gateway.unregister(client)
+                    writer.join(timeout=1.0)
+
+        class _Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        return _Server((host, int(port)), _Handler)
+
+    def report(self):
+        """Summary lines: bus throughput and load, then per-client counts and queue waits."""
+        elapsed = max(1e-9, time.monotonic() - self.started)
+        lines = [
+            f"Gateway: {self.transactions} RTU transactions in {elapsed:.1f} s "
+            f"({self.transactions / elapsed:.1f}/s, bus busy {self.bus_busy_s / elapsed * 100:.0f}%), "
+            f"{self._connections} connections",
+            self.cache.report(),
+        ]
+        with self._cond:
+            clients = list(self._clients)
+            retired, stalled = self._retired_count, self._stalled_count
+        if retired:
+            clients.append(self._retired)
+        for c in clients:
+            served = c.replies + c.failures
+            name = c.name
+            if c is self._retired:
+                name = f"{retired} {c.name}" + (f" ({stalled} dropped for not reading replies)" if stalled else "")
+            lines.append(
+                f"  {name}: {c.requests} requests, {c.replies} answered, {c.failures} failed, {c.rejected} busy; "
+                f"queue wait avg {c.wait_s / served * 1000 if served else 0:.1f} ms, max {c.max_wait_s * 1000:.1f} ms"
+            )
+        return lines
+
+
+def open_rtu_serial(device, baudrate=9600, parity="none", stopbits=1, databits=8):
+    """Open `device` with pyserial (optional dependency: pip install pyserial)."""
+    try:
+        import serial
+    except ImportError:
+        raise OSError("the gateway needs pyserial (pip install pyserial)")
+    parity_map = {"none": serial.PARITY_NONE, "even": serial.PARITY_EVEN, "odd": serial.PARITY_ODD}
+    if str(parity).lower() not in parity_map:
+        raise ValueError(f"invalid parity '{parity}' (none, even or odd)")
+    return serial.Serial(
+        device, baudrate=int(baudrate), parity=parity_map[str(parity).lower()],
+        stopbits=serial.STOPBITS_TWO if int(stopbits) == 2 else serial.STOPBITS_ONE,
+        bytesize=int(databits), timeout=0.1,
+    )
+
+
+def run_gateway(device, baudrate=9600, parity="none", stopbits=1, listen="127.0.0.1:5020",
+                rtu_timeout_ms=1000.0, queue_timeout_ms=5000.0, cache_ms=0.0):
+    """Own the serial port and serve Modbus TCP clients in the foreground until Ctrl+C."""
+    host, _, port = str(listen).rpartition(":")
+    host = host or "127.0.0.1"
+    serial_port = open_rtu_serial(device, baudrate, parity, stopbits)
+    bits_per_char = 1 + 8 + (0 if str(parity).lower() == "none" else 1) + int(stopbits)
+    gateway = ModbusGateway(RtuBusMaster(serial_port, baudrate, bits_per_char),
+                            rtu_timeout_ms / 1000.0, queue_timeout_ms / 1000.0,
+                            ReadResponseCache(device, cache_ms / 1000.0))
+    server = gateway.serve_tcp(host, int(port or 5020))
+    gateway.start()
+    host, port = server.server_address[:2]
+    print(f"Gateway {device} @ {baudrate} {parity} <- Modbus TCP {host}:{port} - "
+          f"e.g. modpoll -m tcp {host}:{port} -a1 -r1 -c10", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        gateway.stop()
+        serial_port.close()
+        for line in gateway.report():
+            print(line, flush=True)
+    return 0
+
+
+def run_gateway_load(target, clients=4, seconds=10.0, unit=1, count=10, greedy=0):
+    """
+    Load generator: `clients` connections each read `count` holding registers from
+    `unit` in a closed loop for `seconds`. With `greedy` > 0 the first client keeps
+    that many requests outstanding, to check that the others still get their turn.
+    Every request reads a different block (per client and request), so neither the
+    cache nor single flight can answer it and the index measures bus fairness.
+    Prints throughput, per-client rates and latency, and Jain's fairness index.
+    """
+    import socket
+
+    host, _, port = str(target).rpartition(":")
+    host, port = host or "127.0.0.1", int(port or 5020)
+    deadline = time.perf_counter() + float(seconds)
+    results = [None] * clients
+
+    def _client(index):
+        depth = greedy if (index == 0 and greedy > 0) else 1
+        latencies, failures = [], 0
+        with socket.create_connection((host, port)) as sock:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sent_at = {}
+            transaction = 0
+
+            def send():
+                nonlocal transaction
+                transaction = (transaction + 1) & 0xFFFF
+                sent_at[transaction] = time.perf_counter()
+                start = (index * 4096 + (transaction & 0xFF) * count) % (0x10000 - count)
+                sock.sendall(struct.pack(">HHHBBHH", transaction, 0, 6, unit, 3, start, count))
+
+            for _ in range(depth):
+                send()
+            while sent_at:
+                header = _recv_exact(sock, 7)
+                if header is None:
+                    break
+                tid, _protocol, length, _unit = struct.unpack(">HHHB", header)
+                pdu = _recv_exact(sock, length - 1)
+                if pdu is None:
+                    break
+                started = sent_at.pop(tid, None)
+                if started is not None:
+                    latencies.append(time.perf_counter() - started)
+                if pdu[0] & 0x80:
+                    failures += 1
+                if time.perf_counter() < deadline:
+                    send()
+        results[index] = (depth, latencies, failures)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=_client, args=(i,), daemon=True) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    rates = []
+    total = 0
+    for i, result in enumerate(results):
+        if result is None:
+            print(f"  client {i + 1}: connection failed", flush=True)
+            continue
+        depth, latencies, failures = result
+        ordered = sorted(latencies)
+        rate = len(latencies) / elapsed
+        rates.append(rate)
+        total += len(latencies)
+        p50 = ordered[len(ordered) // 2] * 1000 if ordered else 0.0
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000 if ordered else 0.0
+        print(f"  client {i + 1} (outstanding {depth}): {len(latencies)} replies ({rate:.1f}/s), "
+              f"{failures} exceptions, latency p50 {p50:.1f} ms, p95 {p95:.1f} ms", flush=True)
+    fairness = (sum(rates) ** 2) / (len(rates) * sum(r * r for r in rates)) if rates and any(rates) else 0.0
+    print(f"Load: {total} replies in {elapsed:.1f} s ({total / elapsed:.1f}/s), Jain fairness {fairness:.3f} (1.0 = equal)",
+          flush=True)
+    return 0 if rates else 1
+
+
+# ---------------- Diagnostics ----------------
+
+DIAGNOSTICS_DIR = os.path.join(SETTINGS_DIR, "diagnostics")
+
+
+class StageTimers:
+    """
+    Rolling timings of the polling/rendering stages (spawn, first_byte, wait, parse, queue, flush, tk_insert, status).
+
+    Call sites guard with `if timers.enabled:` and only then read the clock.
+    When diagnostics are off, the cost is one attribute check per stage.
+    """
+
+    WINDOW = 256
+    STAGES = ("spawn", "first_byte", "wait", "parse", "queue", "flush", "tk_insert", "status")
+
+    def __init__(self):
+        self.enabled = False
+        self._samples = {}
+        self._totals = {}
+
+    def record(self, stage, seconds):
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = deque(maxlen=self.WINDOW)
+            self._totals[stage] = [0, 0.0]
+        samples.append(seconds)
+        totals = self._totals[stage]
+        totals[0] += 1
+        totals[1] += seconds
+
+    def reset(self):
+        self._samples.clear()
+        self._totals.clear()
+
+    def summary(self):
+        """[(stage, count, mean ms, p95 ms, max ms, total s)] over the rolling window, in pipeline order."""
+        rows = []
+        order = {name: i for i, name in enumerate(self.STAGES)}
+        for stage in sorted(self._samples, key=lambda s: order.get(s, len(order))):
+            window = sorted(self._samples[stage])
+            if not window:
+                continue
+            count, total = self._totals[stage]
+            p95 = window[min(len(window) - 1, int(len(window) * 0.95))]
+            rows.append((stage, count, sum(window) / len(window) * 1000, p95 * 1000, window[-1] * 1000, total))
+        return rows
+
+
+class SamplingProfiler:
+    """
+    Low-overhead wall-clock profiler for all threads. It samples sys._current_frames()
+    every `interval_s` and writes collapsed stacks ("thread;outer;...;inner count"),
+    one per line, in the input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval_s=0.005):
+        self.interval_s = interval_s
+
+    def record(self, duration_s, path):
+        """Sample for `duration_s` seconds (blocking) and write the stacks to `path`; returns the sample count."""
+        own = threading.get_ident()
+        counts = {}
+        samples = 0
+        deadline = time.perf_counter() + duration_s
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                key = ";".join(reversed(stack))
+                counts[key] = counts.get(key, 0) + 1
+            samples += 1
+            time.sleep(self.interval_s)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(counts.items(), key=lambda kv: -kv[1]):
+                f.write(f"{stack} {count}\n")
+        return samples
+
+
+# ---------------- Unit Records ----------------
+
+UNIT_FIELDS = ("unit_id", "unit_name", "driver_type", "driver_addr", "regulator_type", "com_port", "baudrate", "parity", "ip_address")
+
+# One Units row. A namedtuple has no per-instance dict, is smaller than a list, and
+# is already the tuple the Units table keeps per item, so it is stored there as is.
+UnitRecord = namedtuple("UnitRecord", UNIT_FIELDS)
+
+
+def make_unit_record(unit_id, unit_name, driver_type, driver_addr, regulator_type, com_port, baudrate, parity, ip_address):
+    """UnitRecord with the values repeated across a plant (driver, address, regulator, COM, baud, parity) interned."""
+    intern = sys.intern
+    return UnitRecord(unit_id, unit_name, intern(driver_type), intern(driver_addr), intern(regulator_type),
+                      intern(com_port), intern(baudrate), intern(parity), ip_address)
+
+
+# ---------------- Units Table Index ----------------
+
+# Query bar field names -> Units table column
+UNITS_QUERY_FIELDS = {
+    "id": "unit_id", "unit_id": "unit_id",
+    "name": "unit_name", "unit_name": "unit_name",
+    "driver": "driver_type", "type": "driver_type", "driver_type": "driver_type",
+    "addr": "driver_addr", "address": "driver_addr", "driver_addr": "driver_addr",
+    "reg": "regulator_type", "regulator": "regulator_type", "regulator_type": "regulator_type",
+    "com": "com_port", "port": "com_port", "com_port": "com_port",
+    "baud": "baudrate", "baudrate": "baudrate",
+    "parity": "parity",
+    "ip": "ip_address", "ip_address": "ip_address",
+}
+
+_UNITS_VALUE_INDEXED = ("driver_type", "regulator_type", "com_port", "baudrate", "parity", "unit_id")
+
+
+def unit_address_number(driver_addr):
+    """Slave address of a driver_addr such as "1_93" (last number), or None."""
+    numbers = _DIGIT_RUN_RE.findall(str(driver_addr or ""))
+    return int(numbers[-1]) if numbers else None
+
+
+def com_port_name(value):
+    """
+    Port name as the app uses it: the database stores bare digits ("3") next to
+    "COM3"/"com3"; all become "COM3". Non-COM names are only trimmed and uppercased.
+    format_com_port() turns the name into the device path for modpoll.
+    """
+    value = str(value or "").strip()
+    return f"COM{value}" if value.isdigit() else value.upper()
+
+
+def _units_sort_key(column, value):
+    if column in ("unit_id", "baudrate"):
+        return (0, int(value)) if value.isdigit() else (1, value.lower())
+    if column == "driver_addr":
+        numbers = [int(n) for n in _DIGIT_RUN_RE.findall(value)]
+        return (numbers[-1], numbers) if numbers else (float("inf"), [])
+    if column == "ip_address":
+        return tuple(int(n) for n in _DIGIT_RUN_RE.findall(value))
+    if column == "com_port":
+        return natural_sort_key(com_port_name(value))
+    return value.lower()
+
+
+class UnitsIndex:
+    """
+    Per-column indexes over the Units rows, built once per fetch.
+
+    The categorical columns map each lowercased value to its row positions. IP
+    addresses are kept sorted for prefix lookups, and slave addresses are indexed
+    by number. Sort orders are computed from precomputed keys the first time a
+    column is sorted, then cached, so a new query or sort costs set operations,
+    not a scan of the table.
+    """
+
+    def __init__(self, rows, columns):
+        self.columns = list(columns)
+        self.size = len(rows)
+        col = {name: i for i, name in enumerate(self.columns)}
+        self._values = {name: [row[i] for row in rows] for name, i in col.items()}
+
+        self._by_value = {}
+        for name in _UNITS_VALUE_INDEXED:
+            index = {}
+            normalize = com_port_name if name == "com_port" else str
+            for pos, value in enumerate(self._values.get(name, ())):
+                index.setdefault(normalize(value).strip().lower(), []).append(pos)
+            self._by_value[name] = index
+
+        self._by_address = {}
+        for pos, value in enumerate(self._values.get("driver_addr", ())):
+            number = unit_address_number(value)
+            if number is not None:
+                self._by_address.setdefault(number, []).append(pos)
+
+        self._ips = sorted((value.strip(), pos) for pos, value in enumerate(self._values.get("ip_address", ())) if value.strip())
+        self._ip_keys = [ip for ip, _pos in self._ips]
+
+        searchable = [c for c in ("unit_id", "unit_name", "driver_type", "driver_addr", "regulator_type", "com_port", "ip_address")
+                      if c in col]
+        self._haystack = ["\t".join(com_port_name(row[col[c]]) if c == "com_port" else row[col[c]] for c in searchable).lower()
+                          for row in rows]
+        self._sorted = {}
+
+    def _positions_for(self, column, value):
+        value = value.strip().lower()
+        if not value:
+            return None
+        if column == "ip_address":
+            lo = bisect.bisect_left(self._ip_keys, value)
+            hi = bisect.bisect_left(self._ip_keys, value + "\uffff")
+            return {pos for _ip, pos in self._ips[lo:hi]}
+        if column == "driver_addr" and value.isdigit():
+            return set(self._by_address.get(int(value), ()))
+        if column == "com_port":
+            value = com_port_name(value).lower()
+        index = self._by_value.get(column)
+        if index is not None:
+            exact = index.get(value)
+            if exact is not None and (column in ("com_port", "baudrate", "unit_id")):
+                return set(exact)
+            # Prefix match on the (few) distinct values: "driver:car" finds CAREL
+            found = set()
+            for key, positions in index.items():
+                if key.startswith(value):
+                    found.update(positions)
+            return found
+        values = self._values.get(column, ())
+        return {pos for pos, v in enumerate(values) if value in v.lower()}
+
+    def query(self, text):
+        """
+        Row positions matching `text`, or None when there is no query.
 
-# Deactivate automatic dpi awareness for smoother animations (Windows-specific)
-try:
-    ctk.deactivate_automatic_dpi_awareness()
-except:
-    pass  # Not critical if it fails
+        Terms are separated by spaces and must all match. A term `field:value`
+        (e.g. driver:carel com:3 ip:10.0.1. addr:93 parity:even; "a,b" means a or b)
+        uses the column indexes. A bare word matches any column as a substring.
+        """
+        result = None
+        for term in (text or "").split():
+            field, sep, value = term.partition(":")
+            if not sep:
+                field, sep, value = term.partition("=")
+            column = UNITS_QUERY_FIELDS.get(field.lower()) if sep else None
+            if column is None:
+                word = term.lower()
+                matches = {pos for pos, hay in enumerate(self._haystack) if word in hay} if result is None \
+                    else {pos for pos in result if word in self._haystack[pos]}
+            elif not value.strip(","):
+                continue  # "driver:" while typing: ignore the empty term
+            else:
+                matches = set()
+                for alternative in value.split(","):
+                    positions = self._positions_for(column, alternative)
+                    if positions is not None:
+                        matches |= positions
+            result = matches if result is None else (result & matches)
+            if not result:
+                return set()
+        return result
+
+    def sorted_positions(self, column, descending=False):
+        """Row positions ordered by `column` (empty values last in both directions)."""
+        key = (column, descending)
+        order = self._sorted.get(key)
+        if order is None:
+            values = self._values.get(column)
+            if values is None:
+                return list(range(self.size))
+            filled = [pos for pos, v in enumerate(values) if v.strip()]
+            empty = [pos for pos, v in enumerate(values) if not v.strip()]
+            keys = [_units_sort_key(column, v) for v in values]
+            filled.sort(key=keys.__getitem__, reverse=descending)
+            order = self._sorted[key] = filled + empty
+        return order
+
+
+# ---------------- Units Health Sweep ----------------
+
+UNITS_HEALTH_COLUMN = "health"  # Units table column written by the sweep (not part of the fetched rows)
+SWEEP_MAX_BUSES = 16  # buses (COM ports / TCP hosts) swept at the same time
+SWEEP_FLUSH_MS = 250  # sweep results are written to the table in batches this often
+
+
+class SweepTarget:
+    """One unit of a health sweep: its table item, bus, timeout key and modpoll arguments."""
+
+    __slots__ = ("iid", "bus", "key", "arguments", "floor_s")
+
+    def __init__(self, iid, bus, key, arguments, floor_s):
+        self.iid = iid
+        self.bus = bus
+        self.key = key
+        self.arguments = arguments
+        self.floor_s = floor_s
+
+
+def sweep_status_from_output(out):
+    """Classify one one-shot modpoll run: ("ok" | "timeout" | "error", short status text)."""
+    first_value = None
+    error = None
+    for raw in (out or "").splitlines():
+        line = raw.strip()
+        if first_value is None and _DATA_LINE_RE.match(line):
+            first_value = line
+            continue
+        lower = line.lower()
+        if "exception response" in lower:
+            return "ok", line.rstrip("!")  # The slave answered, just not with data
+        if "time-out" in lower or "timeout" in lower:
+            return "timeout", "No response"
+        if "serial port already open" in lower:
+            error = "Port in use"
+        elif "port or socket open error" in lower:
+            error = "Port open error"
+        elif "can't reach slave" in lower or "cant reach slave" in lower:
+            error = "Can't reach slave"
+        elif "checksum error" in lower and error is None:
+            error = "Checksum error"
+    if first_value is not None:
+        return "ok", first_value
+    return "error", error or "No data"
+
+
+# ---------------- Change-Only (Deadband) Filter ----------------
+
+class DeadbandFilter:
+    """
+    Per-register change filter for the result pipeline.
+
+    A value passes when it is the first for its key, when it moved by more than
+    the deadband (absolute, or percent of the last passed value; whichever is
+    larger), or when `heartbeat_s` elapsed since the key last passed. With both
+    thresholds at zero only exact repeats are suppressed.
+    """
+
+    def __init__(self, absolute=0.0, percent=0.0, heartbeat_s=60.0):
+        self.absolute = max(0.0, float(absolute))
+        self.percent = max(0.0, float(percent))
+        self.heartbeat_s = max(0.0, float(heartbeat_s))
+        self._last = {}  # key -> (value, monotonic time it last passed)
+        self.seen = 0
+        self.suppressed = 0
+
+    @classmethod
+    def from_text(cls, deadband_text, heartbeat_text):
+        """Build from UI text ("0.5" absolute or "2%" percent; heartbeat in seconds)."""
+        deadband_text = (deadband_text or "").strip()
+        heartbeat_text = (heartbeat_text or "").strip()
+        absolute = percent = 0.0
+        if deadband_text.endswith("%"):
+            percent = float(deadband_text[:-1].strip() or 0)
+        elif deadband_text:
+            absolute = float(deadband_text)
+        heartbeat_s = float(heartbeat_text) if heartbeat_text else 60.0
+        if absolute < 0 or percent < 0 or heartbeat_s < 0:
+            raise ValueError("deadband and heartbeat must not be negative")
+        return cls(absolute, percent, heartbeat_s)
+
+    def should_emit(self, key, value, now=None):
+        """Return True if `value` for `key` should be shown/logged, updating state if so."""
+        if now is None:
+            now = time.monotonic()
+        self.seen += 1
+        last = self._last.get(key)
+        if last is not None:
+            last_value, last_time = last
+            if not self.heartbeat_s or (now - last_time) < self.heartbeat_s:
+                try:
+                    delta = abs(value - last_value)
+                    threshold = max(self.absolute, abs(last_value) * self.percent / 100.0)
+                    changed = delta > threshold
+                except TypeError:
+                    changed = value != last_value  # Non-numeric values: exact comparison
+                if not changed:
+                    self.suppressed += 1
+                    return False
+        self._last[key] = (value, now)
+        return True
+
+
+# ---------------- Equipment Preset Search ----------------
+
+def _name_trigrams(text):
+    """Distinct character trigrams of a lowercase string."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class PresetSearchIndex:
+    """
+    Precomputed lowercase/trigram index over preset names.
+
+    search() ranks results: names starting with the term first, then names with a
+    word starting with it, then plain substring hits, then fuzzy (trigram overlap)
+    matches. Trigram postings narrow substring candidates for terms of 3+ chars,
+    so per-keystroke search stays in the low milliseconds at 10k presets.
+    """
+
+    # Fraction of the term's trigrams a name must share to count as a fuzzy hit
+    FUZZY_MIN_OVERLAP = 0.4
+    FUZZY_MAX_RESULTS = 50
+
+    def __init__(self, names):
+        self.names = list(names)
+        self._lower = [name.lower() for name in self.names]
+        self._spaced = [" " + name for name in self._lower]
+        postings = {}
+        for idx, name in enumerate(self._lower):
+            for tri in _name_trigrams(name):
+                postings.setdefault(tri, []).append(idx)
+        self._postings = postings
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, term):
+        """Return matching names, best-ranked first (all names for an empty term)."""
+        return self.search_counted(term)[0]
+
+    def search_counted(self, term):
+        """
+        Like search(), plus how many of the names actually contain the term; the
+        rest are fuzzy padding.
+        """
+        term = (term or "").lower().strip()
+        if not term:
+            return list(self.names), len(self.names)
+
+        term_trigrams = _name_trigrams(term)
+        if term_trigrams:
+            lists = sorted((self._postings.get(tri, ()) for tri in term_trigrams), key=len)
+            if lists[0]:
+                candidates = set(lists[0])
+                for other in lists[1:]:
+                    candidates.intersection_update(other)
+                    if not candidates:
+                        break
+                candidates = sorted(candidates)
+            else:
+                candidates = []
+        else:
+            candidates = range(len(self._lower))
+
+        lower = self._lower
+        spaced = self._spaced
+        word_term = " " + term
+        prefix_hits, word_hits, substring_hits = [], [], []
+        for idx in candidates:
+            name = lower[idx]
+            if name.startswith(term):
+                prefix_hits.append(idx)
+            elif word_term in spaced[idx]:
+                word_hits.append(idx)
+            elif term in name:
+                substring_hits.append(idx)
+
+        ranked = prefix_hits + word_hits + substring_hits
+        matched = len(ranked)
+        if term_trigrams and matched < self.FUZZY_MAX_RESULTS:
+            ranked.extend(self._fuzzy(term_trigrams, exclude=set(ranked)))
+        names = self.names
+        return [names[idx] for idx in ranked], matched
+
+    def _fuzzy(self, term_trigrams, exclude):
+        """Indices sharing enough trigrams with the term, best overlap first."""
+        counts = {}
+        for tri in term_trigrams:
+            for idx in self._postings.get(tri, ()):
+                counts[idx] = counts.get(idx, 0) + 1
+        needed = max(1, int(len(term_trigrams) * self.FUZZY_MIN_OVERLAP + 0.5))
+        hits = [(-n, idx) for idx, n in counts.items() if n >= needed and idx not in exclude]
+        hits.sort()
+        return [idx for _n, idx in hits[: self.FUZZY_MAX_RESULTS]]
+
+
+def sync_listbox_items(listbox, current, new):
+    """
+    Make a Listbox show `new` given it currently shows `current`, touching only the
+    changed middle section (common prefix/suffix rows are kept as-is).
+    """
+    if current == new:
+        return
+    n_cur, n_new = len(current), len(new)
+    prefix = 0
+    limit = min(n_cur, n_new)
+    while prefix < limit and current[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and current[n_cur - 1 - suffix] == new[n_new - 1 - suffix]:
+        suffix += 1
+    if n_cur - suffix > prefix:
+        listbox.delete(prefix, n_cur - suffix - 1)
+    inserted = new[prefix:n_new - suffix]
+    if inserted:
+        listbox.insert(prefix, *inserted)
 
 
 class ModpollingTool:
     def __init__(self, root):
+        load_gui_toolkit()
         self.root = root
+        # Startup milestones (seconds since _STARTUP_T0), reported by --startup-trace
+        self.startup_marks = {}
         self.root.title("ModPolling Tool")
         
         # Set default window size
@@ -70,11 +2745,27 @@ class ModpollingTool:
         # Batched terminal writes (thread-safe queue for real-time output without UI freeze)
         self.terminal_write_queue = queue.Queue()
         self.terminal_flush_scheduled = False
+        self._terminal_queued_at = 0.0  # Diagnostics: when the oldest unflushed line was queued
         self.last_status_update = None  # Throttle status indicator updates
         self.last_status_time = 0  # Time of last status update
         
         # Units data and filter state
         self.units_rows = []
+        # Units Treeview diff state: iid (unit_id) -> displayed values / stripe tag; attached iids in order
+        self._units_item_values = {}
+        self._units_item_tags = {}
+        self._units_visible = []
+        self._units_row_iids = []  # iid of each stored row, by position
+        # Query bar / header sort: per-column index (rebuilt lazily after a fetch)
+        self.units_query = ""
+        self.units_sort = None  # (column, descending)
+        self._units_index = None
+        # Health sweep: Health cell updates (iid -> text) waiting for the next batched table flush
+        self.sweep_active = False
+        self._sweep_pending = {}
+        self._sweep_flush_scheduled = False
+        self._sweep_lock = threading.Lock()
+        self._sweep_procs = set()
         # Default: show only units that have baudrate (i.e., Modbus-supported rows),
         # and let the user toggle to "Show All Units".
         self.hide_no_baudrate = True
@@ -87,86 +2778,10 @@ class ModpollingTool:
         # Ensure modpoll.exe exists, download if needed
         self.ensure_modpoll_exists()
 
-        # Equipment settings
-        self.equipment_settings = {
-            "ADAM": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "AERMEC": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "AKCC250": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "AKCC350": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "AKCC55": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "AKCC550A": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "AKPC420": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "ANYBUS": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "ATLANTIUM": {"baudrate": "115200", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "AWD3": {"baudrate": "19200", "stop_bits": "2", "data_bits": "8", "parity": "none"},
-            "BELIMO": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "CAREL": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "CIAT2": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "CIRCUTOR": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "CLIMAVENTA": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "CLIVET": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "CORRIGO": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "CORRIGO34": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "CVM10": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "CVM96": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "CVMC": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "DAIKIN": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "none"},  # '0A' treated as 'none'
-            "DIXELL": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "DUPLINE": {"baudrate": "115200", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "EDMK": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "Carlo Gavazzi EM100": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "Carlo Gavazzi EM21": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "Carlo Gavazzi EM210": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "Carlo Gavazzi EM23": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "Carlo Gavazzi EM24": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "Carlo Gavazzi EM24TCP": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "Carlo Gavazzi EM26": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "Carlo Gavazzi EM270": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "Carlo Gavazzi EM330": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "Carlo Gavazzi EM4": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "Carlo Gavazzi EM540": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "EW": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "FLAKTWOODS": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "FLEXIT": {"baudrate": "9600", "stop_bits": "2", "data_bits": "8", "parity": "none"},
-            "GREENCOOL": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "GRFOS": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "HECU": {"baudrate": "19200", "stop_bits": "2", "data_bits": "8", "parity": "none"},
-            "IEM3250": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "INEPRO": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "INTESIS": {"baudrate": "9600", "stop_bits": "2", "data_bits": "8", "parity": "none"},
-            "IR33PLUS": {"baudrate": "19200", "stop_bits": "2", "data_bits": "8", "parity": "none"},
-            "IVPRODUKT": {"baudrate": "9600", "stop_bits": "2", "data_bits": "8", "parity": "none"},
-            "IWT": {"baudrate": "57600", "stop_bits": "2", "data_bits": "8", "parity": "none"},
-            "KAMSTRUP": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "LANDIS": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "LDS": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "LEMMENS": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "LIEBHERR": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "MKD": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "MODBUS": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "NEMO96": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "NETAVENT": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "NOVAGG": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "OJEXHAUST": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "PIIGAB": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "PMGOLD": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "POWERTAG": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "PR100T": {"baudrate": "19200", "stop_bits": "2", "data_bits": "8", "parity": "none"},
-            "QALCOSONIC": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "REGIN": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "REGINRCF": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "SCHNEIDER": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "SLV AHT": {"baudrate": "19200", "stop_bits": "1", "data_bits": "8", "parity": "even"},
-            "SOLARLOG": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "SWEGON": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "TROX": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "UH50": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "UNISAB3": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "VENT": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "VIESSMANN": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "WM14": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-            "WTRANS": {"baudrate": "9600", "stop_bits": "1", "data_bits": "8", "parity": "none"},
-        }
+        # Equipment settings: built-in presets now; external preset files are merged in
+        # after the first frame (see _load_preset_library) and hot-reloaded on change.
+        self.equipment_settings = dict(BUILTIN_EQUIPMENT_PRESETS)
+        self.preset_library = PresetLibrary(BUILTIN_EQUIPMENT_PRESETS)
 
         # Flag to track equipment pane visibility
         self.equipment_pane_visible = False
@@ -182,6 +2797,27 @@ class ModpollingTool:
         self.current_start_reference = None
         self.last_seen_reference = None  # Track last seen [ref]: to detect cycle repeats
 
+        # Register map decoding (from the selected preset's "register_map")
+        self.active_register_map = None
+        self.compiled_register_map = None
+        self._register_block = {}  # ref -> raw 16-bit value for the current response block
+
+        # Change-only display: DeadbandFilter while enabled, attempt header held until something prints
+        self.deadband_filter = None
+        self._pending_attempt_line = None
+
+        # Poll time beyond the wire time, measured by the last RTU session (feeds the bus capacity planner)
+        self.measured_turnaround_s = None
+
+        # Diagnostics: per-stage timers (off by default), metrics window, running profile
+        self.stage_timers = StageTimers()
+        self.metrics_window = None
+        self.profile_running = False
+
+        # Learned per-slave request timeouts / dead-slave backoff; outcome of the last parsed run
+        self.timeout_tracker = AdaptiveTimeoutTracker()
+        self.last_poll_outcome = None
+
         # Initialize blinking variables
         self.blinking = False
         self.blink_job = None
@@ -199,10 +2835,15 @@ class ModpollingTool:
 
         # Configure ttk styles for modern look
         self.setup_ttk_styles()
-        
+
+        self.startup_marks["init"] = time.perf_counter() - _STARTUP_T0
         self.create_widgets()
+        self.startup_marks["widgets"] = time.perf_counter() - _STARTUP_T0
         self.update_log()
 
+        # External preset files are not needed for the first frame
+        self.root.after(200, self._load_preset_library)
+
     def setup_ttk_styles(self):
         """Setup CustomTkinter appearance (no longer using TTK styles)"""
         # CustomTkinter handles styling automatically
@@ -769,12 +3410,14 @@ class ModpollingTool:
         scrollbar.grid(row=0, column=1, sticky="NS", padx=(0, 8), pady=8)
         self.listbox_equipment.configure(yscrollcommand=scrollbar.set)
 
-        # Store original equipment list for filtering
+        # Store original equipment list for filtering (+ search index)
         self.all_equipment = sorted(self.equipment_settings.keys())
+        self.equipment_index = PresetSearchIndex(self.all_equipment)
         
         # Populate equipment list in alphabetical order
-        for equipment in self.all_equipment:
-            self.listbox_equipment.insert(tk.END, equipment)
+        self.listbox_equipment.insert(tk.END, *self.all_equipment)
+        # Rows currently shown in the listbox (lets filter_equipment apply diffs)
+        self.equipment_display = list(self.all_equipment)
 
         # Bind selection change event to update command immediately
         self.listbox_equipment.bind('<<ListboxSelect>>', self.on_equipment_selection_change)
@@ -988,18 +3631,26 @@ class ModpollingTool:
         self.entry_slave_address.insert(0, "1")
 
         # ---------------- Advanced Settings Widgets (CustomTkinter) ----------------
+        # Scrollable body: the Advanced options outgrow the tab height on small windows
+        self.advanced_body = ctk.CTkScrollableFrame(
+            self.advanced_tab,
+            fg_color="transparent",
+            scrollbar_button_color=self.bg_tertiary,
+            scrollbar_button_hover_color=self.accent_primary
+        )
+        self.advanced_body.pack(fill="both", expand=True)
         # Add column configuration for advanced tab
-        self.advanced_tab.grid_columnconfigure(1, weight=1)
+        self.advanced_body.grid_columnconfigure(1, weight=1)
         
         # Data Bits label
         ctk.CTkLabel(
-            self.advanced_tab,
+            self.advanced_body,
             text="Data Bits (-d):",
             text_color=self.text_primary,
             font=("Segoe UI", 11)
         ).grid(column=0, row=0, sticky="W", padx=15, pady=(15, 10))
         self.cmb_databits = ctk.CTkComboBox(
-            self.advanced_tab,
+            self.advanced_body,
             width=220,
             height=40,
             corner_radius=10,
@@ -1023,13 +3674,13 @@ class ModpollingTool:
 
         # Stop Bits label
         ctk.CTkLabel(
-            self.advanced_tab,
+            self.advanced_body,
             text="Stop Bits (-s):",
             text_color=self.text_primary,
             font=("Segoe UI", 11)
         ).grid(column=0, row=1, sticky="W", padx=15, pady=(10, 10))
         self.cmb_stopbits = ctk.CTkComboBox(
-            self.advanced_tab,
+            self.advanced_body,
             width=220,
             height=40,
             corner_radius=10,
@@ -1053,13 +3704,13 @@ class ModpollingTool:
 
         # Start Reference label
         ctk.CTkLabel(
-            self.advanced_tab,
+            self.advanced_body,
             text="Start Reference (-r):",
             text_color=self.text_primary,
             font=("Segoe UI", 11)
         ).grid(column=0, row=2, sticky="W", padx=15, pady=(10, 10))
         self.entry_start_reference = ctk.CTkEntry(
-            self.advanced_tab,
+            self.advanced_body,
             width=220,
             height=40,
             corner_radius=10,
@@ -1075,13 +3726,13 @@ class ModpollingTool:
 
         # Number of Registers label
         ctk.CTkLabel(
-            self.advanced_tab,
+            self.advanced_body,
             text="Number of Registers (-c):",
             text_color=self.text_primary,
             font=("Segoe UI", 11)
         ).grid(column=0, row=3, sticky="W", padx=15, pady=(10, 10))
         self.entry_num_values = ctk.CTkEntry(
-            self.advanced_tab,
+            self.advanced_body,
             width=220,
             height=40,
             corner_radius=10,
@@ -1097,13 +3748,13 @@ class ModpollingTool:
 
         # Register Data Type label
         ctk.CTkLabel(
-            self.advanced_tab,
+            self.advanced_body,
             text="Register Data Type (-t):",
             text_color=self.text_primary,
             font=("Segoe UI", 11)
         ).grid(column=0, row=4, sticky="W", padx=15, pady=(10, 10))
         self.entry_register_data_type = ctk.CTkEntry(
-            self.advanced_tab,
+            self.advanced_body,
             width=220,
             height=40,
             corner_radius=10,
@@ -1119,13 +3770,13 @@ class ModpollingTool:
 
         # Modbus TCP/IP label
         ctk.CTkLabel(
-            self.advanced_tab,
+            self.advanced_body,
             text="Modbus TCP/IP (-m tcp):",
             text_color=self.text_primary,
             font=("Segoe UI", 11)
         ).grid(column=0, row=5, sticky="W", padx=15, pady=(10, 10))
         self.entry_modbus_tcp = ctk.CTkEntry(
-            self.advanced_tab,
+            self.advanced_body,
             width=220,
             height=40,
             corner_radius=10,
@@ -1138,9 +3789,110 @@ class ModpollingTool:
         )
         self.entry_modbus_tcp.grid(column=1, row=5, padx=5, pady=5, sticky="W")
 
+        # Change-only display (per-register deadband + heartbeat)
+        ctk.CTkLabel(
+            self.advanced_body,
+            text="Change-only display:",
+            text_color=self.text_primary,
+            font=("Segoe UI", 11)
+        ).grid(column=0, row=6, sticky="W", padx=15, pady=(10, 10))
+        self.change_only_var = tk.BooleanVar(value=False)
+        self.switch_change_only = ctk.CTkSwitch(
+            self.advanced_body,
+            text="",
+            variable=self.change_only_var,
+            progress_color=self.accent_primary,
+            button_color=self.text_primary,
+            button_hover_color=self.accent_glow,
+            fg_color=self.bg_tertiary
+        )
+        self.switch_change_only.grid(column=1, row=6, padx=5, pady=5, sticky="W")
+
+        ctk.CTkLabel(
+            self.advanced_body,
+            text="Deadband / Heartbeat (s):",
+            text_color=self.text_primary,
+            font=("Segoe UI", 11)
+        ).grid(column=0, row=7, sticky="W", padx=15, pady=(10, 10))
+        deadband_frame = ctk.CTkFrame(self.advanced_body, fg_color="transparent")
+        deadband_frame.grid(column=1, row=7, padx=5, pady=5, sticky="W")
+        self.entry_deadband = ctk.CTkEntry(
+            deadband_frame,
+            width=105,
+            height=40,
+            corner_radius=10,
+            border_width=2,
+            border_color=self.bg_tertiary,
+            fg_color=self.bg_tertiary,
+            text_color=self.text_primary,
+            font=("Segoe UI", 11),
+            placeholder_text="0.5 or 2%"
+        )
+        self.entry_deadband.pack(side="left", padx=(0, 10))
+        self.entry_heartbeat = ctk.CTkEntry(
+            deadband_frame,
+            width=105,
+            height=40,
+            corner_radius=10,
+            border_width=2,
+            border_color=self.bg_tertiary,
+            fg_color=self.bg_tertiary,
+            text_color=self.text_primary,
+            font=("Segoe UI", 11),
+            placeholder_text="Heartbeat"
+        )
+        self.entry_heartbeat.pack(side="left")
+        self.entry_heartbeat.insert(0, "60")
+
+        # Scan list: several -r/-c blocks with their own poll periods (empty = single block every 1 s)
+        ctk.CTkLabel(
+            self.advanced_body,
+            text="Scan list (ref:count@s):",
+            text_color=self.text_primary,
+            font=("Segoe UI", 11)
+        ).grid(column=0, row=8, sticky="W", padx=15, pady=(10, 10))
+        self.entry_scan_list = ctk.CTkEntry(
+            self.advanced_body,
+            width=220,
+            height=40,
+            corner_radius=10,
+            border_width=2,
+            border_color=self.bg_tertiary,
+            fg_color=self.bg_tertiary,
+            text_color=self.text_primary,
+            font=("Segoe UI", 11),
+            placeholder_text="100:10@0.2, 200:4@30"
+        )
+        self.entry_scan_list.grid(column=1, row=8, padx=5, pady=5, sticky="W")
+
+        # Capture/replay and diagnostics rows (9-11) are built on first open of the tab:
+        # see _ensure_advanced_extras_built(), triggered from _monitor_settings_tab().
+        self.capture_var = tk.BooleanVar(value=False)
+        self.diagnostics_var = tk.BooleanVar(value=False)
+        self.advanced_extras_built = False
+
+        # Continuous mode: one long-lived modpoll under a pseudo-terminal instead of a -1 run per poll
+        ctk.CTkLabel(
+            self.advanced_body,
+            text="Continuous (PTY):",
+            text_color=self.text_primary,
+            font=("Segoe UI", 11)
+        ).grid(column=0, row=12, sticky="W", padx=15, pady=(10, 10))
+        self.continuous_var = tk.BooleanVar(value=False)
+        self.switch_continuous = ctk.CTkSwitch(
+            self.advanced_body,
+            text="",
+            variable=self.continuous_var,
+            progress_color=self.accent_primary,
+            button_color=self.text_primary,
+            button_hover_color=self.accent_glow,
+            fg_color=self.bg_tertiary
+        )
+        self.switch_continuous.grid(column=1, row=12, padx=5, pady=5, sticky="W")
+
         # Adjust column weights in Advanced Tab for better layout
-        self.advanced_tab.columnconfigure(0, weight=1)
-        self.advanced_tab.columnconfigure(1, weight=3)
+        self.advanced_body.columnconfigure(0, weight=1)
+        self.advanced_body.columnconfigure(1, weight=3)
 
         # ---------------- Polling Buttons and Status Indicator ----------------
         # Button frame - CustomTkinter
@@ -1231,233 +3983,9 @@ class ModpollingTool:
             width=2
         )
         
-        # ---------------- Units Tab Widgets (CustomTkinter) ----------------
-        # Controls frame (row 0)
-        units_controls = ctk.CTkFrame(self.units_tab, fg_color="transparent")
-        units_controls.grid(row=0, column=0, sticky="EW", padx=15, pady=(15, 10))
-        
-        self.btn_get_units = ctk.CTkButton(
-            units_controls,
-            text="Get Units Data",
-            command=self.handle_get_units,
-            height=45,
-            width=170,
-            corner_radius=12,
-            fg_color=self.accent_primary,
-            hover_color=self.accent_secondary,
-            text_color="white",
-            font=("Segoe UI", 11, "bold"),
-            border_width=2,
-            border_color=self.accent_glow
-        )
-        self.btn_get_units.pack(side=tk.LEFT, padx=(0, 10))
-        
-        # Toggle button to hide/show units without baudrate
-        self.btn_toggle_baud_filter = ctk.CTkButton(
-            units_controls,
-            # Button label describes the *action* (what happens when you click it).
-            # When we're currently hiding rows without baudrate, user can click to show all.
-            text=("🔍  Show All Units" if self.hide_no_baudrate else "✅  Modbus-Supported"),
-            command=self.toggle_hide_no_baudrate,
-            width=180,
-            height=45,
-            corner_radius=12,
-            fg_color=self.bg_tertiary,
-            hover_color=self.accent_primary,
-            text_color=self.text_primary,
-            font=("Segoe UI", 11, "bold"),
-            border_width=2,
-            border_color=self.bg_card
-        )
-        self.btn_toggle_baud_filter.pack(side=tk.LEFT)
-
-        # Apply preset from selected unit (COM / -b / -p)
-        self.btn_apply_unit_preset = ctk.CTkButton(
-            units_controls,
-            text="Apply Preset",
-            command=self.apply_selected_unit_preset,
-            width=160,
-            height=45,
-            corner_radius=12,
-            fg_color=self.bg_tertiary,
-            hover_color=self.accent_primary,
-            text_color=self.text_primary,
-            font=("Segoe UI", 11, "bold"),
-            border_width=2,
-            border_color=self.bg_card
-        )
-        self.btn_apply_unit_preset.pack(side=tk.LEFT, padx=(10, 0))
-        
-        # Table (Treeview) with scrollbar (row 1)
-        units_table_frame = ctk.CTkFrame(self.units_tab, fg_color=self.bg_primary, corner_radius=10)
-        units_table_frame.grid(row=1, column=0, sticky="NSEW", padx=10, pady=(0, 10))
-        self.units_tab.grid_rowconfigure(1, weight=1)
-        self.units_tab.grid_columnconfigure(0, weight=1)
-        
-        # Configure the table frame to be expandable
-        units_table_frame.rowconfigure(0, weight=1)
-        units_table_frame.columnconfigure(0, weight=1)
-        
-        # Column order: move IP Address to the end (after Parity)
-        columns = ("unit_id", "unit_name", "driver_type", "driver_addr", "regulator_type", "com_port", "baudrate", "parity", "ip_address")
-        
-        # Configure Treeview style for modern dark theme - with proper dark colors
-        tree_style = ttk.Style()
-        tree_style.theme_use('clam')  # Use clam as base for better styling
-        
-        tree_style.configure("Modern.Treeview",
-                            background=self.bg_primary,
-                            foreground=self.text_primary,
-                            fieldbackground=self.bg_primary,
-                            bordercolor=self.bg_tertiary,
-                            borderwidth=1,
-                            relief='solid',
-                            font=("Segoe UI", 10))
-        tree_style.configure("Modern.Treeview.Heading",
-                            background=self.bg_tertiary,
-                            foreground=self.text_primary,
-                            borderwidth=1,
-                            bordercolor=self.bg_tertiary,
-                            relief='solid',
-                            font=("Segoe UI", 10, "bold"))
-        tree_style.map("Modern.Treeview",
-                      background=[('selected', self.accent_primary)],
-                      foreground=[('selected', self.bg_primary)])
-        tree_style.map("Modern.Treeview.Heading",
-                      background=[('active', self.bg_secondary)],
-                      foreground=[('active', self.text_primary)])
-        
-        # Apply row striping for better readability + clearer separation
-        tree_style.configure("Modern.Treeview", rowheight=30)
-        tree_style.configure("Modern.Treeview.Item", bordercolor=self.bg_tertiary, borderwidth=1, relief="solid")
-        
-        self.units_tree = ttk.Treeview(units_table_frame, columns=columns, show="headings", style="Modern.Treeview")
-        
-        # Configure row tags for striping
-        self.units_tree.tag_configure('oddrow', background=self.bg_primary)
-        self.units_tree.tag_configure('evenrow', background=self.bg_tertiary)
-        # Define user-friendly column headers
-        column_headers = {
-            "unit_id": "Unit ID",
-            "unit_name": "Unit Name", 
-            "driver_type": "Driver Type",
-            "driver_addr": "Driver Address",
-            "regulator_type": "Regulator Type",
-            "ip_address": "IP Address",
-            "com_port": "COM Port",
-            "baudrate": "Baudrate",
-            "parity": "Parity"
-        }
-        
-        # Set column widths (minimums). Keep IP Address compact.
-        column_widths = {
-            "unit_id": 200,
-            "unit_name": 300, 
-            "driver_type": 250,
-            "driver_addr": 250,
-            "regulator_type": 300,
-            "ip_address": 170,  # IP Address column (keep compact)
-            "com_port": 200,
-            "baudrate": 160,
-            "parity": 140
-        }
-        
-        for col in columns:
-            self.units_tree.heading(col, text=column_headers.get(col, col), anchor="center")
-            # Set columns to auto-size to content with minimum width and center alignment
-            if col == "ip_address":
-                # IP should not expand; keep it close to actual IP length
-                self.units_tree.column(
-                    col,
-                    anchor="center",
-                    minwidth=120,
-                    width=column_widths.get(col, 170),
-                    stretch=False
-                )
-            else:
-                self.units_tree.column(col, anchor="center", minwidth=100, stretch=True)
-        
-        # Create scrollbars - both vertical and horizontal
-        units_v_scrollbar = ttk.Scrollbar(units_table_frame, orient="vertical", command=self.units_tree.yview)
-        units_h_scrollbar = ttk.Scrollbar(units_table_frame, orient="horizontal", command=self.units_tree.xview)
-        
-        # Keep a no-op separator updater to avoid geometry glitches after data refresh.
-        # Native Treeview separators are more stable than custom overlay lines.
-        self.units_column_separators = []
-
-        def update_units_column_separators():
-            return
-
-        self.update_units_column_separators = update_units_column_separators
-
-        def _xscroll_proxy(first, last):
-            units_h_scrollbar.set(first, last)
-
-        # Configure the treeview to work with both scrollbars (+ keep separators synced)
-        self.units_tree.configure(yscrollcommand=units_v_scrollbar.set, xscrollcommand=_xscroll_proxy)
-        
-        # Use grid layout for proper resizing behavior with padding
-        self.units_tree.grid(row=0, column=0, sticky="NSEW", padx=10, pady=10)
-        units_v_scrollbar.grid(row=0, column=1, sticky="NS", pady=10, padx=(0, 10))
-        units_h_scrollbar.grid(row=1, column=0, sticky="EW", padx=10, pady=(0, 10))
-        
-        # Configure grid weights for the table frame
-        units_table_frame.columnconfigure(0, weight=1)
-        units_table_frame.columnconfigure(1, weight=0)
-        units_table_frame.rowconfigure(0, weight=1)
-        units_table_frame.rowconfigure(1, weight=0)  # Horizontal scrollbar row doesn't expand
-        
-        # Ensure the treeview can expand to show all content
-        def on_treeview_resize(event):
-            # Keep separators aligned after resize (lightweight)
-            update_units_column_separators()
-        
-        self.units_tree.bind("<Configure>", on_treeview_resize)
-        # Fill command inputs when selecting a unit row
-        self.units_tree.bind('<<TreeviewSelect>>', self.on_units_selection_from_table)
-        
-        # Function to auto-size columns to fit content exactly
-        def auto_size_columns():
-            """Automatically size columns to fit the biggest word in each column with no extra space."""
-            try:
-                # Get all items in the treeview
-                items = self.units_tree.get_children()
-                if not items:
-                    return
-                
-                # Calculate optimal width for each column
-                for col in columns:
-                    # Start with header width
-                    header_text = column_headers.get(col, col)
-                    header_width = len(header_text) * 8  # Approximate character width
-                    max_width = header_width
-                    
-                    # Check all values in this column
-                    for item in items:
-                        value = self.units_tree.set(item, col)
-                        if value:
-                            # Calculate width needed for this value
-                            value_width = len(str(value)) * 8  # Approximate character width
-                            max_width = max(max_width, value_width)
-                    
-                    # Set column width to exactly fit content (minimal padding)
-                    optimal_width = max_width + 5  # Minimal padding (reduced from 10 to 5)
-                    
-                    # Get minimum width for this column (especially important for IP Address)
-                    min_width = column_widths.get(col, 200)
-                    
-                    # Set column width to the larger of: content width or minimum width
-                    optimal_width = max(optimal_width, min_width)
-                    
-                    self.units_tree.column(col, width=optimal_width)
-                # Keep separators aligned after auto-size
-                update_units_column_separators()
-                    
-            except Exception as e:
-                print(f"Error in auto_size_columns: {e}")
-        
-        # Store the auto-size function for later use
-        self.auto_size_columns = auto_size_columns
+        # Units tab contents (Treeview, styles, auto-size) are built on first open:
+        # see _ensure_units_tab_built(), triggered from _monitor_settings_tab().
+        self.units_tab_built = False
 
         # ---------------- Log Frame (Column 2) - Modern card style ----------------
         self.frame_log = ctk.CTkFrame(
@@ -1508,9 +4036,6 @@ class ModpollingTool:
         
         # (Apply button removed; Start Polling now uses edited command directly)
         
-        # Determine best monospace font available
-        mono_font = self.get_best_monospace_font()
-        
         # Terminal (highest responsiveness): line-based Listbox with per-line colors
         # This is significantly faster than a Text widget for high-frequency appends.
         self.terminal_container = ctk.CTkFrame(
@@ -1597,7 +4122,7 @@ class ModpollingTool:
         footer_label_left = ctk.CTkButton(
             footer_frame,
             text="📖  Modpoll Guide",
-            command=lambda: webbrowser.open(
+            command=lambda: open_url(
                 "https://iwmac.zendesk.com/hc/en-gb/articles/13020280416796-Installasjon-Modpoll-Guide"
             ),
             fg_color="transparent",
@@ -1610,39 +4135,459 @@ class ModpollingTool:
         )
         footer_label_left.pack(side='left', padx=20, pady=12)
 
-        # Keep footer links informational only (avoid direct executable download links).
-        footer_label_center = ctk.CTkButton(
-            footer_frame,
-            text="🌐  Project Releases",
-            command=lambda: webbrowser.open(
-                "https://github.com/spenz91/ModpollingTool/releases"
-            ),
-            fg_color="transparent",
-            hover_color=self.bg_card,
-            text_color=self.accent_glow,
-            font=("Segoe UI", 11),
-            height=35,
-            corner_radius=10,
-            anchor="w"
-        )
-        footer_label_center.pack(side='left', padx=20, pady=12)
+        # Keep footer links informational only (avoid direct executable download links).
+        footer_label_center = ctk.CTkButton(
+            footer_frame,
+            text="🌐  Project Releases",
+            command=lambda: open_url(
+                "https://github.com/spenz91/ModpollingTool/releases"
+            ),
+            fg_color="transparent",
+            hover_color=self.bg_card,
+            text_color=self.accent_glow,
+            font=("Segoe UI", 11),
+            height=35,
+            corner_radius=10,
+            anchor="w"
+        )
+        footer_label_center.pack(side='left', padx=20, pady=12)
+
+        # (Removed) Copyright label text per request
+
+        # Add event bindings for automatic command preview updates (after all widgets are created)
+        self.setup_command_preview_bindings()
+
+        # ComboBox arrow flips up/down + smooth arrow transition
+        self.setup_combobox_arrow_behavior()
+        # Smooth dropdown open/close (slide + fade) for comboboxes
+        self.setup_smooth_combobox_dropdowns()
+        
+        # Display welcome message
+        self.display_welcome_message()
+
+        # Keep Units tab snappy/clean: hide terminal + polling controls when on Units tab
+        self._last_settings_tab = None
+        self._monitor_settings_tab()
+
+    def _ensure_units_tab_built(self):
+        """Build the Units tab contents the first time they are needed."""
+        if self.units_tab_built:
+            return
+        self.units_tab_built = True
+        self._build_units_tab()
+        # Rows may have arrived before the table existed
+        if self.units_rows:
+            self.refresh_units_table()
+
+    def _ensure_advanced_extras_built(self):
+        """Build the Advanced tab's capture/replay and diagnostics rows the first time the tab is shown."""
+        if self.advanced_extras_built:
+            return
+        self.advanced_extras_built = True
+        self._build_advanced_extras()
+
+    def _build_advanced_extras(self):
+        """Create the capture, replay and diagnostics rows of the Advanced tab."""
+        # Capture polling sessions to a replayable file; replay a capture through the parser
+        ctk.CTkLabel(
+            self.advanced_body,
+            text="Capture session:",
+            text_color=self.text_primary,
+            font=("Segoe UI", 11)
+        ).grid(column=0, row=9, sticky="W", padx=15, pady=(10, 10))
+        self.switch_capture = ctk.CTkSwitch(
+            self.advanced_body,
+            text="",
+            variable=self.capture_var,
+            progress_color=self.accent_primary,
+            button_color=self.text_primary,
+            button_hover_color=self.accent_glow,
+            fg_color=self.bg_tertiary
+        )
+        self.switch_capture.grid(column=1, row=9, padx=5, pady=5, sticky="W")
+
+        ctk.CTkLabel(
+            self.advanced_body,
+            text="Replay capture:",
+            text_color=self.text_primary,
+            font=("Segoe UI", 11)
+        ).grid(column=0, row=10, sticky="W", padx=15, pady=(10, 10))
+        replay_frame = ctk.CTkFrame(self.advanced_body, fg_color="transparent")
+        replay_frame.grid(column=1, row=10, padx=5, pady=5, sticky="W")
+        self.cmb_replay_speed = ctk.CTkComboBox(
+            replay_frame,
+            width=90,
+            height=40,
+            corner_radius=10,
+            border_width=2,
+            border_color=self.bg_tertiary,
+            fg_color=self.bg_tertiary,
+            button_color=self.accent_primary,
+            button_hover_color=self.accent_secondary,
+            text_color=self.text_primary,
+            font=("Segoe UI", 11),
+            values=["1x", "10x", "max"],
+            state="readonly",
+            dropdown_fg_color=self.bg_secondary,
+            dropdown_text_color=self.text_primary,
+            dropdown_hover_color=self.accent_primary,
+            dropdown_font=("Segoe UI", 11),
+            justify="left"
+        )
+        self.cmb_replay_speed.set("1x")
+        self.cmb_replay_speed.pack(side="left", padx=(0, 10))
+        ctk.CTkButton(
+            replay_frame,
+            text="Open...",
+            command=self.choose_replay_file,
+            width=110,
+            height=40,
+            corner_radius=10,
+            fg_color=self.bg_tertiary,
+            hover_color=self.accent_primary,
+            text_color=self.text_primary,
+            font=("Segoe UI", 11, "bold"),
+            border_width=2,
+            border_color=self.bg_card
+        ).pack(side="left")
+
+        # Diagnostics: stage timers + metrics / profiler window
+        ctk.CTkLabel(
+            self.advanced_body,
+            text="Diagnostics:",
+            text_color=self.text_primary,
+            font=("Segoe UI", 11)
+        ).grid(column=0, row=11, sticky="W", padx=15, pady=(10, 10))
+        diagnostics_frame = ctk.CTkFrame(self.advanced_body, fg_color="transparent")
+        diagnostics_frame.grid(column=1, row=11, padx=5, pady=5, sticky="W")
+        ctk.CTkSwitch(
+            diagnostics_frame,
+            text="",
+            variable=self.diagnostics_var,
+            command=self.toggle_diagnostics,
+            progress_color=self.accent_primary,
+            button_color=self.text_primary,
+            button_hover_color=self.accent_glow,
+            fg_color=self.bg_tertiary
+        ).pack(side="left", padx=(0, 10))
+        ctk.CTkButton(
+            diagnostics_frame,
+            text="Metrics...",
+            command=self.open_metrics_view,
+            width=110,
+            height=40,
+            corner_radius=10,
+            fg_color=self.bg_tertiary,
+            hover_color=self.accent_primary,
+            text_color=self.text_primary,
+            font=("Segoe UI", 11, "bold"),
+            border_width=2,
+            border_color=self.bg_card
+        ).pack(side="left")
+
+    def _build_units_tab(self):
+        """Create the Units tab widgets (Treeview, styles, column sizing)."""
+        # ---------------- Units Tab Widgets (CustomTkinter) ----------------
+        # Controls frame (row 0)
+        units_controls = ctk.CTkFrame(self.units_tab, fg_color="transparent")
+        units_controls.grid(row=0, column=0, sticky="EW", padx=15, pady=(15, 10))
+        
+        self.btn_get_units = ctk.CTkButton(
+            units_controls,
+            text="Get Units Data",
+            command=self.handle_get_units,
+            height=45,
+            width=170,
+            corner_radius=12,
+            fg_color=self.accent_primary,
+            hover_color=self.accent_secondary,
+            text_color="white",
+            font=("Segoe UI", 11, "bold"),
+            border_width=2,
+            border_color=self.accent_glow
+        )
+        self.btn_get_units.pack(side=tk.LEFT, padx=(0, 10))
+        
+        # Toggle button to hide/show units without baudrate
+        self.btn_toggle_baud_filter = ctk.CTkButton(
+            units_controls,
+            # Button label describes the *action* (what happens when you click it).
+            # When we're currently hiding rows without baudrate, user can click to show all.
+            text=("🔍  Show All Units" if self.hide_no_baudrate else "✅  Modbus-Supported"),
+            command=self.toggle_hide_no_baudrate,
+            width=180,
+            height=45,
+            corner_radius=12,
+            fg_color=self.bg_tertiary,
+            hover_color=self.accent_primary,
+            text_color=self.text_primary,
+            font=("Segoe UI", 11, "bold"),
+            border_width=2,
+            border_color=self.bg_card
+        )
+        self.btn_toggle_baud_filter.pack(side=tk.LEFT)
+
+        # Apply preset from selected unit (COM / -b / -p)
+        self.btn_apply_unit_preset = ctk.CTkButton(
+            units_controls,
+            text="Apply Preset",
+            command=self.apply_selected_unit_preset,
+            width=160,
+            height=45,
+            corner_radius=12,
+            fg_color=self.bg_tertiary,
+            hover_color=self.accent_primary,
+            text_color=self.text_primary,
+            font=("Segoe UI", 11, "bold"),
+            border_width=2,
+            border_color=self.bg_card
+        )
+        self.btn_apply_unit_preset.pack(side=tk.LEFT, padx=(10, 0))
+
+        # Estimate the poll cycle time of every RS-485 line in the table
+        self.btn_bus_capacity = ctk.CTkButton(
+            units_controls,
+            text="Bus Capacity",
+            command=self.plan_bus_capacity,
+            width=160,
+            height=45,
+            corner_radius=12,
+            fg_color=self.bg_tertiary,
+            hover_color=self.accent_primary,
+            text_color=self.text_primary,
+            font=("Segoe UI", 11, "bold"),
+            border_width=2,
+            border_color=self.bg_card
+        )
+        self.btn_bus_capacity.pack(side=tk.LEFT, padx=(10, 0))
+
+        # Poll every unit once (optionally repeating) and show the result in the Health column
+        self.btn_sweep_units = ctk.CTkButton(
+            units_controls,
+            text="Sweep All Units",
+            command=self.toggle_units_sweep,
+            width=160,
+            height=45,
+            corner_radius=12,
+            fg_color=self.bg_tertiary,
+            hover_color=self.accent_primary,
+            text_color=self.text_primary,
+            font=("Segoe UI", 11, "bold"),
+            border_width=2,
+            border_color=self.bg_card
+        )
+        self.btn_sweep_units.pack(side=tk.LEFT, padx=(10, 0))
+        self.entry_sweep_interval = ctk.CTkEntry(
+            units_controls,
+            placeholder_text="every s",
+            width=80,
+            height=45,
+            corner_radius=12,
+            fg_color=self.bg_tertiary,
+            text_color=self.text_primary,
+            border_color=self.bg_card,
+            font=("Segoe UI", 11)
+        )
+        self.entry_sweep_interval.pack(side=tk.LEFT, padx=(6, 0))
+        saved_interval = load_settings().get("sweep_interval_s")
+        if saved_interval:
+            self.entry_sweep_interval.insert(0, str(saved_interval))
+
+        # Column-aware query bar, e.g. "driver:carel com:3 ip:10.0.1." (see UnitsIndex.query)
+        self.units_query_var = tk.StringVar(value=self.units_query)
+        self.entry_units_query = ctk.CTkEntry(
+            units_controls,
+            textvariable=self.units_query_var,
+            placeholder_text="driver:carel com:3 ip:10.0.",
+            height=45,
+            corner_radius=12,
+            fg_color=self.bg_tertiary,
+            text_color=self.text_primary,
+            border_color=self.bg_card,
+            font=("Segoe UI", 11)
+        )
+        self.entry_units_query.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(10, 0))
+        self._units_query_job = None
+        self.units_query_var.trace_add("write", self._on_units_query_changed)
+        
+        # Table (Treeview) with scrollbar (row 1)
+        units_table_frame = ctk.CTkFrame(self.units_tab, fg_color=self.bg_primary, corner_radius=10)
+        units_table_frame.grid(row=1, column=0, sticky="NSEW", padx=10, pady=(0, 10))
+        self.units_tab.grid_rowconfigure(1, weight=1)
+        self.units_tab.grid_columnconfigure(0, weight=1)
+        
+        # Configure the table frame to be expandable
+        units_table_frame.rowconfigure(0, weight=1)
+        units_table_frame.columnconfigure(0, weight=1)
+        
+        # Column order: move IP Address to the end (after Parity)
+        columns = ("unit_id", "unit_name", "driver_type", "driver_addr", "regulator_type", "com_port", "baudrate", "parity", "ip_address",
+                   UNITS_HEALTH_COLUMN)
+        
+        # Configure Treeview style for modern dark theme - with proper dark colors
+        tree_style = ttk.Style()
+        tree_style.theme_use('clam')  # Use clam as base for better styling
+        
+        tree_style.configure("Modern.Treeview",
+                            background=self.bg_primary,
+                            foreground=self.text_primary,
+                            fieldbackground=self.bg_primary,
+                            bordercolor=self.bg_tertiary,
+                            borderwidth=1,
+                            relief='solid',
+                            font=("Segoe UI", 10))
+        tree_style.configure("Modern.Treeview.Heading",
+                            background=self.bg_tertiary,
+                            foreground=self.text_primary,
+                            borderwidth=1,
+                            bordercolor=self.bg_tertiary,
+                            relief='solid',
+                            font=("Segoe UI", 10, "bold"))
+        tree_style.map("Modern.Treeview",
+                      background=[('selected', self.accent_primary)],
+                      foreground=[('selected', self.bg_primary)])
+        tree_style.map("Modern.Treeview.Heading",
+                      background=[('active', self.bg_secondary)],
+                      foreground=[('active', self.text_primary)])
+        
+        # Apply row striping for better readability + clearer separation
+        tree_style.configure("Modern.Treeview", rowheight=30)
+        tree_style.configure("Modern.Treeview.Item", bordercolor=self.bg_tertiary, borderwidth=1, relief="solid")
+        
+        self.units_tree = ttk.Treeview(units_table_frame, columns=columns, show="headings", style="Modern.Treeview")
+        
+        # Configure row tags for striping
+        self.units_tree.tag_configure('oddrow', background=self.bg_primary)
+        self.units_tree.tag_configure('evenrow', background=self.bg_tertiary)
+        # Define user-friendly column headers
+        column_headers = {
+            "unit_id": "Unit ID",
+            "unit_name": "Unit Name", 
+            "driver_type": "Driver Type",
+            "driver_addr": "Driver Address",
+            "regulator_type": "Regulator Type",
+            "ip_address": "IP Address",
+            "com_port": "COM Port",
+            "baudrate": "Baudrate",
+            "parity": "Parity",
+            UNITS_HEALTH_COLUMN: "Health"
+        }
+        
+        # Set column widths (minimums). Keep IP Address compact.
+        column_widths = {
+            "unit_id": 200,
+            "unit_name": 300, 
+            "driver_type": 250,
+            "driver_addr": 250,
+            "regulator_type": 300,
+            "ip_address": 170,  # IP Address column (keep compact)
+            "com_port": 200,
+            "baudrate": 160,
+            "parity": 140,
+            UNITS_HEALTH_COLUMN: 220
+        }
+        
+        self._units_headers = {c: column_headers.get(c, c) for c in columns if c != UNITS_HEALTH_COLUMN}
+        for col in columns:
+            if col == UNITS_HEALTH_COLUMN:
+                self.units_tree.heading(col, text=column_headers[col], anchor="center")
+            else:
+                self.units_tree.heading(col, text=column_headers.get(col, col), anchor="center",
+                                        command=lambda c=col: self.sort_units_by(c))
+            # Set columns to auto-size to content with minimum width and center alignment
+            if col == "ip_address":
+                # IP should not expand; keep it close to actual IP length
+                self.units_tree.column(
+                    col,
+                    anchor="center",
+                    minwidth=120,
+                    width=column_widths.get(col, 170),
+                    stretch=False
+                )
+            else:
+                self.units_tree.column(col, anchor="center", minwidth=100, stretch=True)
+        
+        # Create scrollbars - both vertical and horizontal
+        units_v_scrollbar = ttk.Scrollbar(units_table_frame, orient="vertical", command=self.units_tree.yview)
+        units_h_scrollbar = ttk.Scrollbar(units_table_frame, orient="horizontal", command=self.units_tree.xview)
+        
+        # Keep a no-op separator updater to avoid geometry glitches after data refresh.
+        # Native Treeview separators are more stable than custom overlay lines.
+        self.units_column_separators = []
+
+        def update_units_column_separators():
+            return
 
-        # (Removed) Copyright label text per request
+        self.update_units_column_separators = update_units_column_separators
 
-        # Add event bindings for automatic command preview updates (after all widgets are created)
-        self.setup_command_preview_bindings()
+        def _xscroll_proxy(first, last):
+            units_h_scrollbar.set(first, last)
 
-        # ComboBox arrow flips up/down + smooth arrow transition
-        self.setup_combobox_arrow_behavior()
-        # Smooth dropdown open/close (slide + fade) for comboboxes
-        self.setup_smooth_combobox_dropdowns()
+        # Configure the treeview to work with both scrollbars (+ keep separators synced)
+        self.units_tree.configure(yscrollcommand=units_v_scrollbar.set, xscrollcommand=_xscroll_proxy)
         
-        # Display welcome message
-        self.display_welcome_message()
-
-        # Keep Units tab snappy/clean: hide terminal + polling controls when on Units tab
-        self._last_settings_tab = None
-        self._monitor_settings_tab()
+        # Use grid layout for proper resizing behavior with padding
+        self.units_tree.grid(row=0, column=0, sticky="NSEW", padx=10, pady=10)
+        units_v_scrollbar.grid(row=0, column=1, sticky="NS", pady=10, padx=(0, 10))
+        units_h_scrollbar.grid(row=1, column=0, sticky="EW", padx=10, pady=(0, 10))
+        
+        # Configure grid weights for the table frame
+        units_table_frame.columnconfigure(0, weight=1)
+        units_table_frame.columnconfigure(1, weight=0)
+        units_table_frame.rowconfigure(0, weight=1)
+        units_table_frame.rowconfigure(1, weight=0)  # Horizontal scrollbar row doesn't expand
+        
+        # Ensure the treeview can expand to show all content
+        def on_treeview_resize(event):
+            # Keep separators aligned after resize (lightweight)
+            update_units_column_separators()
+        
+        self.units_tree.bind("<Configure>", on_treeview_resize)
+        # Fill command inputs when selecting a unit row
+        self.units_tree.bind('<<TreeviewSelect>>', self.on_units_selection_from_table)
+        
+        # Function to auto-size columns to fit content exactly
+        def auto_size_columns():
+            """Automatically size columns to fit the biggest word in each column with no extra space."""
+            try:
+                # Get all items in the treeview
+                items = self.units_tree.get_children()
+                if not items:
+                    return
+                
+                # Calculate optimal width for each column
+                for col in columns:
+                    # Start with header width
+                    header_text = column_headers.get(col, col)
+                    header_width = len(header_text) * 8  # Approximate character width
+                    max_width = header_width
+                    
+                    # Check all values in this column
+                    for item in items:
+                        value = self.units_tree.set(item, col)
+                        if value:
+                            # Calculate width needed for this value
+                            value_width = len(str(value)) * 8  # Approximate character width
+                            max_width = max(max_width, value_width)
+                    
+                    # Set column width to exactly fit content (minimal padding)
+                    optimal_width = max_width + 5  # Minimal padding (reduced from 10 to 5)
+                    
+                    # Get minimum width for this column (especially important for IP Address)
+                    min_width = column_widths.get(col, 200)
+                    
+                    # Set column width to the larger of: content width or minimum width
+                    optimal_width = max(optimal_width, min_width)
+                    
+                    self.units_tree.column(col, width=optimal_width)
+                # Keep separators aligned after auto-size
+                update_units_column_separators()
+                    
+            except Exception as e:
+                print(f"Error in auto_size_columns: {e}")
+        
+        # Store the auto-size function for later use
+        self.auto_size_columns = auto_size_columns
 
     def normalize_stopbits_value(self, value) -> str:
         """Stop bits must be '1' or '2' for modpoll."""
@@ -1870,8 +4815,6 @@ class ModpollingTool:
 
     def _open_animated_combobox_popup(self, cb):
         """Create and animate a dropdown popup for a CTkComboBox."""
-        import customtkinter as ctk
-
         # Close any existing popup on other combobox
         try:
             active = getattr(self, "_active_combo_popup", None)
@@ -2167,13 +5110,36 @@ class ModpollingTool:
 
             if current and current != self._last_settings_tab:
                 self._last_settings_tab = current
+                if current == "Units":
+                    self._ensure_units_tab_built()
+                elif current == "Advanced":
+                    self._ensure_advanced_extras_built()
                 self._apply_settings_tab_layout(current)
         finally:
             # Light polling for responsiveness without lag
             self.root.after(50, self._monitor_settings_tab)
 
     def get_best_monospace_font(self):
-        """Get the best available monospace font for the terminal"""
+        """Get the best available monospace font for the terminal (cached across launches)"""
+        if getattr(self, "_mono_font", None):
+            return self._mono_font
+
+        # Cache key: anything that changes which font resolves or how wide it renders
+        try:
+            cache_key = {
+                "dpi": round(float(self.root.winfo_fpixels("1i")), 2),
+                "scaling": round(float(self.root.tk.call("tk", "scaling")), 4),
+                "fonts": font_directories_stamp(),
+            }
+        except Exception:
+            cache_key = None
+
+        cached = load_settings().get("font_metrics") if cache_key else None
+        if isinstance(cached, dict) and cached.get("key") == cache_key and cached.get("family"):
+            self._mono_font = cached["family"]
+            self._mono_char_px = cached.get("char_px")
+            return self._mono_font
+
         preferred_fonts = [
             "Cascadia Code",
             "Consolas",
@@ -2182,14 +5148,28 @@ class ModpollingTool:
             "Monospace"
         ]
         
-        available_fonts = list(tkfont.families())
+        # Enumerating every installed font is slow on machines with thousands of fonts
+        available_fonts = set(tkfont.families())
         
+        # Fallback to default monospace
+        self._mono_font = "Courier New"
         for font in preferred_fonts:
             if font in available_fonts:
-                return font
-        
-        # Fallback to default monospace
-        return "Courier New"
+                self._mono_font = font
+                break
+
+        try:
+            self._mono_char_px = max(7, tkfont.Font(font=(self._mono_font, 10)).measure("0"))
+        except Exception:
+            self._mono_char_px = None
+
+        if cache_key:
+            update_settings(font_metrics={
+                "key": cache_key,
+                "family": self._mono_font,
+                "char_px": self._mono_char_px,
+            })
+        return self._mono_font
     
     def display_welcome_message(self):
         """Display a welcome message in the log"""
@@ -2222,8 +5202,9 @@ Ready to poll..."""
 
             try:
                 mono_font = self.get_best_monospace_font()
-                f = tkfont.Font(font=(mono_font, 10))
-                char_px = max(7, f.measure("0"))
+                char_px = getattr(self, "_mono_char_px", None)
+                if not char_px:
+                    char_px = max(7, tkfont.Font(font=(mono_font, 10)).measure("0"))
                 w_px = int(getattr(self.txt_log, "winfo_width", lambda: 0)())
                 # subtract a little padding so we don't hit the scrollbar edge
                 max_chars = max(50, int(max(0, w_px - 24) / char_px))
@@ -2279,49 +5260,58 @@ Ready to poll..."""
         1. COM ports detected by pySerial.
         2. COM ports detected via registry scan.
 
+        Enumeration runs on a worker thread (it can stall on USB-RS485 adapters and
+        NPort virtual ports); the combobox is updated from the UI thread when done.
         """
-        ports = serial.tools.list_ports.comports()
-        com_ports_serial = [port.device for port in ports]
+        if getattr(self, "_comport_scan_running", False):
+            return
+        self._comport_scan_running = True
+
+        def _scan():
+            try:
+                ports, registry_ok = list_serial_ports()
+            except Exception:
+                ports, registry_ok = [], False
+            if not registry_ok:
+                self.log_queue.put(('error', "Error! Cannot find COM ports. Type in the COM port manually."))
+            try:
+                self.root.after(0, lambda: self._apply_comport_list(ports, select_first=True))
+            except Exception:
+                self._comport_scan_running = False
 
-        com_ports_registry = self.get_com_ports_from_registry()
+        threading.Thread(target=_scan, name="comport-scan", daemon=True).start()
 
-        # Combine both lists and remove duplicates
-        combined_com_ports = sorted(list(set(com_ports_serial + com_ports_registry)))
+    def _apply_comport_list(self, ports, select_first=False):
+        """Update the COM port combobox from an enumeration result (UI thread)."""
+        self._comport_scan_running = False
+        self.comport_cache = list(ports)
 
         # Update the combobox values - CustomTkinter uses configure
-        self.cmb_comport.configure(values=combined_com_ports)
-
-        # If there are available COM ports, select the first one
-        if combined_com_ports:
-            self.cmb_comport.set(combined_com_ports[0])
-        else:
-            self.cmb_comport.set('')
+        self.cmb_comport.configure(values=self.comport_cache)
 
-    def get_com_ports_from_registry(self):
-        """
-        Scan the Windows Registry to find all COM ports.
-        This includes COM ports managed by external tools like NPort Administrator.
-        """
-        com_ports = []
+        current = self.cmb_comport.get().strip()
+        if select_first or not current:
+            # If there are available COM ports, select the first one
+            if self.comport_cache:
+                self.cmb_comport.set(self.comport_cache[0])
+            else:
+                self.cmb_comport.set('')
+            if not self.cmd_dirty:
+                self.update_command_preview()
+        elif current not in self.comport_cache:
+            self.log_queue.put(('info', f"{current} is no longer present."))
+
+        # Start hot-plug watching once we have a baseline
+        if getattr(self, "comport_watcher", None) is None:
+            self.comport_watcher = SerialPortWatcher(self._on_comports_changed)
+            self.comport_watcher.start(initial_ports=self.comport_cache)
+
+    def _on_comports_changed(self, ports):
+        """Watcher callback (worker thread): marshal the new port list to the UI thread."""
         try:
-            reg = winreg.ConnectRegistry(None, winreg.HKEY_LOCAL_MACHINE)
-            key = winreg.OpenKey(reg, r"HARDWARE\DEVICEMAP\SERIALCOMM")
-            for i in range(0, winreg.QueryInfoKey(key)[1]):
-                val = winreg.EnumValue(key, i)
-                com_ports.append(val[1])
-        except Exception as e:
-            self.log_queue.put(('error', "Error! Cannot find COM ports. Type in the COM port manually."))
-        return com_ports
-
-
-
-
-
-
-
-
-
-
+            self.root.after(0, lambda: self._apply_comport_list(ports))
+        except Exception:
+            pass
 
     def _decode_str(self, encoded_str):
         """Simple base64 decode function for obfuscation."""
@@ -2342,7 +5332,7 @@ Ready to poll..."""
         """
         try:
             # Extract COM port from enhanced name (e.g., "COM1 - SLV" -> "COM1")
-            com_match = re.search(r'COM\d+', enhanced_name)
+            com_match = _COM_PORT_RE.search(enhanced_name)
             if com_match:
                 return com_match.group(0)
             else:
@@ -2378,6 +5368,10 @@ Ready to poll..."""
         except Exception:
             pass
 
+        if self.sweep_active:
+            self.log_queue.put(('info', "A units health sweep is running; stop it before polling."))
+            return
+
         # Check if modpoll.exe exists before starting
         if not os.path.exists(self.modpoll_path):
             self.log_queue.put(('error', f"modpoll.exe not found at {self.modpoll_path}."))
@@ -2473,17 +5467,58 @@ Ready to poll..."""
                     else:
                         arguments = [self.format_com_port(com_port), f"-b{baudrate}", f"-p{parity}", f"-a{adresse}"]
 
+        # Change-only display (deadband filter)
+        self.deadband_filter = None
+        self._pending_attempt_line = None
+        if self.change_only_var.get():
+            try:
+                self.deadband_filter = DeadbandFilter.from_text(self.entry_deadband.get(), self.entry_heartbeat.get())
+            except ValueError:
+                messagebox.showwarning(
+                    "Invalid Deadband",
+                    "Deadband must be a number (e.g. 0.5) or a percentage (e.g. 2%), heartbeat a number of seconds."
+                )
+                return
+
+        # Scan list (per-block poll rates); None = poll the single -r/-c block every second
+        scan_blocks = None
+        scan_text = self.entry_scan_list.get().strip()
+        if scan_text:
+            try:
+                scan_blocks = parse_scan_list(scan_text)
+            except ValueError as e:
+                messagebox.showwarning("Invalid Scan List", f"{e}\n\nExample: 100:10@0.2, 200:4@30")
+                return
+
         # Reset attempt counter for a new polling session and store first reference
         self.poll_attempt_counter = 0
         self.current_start_reference = start_reference
         self.last_seen_reference = None  # Reset cycle detection
 
+        # Compile the preset register map against this poll's block (-r/-c), or the span of the scan list
+        self.compiled_register_map = None
+        self._register_block = {}
+        if self.active_register_map:
+            if scan_blocks:
+                map_start = min(b.ref for b in scan_blocks)
+                map_count = max(b.ref + b.count for b in scan_blocks) - map_start
+            else:
+                map_start, map_count = int(start_reference), int(num_registers)
+            try:
+                compiled = CompiledRegisterMap(self.active_register_map, map_start, map_count)
+                if compiled:
+                    self.compiled_register_map = compiled
+                else:
+                    self.log_queue.put(('info', "Register map: no mapped values inside -r/-c block; showing raw registers."))
+            except (ValueError, KeyError, TypeError) as e:
+                self.log_queue.put(('error', f"Invalid register map in preset: {e}"))
+
         # Prevent double-start race: mark polling active BEFORE starting thread
         self.is_polling = True
         self.update_buttons()
 
         # Start polling thread
-        threading.Thread(target=self.run_modpoll, args=(arguments, com_port, baudrate, parity, databits, stopbits, adresse, start_reference, num_registers, register_data_type), daemon=True).start()
+        threading.Thread(target=self.run_modpoll, args=(arguments, com_port, baudrate, parity, databits, stopbits, adresse, start_reference, num_registers, register_data_type, scan_blocks), daemon=True).start()
 
     def _get_register_type_description(self, register_data_type):
         """Map register data type number to description."""
@@ -2495,9 +5530,11 @@ Ready to poll..."""
         }
         return type_map.get(str(register_data_type), f"type {register_data_type}")
 
-    def run_modpoll(self, arguments, com_port, baudrate, parity, databits, stopbits, adresse, start_reference, num_registers, register_data_type):
+    def run_modpoll(self, arguments, com_port, baudrate, parity, databits, stopbits, adresse, start_reference, num_registers, register_data_type, scan_blocks=None):
         # start_polling() already set is_polling/update_buttons to avoid double-start races
         self._write_to_terminal("Polling started...", 'info')
+        scheduler = bus_model = capture = overhead = None
+        report_overruns = False
 
         try:
             # Use the hardcoded modpoll path
@@ -2536,6 +5573,8 @@ Ready to poll..."""
             else:
                 self._write_to_terminal(f"Serial port configuration: {serial_config}", 'normal')
             self._write_to_terminal(f"Data type: {register_type_desc}", 'normal')
+            if scan_blocks:
+                self._write_to_terminal(f"Scan list: {', '.join(b.label for b in scan_blocks)}", 'normal')
             self._write_to_terminal("Protocol opened successfully.", 'normal')
 
             # Log the command (mask the full path to show just 'modpoll')
@@ -2545,99 +5584,338 @@ Ready to poll..."""
             self._write_to_terminal(f"Parameters: COM={com_port}, Baud={baudrate}, Parity={parity}, DataBits={databits}, StopBits={stopbits}, Addr={adresse}, Ref={start_reference}, Count={num_registers}, Type={register_data_type}", 'normal')
 
             # Prevent a new window from opening
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            creationflags = subprocess.CREATE_NO_WINDOW
+            popen_kwargs = hidden_window_popen_kwargs()
 
             # NOTE:
             # When modpoll.exe stdout is piped (stdout=PIPE), it can become block-buffered on Windows.
             # That causes "nothing for a few seconds, then a burst" even though modpoll is polling every second.
             #
-            # Fix: force one-shot mode (-1) and run it once per second ourselves.
-            # This guarantees each run flushes output when the process exits, giving true "1s cadence" in the GUI.
-            poll_interval_s = 1.0
+            # Fix: force one-shot mode (-1) and schedule the runs ourselves (once per second, or per
+            # block of the scan list). Each run flushes its output when the process exits.
+            report_overruns = bool(scan_blocks)
+            continuous = self.continuous_var.get()
+            if continuous and scan_blocks:
+                self._write_to_terminal("Continuous mode ignored: a scan list needs one run per block.", 'info')
+                continuous = False
+            elif continuous and not pty_streaming_available():
+                self._write_to_terminal(
+                    "Continuous mode needs a pseudo-terminal (on Windows: pip install pywinpty); using one-shot runs.", 'info'
+                )
+                continuous = False
+            if scan_blocks:
+                block_args = {id(b): scan_block_arguments(arguments, b) for b in scan_blocks}
+            else:
+                # Ensure one-shot flag is present (modpoll: "-1 Poll only once, otherwise poll every second")
+                args_oneshot = list(arguments)
+                if "-1" not in args_oneshot:
+                    args_oneshot.append("-1")
+                try:
+                    default_block = ScanBlock(start_reference, num_registers, 1.0)
+                except ValueError:
+                    default_block = ScanBlock(0, 1, 1.0)  # Custom command: -r/-c only live in args_oneshot
+                block_args = {id(default_block): args_oneshot}
+                scan_blocks = [default_block]
+            scheduler = ScanScheduler(scan_blocks)
+            if not use_tcp:
+                try:
+                    bus_model = BusCapacityModel(baudrate, parity, stopbits, databits)
+                except ValueError:
+                    bus_model = None
 
-            # Ensure one-shot flag is present (modpoll: "-1 Poll only once, otherwise poll every second")
-            args_oneshot = list(arguments)
-            if "-1" not in args_oneshot:
-                args_oneshot.append("-1")
+            # Adaptive request timeout (-o) per slave unless the command sets one; floor = wire time + 50 ms
+            target_key = (tcp_addr if use_tcp else com_port, str(adresse))
+            adaptive_timeout = not has_timeout_argument(arguments)
+            timeout_floor = {
+                id(b): (bus_model.transaction_s(register_data_type, b.count) if bus_model is not None else 0.1)
+                for b in scan_blocks
+            }
 
             env = dict(os.environ)
             env["PYTHONUNBUFFERED"] = "1"
 
-            import time as _time
-            import io as _io
+            if self.capture_var.get():
+                try:
+                    capture = SessionCapture.new_session()
+                    capture.write(CAPTURE_META, {
+                        "arguments": list(arguments), "com_port": com_port, "baudrate": baudrate,
+                        "parity": parity, "databits": databits, "stopbits": stopbits, "address": adresse,
+                        "start_reference": start_reference, "count": num_registers,
+                        "register_type": register_data_type,
+                    })
+                    self._write_to_terminal(f"Capturing session to {capture.path}", 'info')
+                except OSError as e:
+                    capture = None
+                    self._write_to_terminal(f"Capture disabled: {e}", 'error')
+
+            if continuous:
+                arguments = [arg for arg in arguments if arg != "-1"]
+                if adaptive_timeout:
+                    # Fixed for the session: the timeout learned by earlier one-shot polling of this slave
+                    arguments.append(f"-o{self.timeout_tracker.timeout_s(target_key, timeout_floor[id(scan_blocks[0])]):.2f}")
+                self._stream_modpoll_session([modpoll_path] + arguments, env, capture)
+                return
+
+            overhead = OneShotOverhead()
 
             while self.is_polling:
-                t0 = _time.perf_counter()
+                block, wait_s = scheduler.next_block()
+                if wait_s > 0:
+                    # Interruptible sleep so Stop reacts immediately.
+                    sleep_until = time.monotonic() + wait_s
+                    while self.is_polling:
+                        remaining = sleep_until - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        time.sleep(min(0.05, remaining))
+                if not self.is_polling:
+                    break
+                t0 = time.monotonic()
+
+                # Backed-off (unresponsive) slave: skip this slot instead of waiting out another timeout
+                if self.timeout_tracker.backoff_remaining(target_key, t0) > 0:
+                    scheduler.skip(block, t0)
+                    continue
 
                 # In one-shot mode, attempts are driven by our loop, not by parsed output cycle detection.
                 self._oneshot_mode = True
-                if not self.is_polling:
-                    break
-                self._increment_attempt(source="manual")
+                self._increment_attempt(source="manual", label=block.label if len(scan_blocks) > 1 else None)
                 self.last_seen_reference = None
 
                 if not self.is_polling:
                     break
-                cmd = [modpoll_path] + args_oneshot
-
+                cmd = [modpoll_path] + block_args[id(block)]
+                late_args = ()
+                request_timeout_s = AdaptiveTimeoutTracker.DEFAULT_S
+                if adaptive_timeout:
+                    request_timeout_s = self.timeout_tracker.timeout_s(target_key, timeout_floor[id(block)])
+                    late_args = (f"-o{request_timeout_s:.2f}",)
+                self.last_poll_outcome = None
+                if capture is not None:
+                    capture.write(CAPTURE_RUN, {"arguments": cmd[1:] + list(late_args), "block": block.label})
+
+                timers = self.stage_timers
+                t_stage = time.perf_counter()
                 self.modpoll_process = subprocess.Popen(
-                    cmd,
+                    cmd + list(late_args),
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
                     text=True,
                     shell=False,
-                    startupinfo=startupinfo,
-                    creationflags=creationflags,
                     env=env,
+                    **popen_kwargs,
                 )
+                t_spawned = time.perf_counter()
+                overhead.attempts += 1
+                overhead.spawn_s += t_spawned - t_stage
+                if timers.enabled:
+                    timers.record("spawn", t_spawned - t_stage)
 
-                out = ""
                 try:
-                    out, _ = self.modpoll_process.communicate(timeout=10)
-                except subprocess.TimeoutExpired:
-                    try:
-                        self.modpoll_process.kill()
-                    except Exception:
-                        pass
-                    try:
-                        out, _ = self.modpoll_process.communicate(timeout=1)
-                    except Exception:
-                        out = ""
+                    # Request timeout plus generous room for process start-up
+                    out, first_byte_s, timed_out = read_process_output(
+                        self.modpoll_process, min(10.0, request_timeout_s * 2 + 2.0)
+                    )
+                finally:
+                    self.modpoll_process = None
+                t1 = time.monotonic()
+                t_ran = time.perf_counter()
+                overhead.run_s += t_ran - t_spawned
+                if first_byte_s is not None:
+                    overhead.answered += 1
+                    overhead.first_byte_s += t_spawned - t_stage + first_byte_s
+                    if timers.enabled:
+                        timers.record("first_byte", first_byte_s)
+                if timers.enabled:
+                    timers.record("wait", t_ran - t_spawned)
+                if timed_out:
+                    if capture is not None:
+                        capture.write(CAPTURE_TIMEOUT)
                     self._write_to_terminal("Time-out - No response from device", 'error')
                     try:
                         self.root.after_idle(lambda: self.trigger_status_indicator('red'))
                     except Exception:
                         pass
-                finally:
-                    self.modpoll_process = None
 
+                scheduler.complete(block, t0, t1)
+
+                if capture is not None and out:
+                    capture.write(CAPTURE_OUTPUT, out)
                 if out:
                     # Feed output through the same parser used for streaming mode
-                    self.read_stream(_io.StringIO(out))
+                    t_stage = time.perf_counter()
+                    self.read_stream(io.StringIO(out))
+                    parse_s = time.perf_counter() - t_stage
+                    overhead.parse_s += parse_s
+                    if timers.enabled:
+                        timers.record("parse", parse_s)
                     # read_stream() may request an immediate stop on fatal errors.
                     if not self.is_polling:
                         break
 
-                # Stop immediately if polling was turned off by parser/error handling.
+                # Stop immediately if polling was turned off by parser/error handling.
+                if not self.is_polling:
+                    break
+
+                if self.last_poll_outcome == "ok":
+                    block.record_answer(t1 - t0)
+                backoff_s = self.timeout_tracker.record(target_key, t1 - t0, self.last_poll_outcome == "ok", t1,
+                                                        request_timeout_s if adaptive_timeout else None)
+                if backoff_s:
+                    self._write_to_terminal(f"Slave {adresse} not responding - next try in {backoff_s:.0f} s", 'error')
+                if report_overruns:
+                    overrun = scheduler.overrun_report()
+                    if overrun:
+                        self._write_to_terminal(overrun, 'error')
+                        if bus_model is not None:
+                            bus_report, _saturated = bus_model.live_report(scheduler.blocks, register_data_type)
+                            if bus_report:
+                                self._write_to_terminal(bus_report, 'error')
+
+        except Exception as e:
+            self._write_to_terminal(f"Error running Modpoll: {str(e)}", 'error')
+        finally:
+            self._oneshot_mode = False
+            self.is_polling = False
+            if overhead is not None:
+                report = overhead.report()
+                if report:
+                    self._write_to_terminal(report, 'info')
+            if capture is not None:
+                capture.close()
+                self._write_to_terminal(f"Capture saved: {capture.path} ({capture.records} records)", 'info')
+            deadband = self.deadband_filter
+            if deadband is not None and deadband.seen:
+                self._pending_attempt_line = None
+                self._write_to_terminal(
+                    f"Change-only: {deadband.suppressed} of {deadband.seen} values suppressed", 'info'
+                )
+            if bus_model is not None and scheduler is not None:
+                try:
+                    turnaround = bus_model.measured_turnaround_s(
+                        scheduler.blocks, register_data_type, overhead.startup_s() if overhead is not None else 0.0
+                    )
+                    if turnaround is not None:
+                        self.measured_turnaround_s = turnaround
+                    bus_report, saturated = bus_model.live_report(scheduler.blocks, register_data_type)
+                    if bus_report and (report_overruns or saturated):
+                        self._write_to_terminal(bus_report, 'error' if saturated else 'info')
+                except Exception:
+                    pass
+            try:
+                self.root.after(0, self.update_buttons)
+            except Exception:
+                pass
+            # (Removed) Polling finished.
+
+    def _stream_modpoll_session(self, cmd, env, capture=None):
+        """
+        Continuous mode: run modpoll once (no -1) on a pseudo-terminal and parse its output as it
+        arrives. The port is opened once per session; attempts are counted from the output
+        (repeated reference or time-out), as in modpoll's own console.
+        """
+        self._write_to_terminal("Continuous mode: one modpoll process, output streamed through a pseudo-terminal.", 'info')
+        tap = None
+        if capture is not None:
+            capture.write(CAPTURE_RUN, {"arguments": cmd[1:], "block": "continuous"})
+            tap = lambda line: capture.write(CAPTURE_OUTPUT, line)
+        timers = self.stage_timers
+        t_stage = time.perf_counter() if timers.enabled else 0.0
+        proc, stream = spawn_pty_process(cmd, env, tap)
+        if t_stage:
+            timers.record("spawn", time.perf_counter() - t_stage)
+        self.modpoll_process = proc
+        try:
+            self._oneshot_mode = False
+            self.last_seen_reference = None
+            self._increment_attempt(source="manual")
+            self.read_stream(stream)
+        finally:
+            self.modpoll_process = None
+            if proc.poll() is None:
+                # Parser stopped on a fatal error while modpoll keeps running
+                try:
+                    proc.terminate()
+                    proc.wait(timeout=1.0)
+                except Exception:
+                    try:
+                        proc.kill()
+                    except Exception:
+                        pass
+            elif self.is_polling:
+                self._write_to_terminal(f"modpoll exited (code {proc.poll()}).", 'error')
+            try:
+                stream.close()  # pty master fd (POSIX) / PtyProcess handles (Windows)
+            except Exception:
+                pass
+
+    def choose_replay_file(self):
+        """Pick a capture file and replay it at the selected speed."""
+        path = filedialog.askopenfilename(
+            title="Replay capture",
+            initialdir=CAPTURE_DIR if os.path.isdir(CAPTURE_DIR) else None,
+            filetypes=[("ModPolling captures", "*.mpcap"), ("All files", "*.*")],
+        )
+        if path:
+            self.start_replay(path, self.cmb_replay_speed.get())
+
+    def start_replay(self, path, speed="1x"):
+        """Replay a capture through read_stream() on a worker thread (speed "1x", "10x" or "max")."""
+        if self.is_polling:
+            self.log_queue.put(('info', "Polling is already running."))
+            return
+        speed = str(speed).lower().rstrip("x")
+        factor = 0.0 if speed in ("max", "0", "") else float(speed)
+        self._polling_slave_banner_shown = False
+        self.poll_attempt_counter = 0
+        self.last_seen_reference = None
+        self.deadband_filter = None
+        self._pending_attempt_line = None
+        self._register_block = {}
+        self.is_polling = True
+        self.update_buttons()
+        threading.Thread(target=self.run_replay, args=(path, factor), daemon=True).start()
+
+    def run_replay(self, path, factor=1.0):
+        """Feed a capture's modpoll output through the normal parsing pipeline; factor 0 = no delays."""
+        runs = lines = 0
+        started = time.perf_counter()
+        self._write_to_terminal(f"Replaying {os.path.basename(path)} at {f'{factor:g}x' if factor else 'max speed'}...", 'info')
+        try:
+            previous_ts = None
+            for timestamp, kind, payload in read_capture(path):
                 if not self.is_polling:
                     break
-
-                # Maintain ~1s cadence between poll starts
-                dt = _time.perf_counter() - t0
-                sleep_s = poll_interval_s - dt
-                if sleep_s > 0:
+                if factor and previous_ts is not None and timestamp > previous_ts:
                     # Interruptible sleep so Stop reacts immediately.
-                    sleep_until = _time.perf_counter() + sleep_s
+                    sleep_until = time.perf_counter() + (timestamp - previous_ts) / factor
                     while self.is_polling:
-                        remaining = sleep_until - _time.perf_counter()
+                        remaining = sleep_until - time.perf_counter()
                         if remaining <= 0:
                             break
-                        _time.sleep(min(0.05, remaining))
-
-        except Exception as e:
-            self._write_to_terminal(f"Error running Modpoll: {str(e)}", 'error')
+                        time.sleep(min(0.05, remaining))
+                previous_ts = timestamp
+                if kind == CAPTURE_META:
+                    meta = json.loads(payload.decode("utf-8"))
+                    self._write_to_terminal(f"Captured command: modpoll {' '.join(meta.get('arguments', []))}", 'normal')
+                elif kind == CAPTURE_RUN:
+                    runs += 1
+                    self._oneshot_mode = True
+                    self._increment_attempt(source="manual")
+                    self.last_seen_reference = None
+                elif kind == CAPTURE_OUTPUT:
+                    text = payload.decode("utf-8", errors="replace")
+                    lines += text.count("\n")
+                    self.read_stream(io.StringIO(text))
+                elif kind == CAPTURE_TIMEOUT:
+                    self._write_to_terminal("Time-out - No response from device", 'error')
+                    self.root.after_idle(lambda: self.trigger_status_indicator('red'))
+            elapsed = time.perf_counter() - started
+            self._write_to_terminal(
+                f"Replay finished: {runs} runs, {lines} lines in {elapsed:.2f} s ({lines / elapsed if elapsed else 0:.0f} lines/s)",
+                'info'
+            )
+        except (OSError, ValueError) as e:
+            self._write_to_terminal(f"Replay failed: {e}", 'error')
         finally:
             self._oneshot_mode = False
             self.is_polling = False
@@ -2645,9 +5923,8 @@ Ready to poll..."""
                 self.root.after(0, self.update_buttons)
             except Exception:
                 pass
-            # (Removed) Polling finished.
 
-    def _increment_attempt(self, source="output"):
+    def _increment_attempt(self, source="output", label=None):
         """
         Increment and print attempt counter.
 
@@ -2660,8 +5937,13 @@ Ready to poll..."""
         except Exception:
             pass
         self.poll_attempt_counter += 1
+        line = f"Attempt {self.poll_attempt_counter}" + (f" ({label})" if label else "")
+        if self.deadband_filter is not None:
+            # Change-only: print the attempt header only if this attempt prints something
+            self._pending_attempt_line = line
+            return
         # Log every attempt in white (direct to UI like CMD)
-        self._write_to_terminal(f"Attempt {self.poll_attempt_counter}", 'normal')
+        self._write_to_terminal(line, 'normal')
 
     def _write_to_terminal(self, message, tag=None):
         """Queue terminal write (fast + non-blocking UI)."""
@@ -2670,6 +5952,11 @@ Ready to poll..."""
         except Exception:
             msg = ""
 
+        pending = self._pending_attempt_line
+        if pending is not None:
+            self._pending_attempt_line = None
+            self.terminal_write_queue.put((pending, 'normal'))
+
         # Listbox terminal is line-based: split multi-line messages
         msg = msg.replace("\r\n", "\n").replace("\r", "\n")
         lines = msg.split("\n")
@@ -2678,15 +5965,20 @@ Ready to poll..."""
             self.terminal_write_queue.put((line, tag))
         if not self.terminal_flush_scheduled:
             self.terminal_flush_scheduled = True
+            if self.stage_timers.enabled:
+                self._terminal_queued_at = time.perf_counter()
             # Kick an immediate flush; subsequent flushes are throttled inside _flush_terminal_writes
             self.root.after(0, self._flush_terminal_writes)
     
     def _flush_terminal_writes(self):
         """Flush queued terminal writes (Listbox) without lag (time-sliced)."""
         self.terminal_flush_scheduled = False
+        timers = self.stage_timers
+        t_flush = time.perf_counter() if timers.enabled else 0.0
+        if t_flush and self._terminal_queued_at:
+            timers.record("queue", t_flush - self._terminal_queued_at)
+            self._terminal_queued_at = 0.0
         try:
-            import time as _time
-
             lb = self.txt_log
             # Only auto-scroll if user is already at the bottom
             try:
@@ -2694,12 +5986,12 @@ Ready to poll..."""
             except Exception:
                 at_bottom = True
 
-            start = _time.perf_counter()
+            start = time.perf_counter()
             budget_s = 0.010  # ~10ms per tick
             max_items = 800   # hard cap per tick
             items = []
 
-            while len(items) < max_items and (_time.perf_counter() - start) < budget_s:
+            while len(items) < max_items and (time.perf_counter() - start) < budget_s:
                 try:
                     message, tag = self.terminal_write_queue.get_nowait()
                     items.append((message, tag))
@@ -2709,6 +6001,7 @@ Ready to poll..."""
             if not items:
                 return
 
+            t_insert = time.perf_counter() if t_flush else 0.0
             start_index = lb.size()
             # Insert all lines at once (fast)
             lb.insert("end", *[m for (m, _t) in items])
@@ -2725,6 +6018,8 @@ Ready to poll..."""
                         lb.itemconfig(start_index + i, fg=color)
                     except Exception:
                         pass
+            if t_insert:
+                timers.record("tk_insert", time.perf_counter() - t_insert)
 
             # Trim old lines if needed
             try:
@@ -2743,9 +6038,13 @@ Ready to poll..."""
             try:
                 if not self.terminal_write_queue.empty():
                     self.terminal_flush_scheduled = True
+                    if t_flush:
+                        self._terminal_queued_at = time.perf_counter()
                     self.root.after(16, self._flush_terminal_writes)
             except Exception:
                 pass
+            if t_flush:
+                timers.record("flush", time.perf_counter() - t_flush)
 
     def read_stream(self, stream):
         """Read modpoll output and write directly to terminal like CMD (real-time)."""
@@ -2790,6 +6089,7 @@ Ready to poll..."""
                 # Handle time-outs (Reply / Send)
                 if "time-out" in lower_line or "timeout" in lower_line:
                     self._increment_attempt()
+                    self.last_poll_outcome = "timeout"
                     if "send time-out!" in lower_line:
                         self._write_to_terminal("Send time-out! - No response from device", 'error')
                     else:
@@ -2817,6 +6117,7 @@ Ready to poll..."""
                     count = self.message_counts.get(base_message, 0) + 1
                     self.message_counts[base_message] = count
                     numbered_message = f"{base_message} [{count}] - Data corruption"
+                    self.last_poll_outcome = self.last_poll_outcome or "error"
                     self._write_to_terminal(numbered_message, 'error')
                     self.root.after_idle(lambda: self.trigger_status_indicator('yellow'))
                     continue
@@ -2824,6 +6125,7 @@ Ready to poll..."""
                 # Handle "illegal function exception response!"
                 if "illegal function exception response!" in lower_line:
                     self._increment_attempt()
+                    self.last_poll_outcome = "ok"  # An exception response still proves the slave answers
                     self._write_to_terminal("Illegal Function Exception Response!", 'info')
                     self.root.after_idle(lambda: self.trigger_status_indicator('green'))
                     continue
@@ -2831,6 +6133,7 @@ Ready to poll..."""
                 # Handle "illegal data address exception response!"
                 if "illegal data address exception response!" in lower_line:
                     self._increment_attempt()
+                    self.last_poll_outcome = "ok"  # An exception response still proves the slave answers
                     self._write_to_terminal("Illegal Data Address Exception Response! - Device is responding", 'info')
                     self.root.after_idle(lambda: self.trigger_status_indicator('green'))
                     continue
@@ -2838,6 +6141,7 @@ Ready to poll..."""
                 # Handle "illegal data value exception response!"
                 if "illegal data value exception response!" in lower_line:
                     self._increment_attempt()
+                    self.last_poll_outcome = "ok"  # An exception response still proves the slave answers
                     self._write_to_terminal("Illegal Data Value Exception Response!", 'info')
                     self.root.after_idle(lambda: self.trigger_status_indicator('green'))
                     continue
@@ -2852,19 +6156,22 @@ Ready to poll..."""
                     continue
 
                 # Handle lines like "[100]: 70" - successful device response
-                if re.match(r'^\[\s*\d+\s*\]\s*:', line):
+                ref_match = _DATA_LINE_RE.match(line)
+                if ref_match:
                     # Extract the reference number from the line
-                    ref_match = re.match(r'^\[(\d+)\]\s*:', line)
-                    if ref_match:
-                        ref_num = ref_match.group(1)
-                        # Detect start of a new polling cycle: same reference appears again
-                        # (works even if user changed -r, since we track what we actually see)
-                        if self.last_seen_reference is not None and ref_num == self.last_seen_reference:
-                            self._increment_attempt()
-                        self.last_seen_reference = ref_num
-                    self._write_to_terminal(f"{line} - Device is responding", 'response_ok')
+                    ref_num = ref_match.group(1)
+                    # Detect start of a new polling cycle: references ascend within a block, so a
+                    # repeated or lower one starts the next (works even if user changed -r)
+                    if self.last_seen_reference is not None and int(ref_num) <= int(self.last_seen_reference):
+                        self._increment_attempt()
+                    self.last_seen_reference = ref_num
+                    self.last_poll_outcome = "ok"
+                    deadband = self.deadband_filter
+                    if deadband is None or deadband.should_emit(ref_num, self._parse_register_text(line[ref_match.end():])):
+                        self._write_to_terminal(f"{line} - Device is responding", 'response_ok')
+                    if self.compiled_register_map is not None:
+                        self._collect_register_value(int(ref_num), line[ref_match.end():])
                     # Throttle status updates: only update once per second for fast responses
-                    import time
                     now = time.time()
                     if self.last_status_update != 'green' or (now - self.last_status_time) >= 1.0:
                         self.last_status_update = 'green'
@@ -2875,12 +6182,54 @@ Ready to poll..."""
                 # Default
                 self._write_to_terminal(line, 'normal')
         finally:
+            # One-shot runs end the block with the stream
+            if self._register_block:
+                self._flush_decoded_block()
             # Close stream properly (matches example pattern)
             try:
                 stream.close()
             except Exception:
                 pass
 
+    def _parse_register_text(self, value_text):
+        """Numeric value of a "[ref]: value" payload (int, hex or float); the text itself otherwise."""
+        text = value_text.strip()
+        try:
+            return int(text, 0)
+        except ValueError:
+            try:
+                return float(text)
+            except ValueError:
+                return text
+
+    def _collect_register_value(self, ref, value_text):
+        """Buffer one raw register for block decoding (a repeated ref starts a new block)."""
+        try:
+            value = int(value_text.strip(), 0)
+        except ValueError:
+            return  # Already decoded by modpoll (e.g. -t4:float) or not numeric
+        if ref in self._register_block:
+            self._flush_decoded_block()
+        self._register_block[ref] = value
+
+    def _flush_decoded_block(self):
+        """Decode the buffered block with the preset register map and print the values."""
+        block, self._register_block = self._register_block, {}
+        compiled = self.compiled_register_map
+        if compiled is None or not block:
+            return
+        try:
+            decoded = compiled.decode(block)
+        except Exception as e:
+            self._write_to_terminal(f"Register map decode failed: {e}", 'error')
+            return
+        deadband = self.deadband_filter
+        for field, raw, text in decoded:
+            # Compare in engineering units so the deadband means the same for every field
+            if deadband is not None and not deadband.should_emit(("decoded", field.ref), field.scaled(raw)):
+                continue
+            self._write_to_terminal(f"  {field.name} [{field.ref}] = {text}", 'accent')
+
     def stop_polling(self):
         # Request stop immediately, even if we're between one-shot subprocess runs.
         was_polling = bool(self.is_polling)
@@ -2920,6 +6269,128 @@ Ready to poll..."""
             else:
                 self.log_queue.put(('info', "No polling process to stop."))
 
+    def toggle_diagnostics(self):
+        """Enable/disable the per-stage timers (the metrics window shows them)."""
+        enabled = bool(self.diagnostics_var.get())
+        self.stage_timers.enabled = enabled
+        if enabled:
+            self.stage_timers.reset()
+        self.log_queue.put(('info', f"Diagnostics {'enabled' if enabled else 'disabled'}."))
+
+    def open_metrics_view(self):
+        """Show the rolling stage metrics and profiler controls (one window, refreshed every second)."""
+        if self.metrics_window is not None and self.metrics_window.winfo_exists():
+            self.metrics_window.lift()
+            return
+        if not self.stage_timers.enabled:
+            self.diagnostics_var.set(True)
+            self.toggle_diagnostics()
+
+        win = ctk.CTkToplevel(self.root)
+        win.title("Diagnostics")
+        win.geometry("640x360")
+        win.configure(fg_color=self.bg_primary)
+        self.metrics_window = win
+
+        self.metrics_text = tk.Text(
+            win, height=12, bg=self.bg_secondary, fg=self.text_primary, relief="flat",
+            font=(self.get_best_monospace_font(), 10), state="disabled"
+        )
+        self.metrics_text.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+
+        controls = ctk.CTkFrame(win, fg_color="transparent")
+        controls.pack(fill="x", padx=10, pady=(0, 10))
+        ctk.CTkLabel(controls, text="Profile next", text_color=self.text_primary,
+                     font=("Segoe UI", 11)).pack(side="left")
+        self.entry_profile_seconds = ctk.CTkEntry(controls, width=50, height=32, fg_color=self.bg_tertiary,
+                                                  text_color=self.text_primary, font=("Segoe UI", 11))
+        self.entry_profile_seconds.insert(0, "10")
+        self.entry_profile_seconds.pack(side="left", padx=5)
+        ctk.CTkLabel(controls, text="s with", text_color=self.text_primary,
+                     font=("Segoe UI", 11)).pack(side="left")
+        self.cmb_profile_mode = ctk.CTkComboBox(
+            controls, width=190, height=32, values=["Sampling (all threads)", "cProfile (UI thread)"],
+            state="readonly", fg_color=self.bg_tertiary, button_color=self.accent_primary,
+            text_color=self.text_primary, font=("Segoe UI", 11)
+        )
+        self.cmb_profile_mode.set("Sampling (all threads)")
+        self.cmb_profile_mode.pack(side="left", padx=5)
+        ctk.CTkButton(controls, text="Record", width=80, height=32, command=self.start_profile,
+                      fg_color=self.accent_primary, hover_color=self.accent_secondary).pack(side="left", padx=5)
+        ctk.CTkButton(controls, text="Reset", width=70, height=32, command=self.stage_timers.reset,
+                      fg_color=self.bg_tertiary, hover_color=self.accent_primary).pack(side="left")
+
+        self._refresh_metrics_view()
+
+    def _refresh_metrics_view(self):
+        win = self.metrics_window
+        if win is None or not win.winfo_exists():
+            self.metrics_window = None
+            return
+        lines = [f"{'stage':<10} {'count':>7} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9} {'total s':>9}"]
+        for stage, count, mean_ms, p95_ms, max_ms, total_s in self.stage_timers.summary():
+            lines.append(f"{stage:<10} {count:>7} {mean_ms:>9.2f} {p95_ms:>9.2f} {max_ms:>9.2f} {total_s:>9.2f}")
+        if len(lines) == 1:
+            lines.append("(no samples yet - start polling)")
+        lines.append("")
+        lines.append(f"terminal backlog: {self.terminal_write_queue.qsize()} lines")
+        try:
+            self.metrics_text.configure(state="normal")
+            self.metrics_text.delete("1.0", "end")
+            self.metrics_text.insert("1.0", "\n".join(lines))
+            self.metrics_text.configure(state="disabled")
+        except Exception:
+            pass
+        self.root.after(1000, self._refresh_metrics_view)
+
+    def start_profile(self):
+        """Record a profile of the next N seconds to %APPDATA%/ModPollingTool/diagnostics."""
+        if self.profile_running:
+            self.log_queue.put(('info', "A profile is already being recorded."))
+            return
+        try:
+            seconds = float(self.entry_profile_seconds.get().strip())
+            if not 0 < seconds <= 600:
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning("Invalid Duration", "Enter a duration between 0 and 600 seconds.")
+            return
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.profile_running = True
+
+        if self.cmb_profile_mode.get().startswith("cProfile"):
+            import cProfile
+
+            path = os.path.join(DIAGNOSTICS_DIR, f"profile-{stamp}.prof")
+            profiler = cProfile.Profile()
+            profiler.enable()  # Profiles the UI thread (this callback runs on it)
+
+            def _finish():
+                profiler.disable()
+                self.profile_running = False
+                try:
+                    os.makedirs(DIAGNOSTICS_DIR, exist_ok=True)
+                    profiler.dump_stats(path)
+                    self.log_queue.put(('info', f"cProfile saved: {path} (view with python -m pstats or snakeviz)"))
+                except OSError as e:
+                    self.log_queue.put(('error', f"Could not save profile: {e}"))
+
+            self.root.after(int(seconds * 1000), _finish)
+        else:
+            path = os.path.join(DIAGNOSTICS_DIR, f"profile-{stamp}.folded")
+
+            def _sample():
+                try:
+                    samples = SamplingProfiler().record(seconds, path)
+                    self.log_queue.put(('info', f"Sampling profile saved: {path} ({samples} samples, collapsed stacks for flamegraph/speedscope)"))
+                except OSError as e:
+                    self.log_queue.put(('error', f"Could not save profile: {e}"))
+                finally:
+                    self.profile_running = False
+
+            threading.Thread(target=_sample, daemon=True).start()
+        self.log_queue.put(('info', f"Recording profile for {seconds:g} s..."))
+
     def update_buttons(self):
         if self.is_polling:
             # Disable start button and change appearance
@@ -2994,11 +6465,15 @@ Ready to poll..."""
 
     def on_closing(self):
         if self.is_polling:
-            if messagebox.askokcancel("Exit", "Polling is running. Do you want to exit?"):
-                self.stop_polling()
-                self.root.destroy()
-        else:
-            self.root.destroy()
+            if not messagebox.askokcancel("Exit", "Polling is running. Do you want to exit?"):
+                return
+            self.stop_polling()
+        if self.sweep_active:
+            self.stop_units_sweep()
+        watcher = getattr(self, "comport_watcher", None)
+        if watcher is not None:
+            watcher.stop()
+        self.root.destroy()
 
     def on_equipment_selection_change(self, event=None):
         """Handle equipment selection change - update command immediately"""
@@ -3045,6 +6520,11 @@ Ready to poll..."""
         self.append_log_direct(f"  • Num Registers:   {num_registers}", 'normal')
         self.append_log_direct(f"  • Register Type:   {register_type}", 'normal')
 
+        # Presets with a register map get decoded values next to the raw registers
+        self.active_register_map = settings.get("register_map") or None
+        if self.active_register_map:
+            self.append_log_direct(f"  • Register Map:    {len(self.active_register_map)} values decoded", 'normal')
+
         # Update Baudrate (CustomTkinter uses cget for values)
         try:
             baudrate_values = self.cmb_baudrate.cget("values")
@@ -3118,26 +6598,56 @@ Ready to poll..."""
         """Filter equipment list based on search term"""
         search_term = self.search_var.get().lower().strip()
         
-        # Clear current listbox
-        self.listbox_equipment.delete(0, tk.END)
-        
-        # Filter and populate equipment list
-        if search_term:
-            filtered_equipment = [eq for eq in self.all_equipment if search_term in eq.lower()]
-        else:
-            filtered_equipment = self.all_equipment
-        
-        # Populate filtered list
-        for equipment in filtered_equipment:
-            self.listbox_equipment.insert(tk.END, equipment)
+        # Ranked lookup through the precomputed index
+        filtered_equipment, matched = self.equipment_index.search_counted(search_term)
+        new_display = list(filtered_equipment)
+        if not filtered_equipment and search_term:
+            # Show "No results found" message
+            new_display = ["No results found"]
+
+        # Apply only the difference to the listbox (no full clear + re-insert)
+        self.listbox_equipment.selection_clear(0, tk.END)
+        sync_listbox_items(self.listbox_equipment, self.equipment_display, new_display)
+        self.equipment_display = new_display
+        self.listbox_equipment.yview_moveto(0)
         
-        # If only one result, select it automatically
-        if len(filtered_equipment) == 1:
+        # If only one preset contains the term, select it automatically (fuzzy hits don't count)
+        if matched == 1:
             self.listbox_equipment.selection_set(0)
         elif len(filtered_equipment) == 0 and search_term:
-            # Show "No results found" message
-            self.listbox_equipment.insert(tk.END, "No results found")
-            self.listbox_equipment.itemconfig(tk.END, fg=self.text_secondary)
+            self.listbox_equipment.itemconfig(0, fg=self.text_secondary)
+
+    def _load_preset_library(self, reload=False):
+        """Merge external preset files into equipment_settings and refresh the list."""
+        try:
+            presets = self.preset_library.load()
+        except Exception as e:
+            self.log_queue.put(('error', f"Failed to load equipment presets: {e}"))
+            presets = None
+        for err in self.preset_library.errors:
+            self.log_queue.put(('error', f"Preset file error - {err}"))
+
+        if presets is not None and presets != self.equipment_settings:
+            self.equipment_settings = presets
+            self.all_equipment = sorted(presets.keys())
+            self.equipment_index = PresetSearchIndex(self.all_equipment)
+            self.filter_equipment()
+            if reload:
+                self.log_queue.put(('info', f"Equipment presets reloaded ({len(self.all_equipment)} models)."))
+
+        # Hot-reload: cheap mtime check every couple of seconds
+        self.root.after(2000, self._watch_preset_library)
+
+    def _watch_preset_library(self):
+        """Reload presets when any preset file is added, removed or modified."""
+        try:
+            changed = self.preset_library.has_changed()
+        except Exception:
+            changed = False
+        if changed:
+            self._load_preset_library(reload=True)
+        else:
+            self.root.after(2000, self._watch_preset_library)
 
     def clear_search(self):
         """Clear search field and show all equipment"""
@@ -3173,54 +6683,466 @@ Ready to poll..."""
         self.refresh_units_table()
 
     def refresh_units_table(self):
-        """Rebuild the Units table from stored rows, applying current filters."""
+        """
+        Sync the Units table with stored rows and the current filter by diffing.
+
+        Items are keyed by unit_id. New units are inserted, removed ones deleted, and
+        changed ones get only their differing cells updated. The filter sets which items
+        are attached (detach/reattach in one set_children call, no delete/insert).
+        Only rows whose stripe parity changed are re-tagged.
+        """
+        if not self.units_tab_built:
+            # Rows are kept in self.units_rows; the table is filled when the tab is first opened
+            return
+        try:
+            tree = self.units_tree
+            cols = self._units_columns()
+            baud_idx = cols.index("baudrate") if "baudrate" in cols else 6
+            id_idx = cols.index("unit_id") if "unit_id" in cols else 0
+
+            old_values = self._units_item_values
+            new_values = {}
+            row_iids = []
+            for idx, r in enumerate(self.units_rows or []):
+                values = self._units_row_values(r, cols)
+                iid = values[id_idx] or f"row{idx}"
+                if iid in new_values:
+                    iid = f"{iid}#{idx}"  # Duplicate unit_id: keep both rows
+                new_values[iid] = values
+                row_iids.append(iid)
+            if row_iids != self._units_row_iids or new_values != old_values:
+                self._units_index = None
+            self._units_row_iids = row_iids
+            visible = self._units_view_order(new_values, cols, baud_idx)
+
+            removed = [iid for iid in old_values if iid not in new_values]
+            tags = self._units_item_tags
+            if removed:
+                tree.delete(*removed)
+                for iid in removed:
+                    tags.pop(iid, None)
+            position = {iid: i for i, iid in enumerate(visible)}
+            inserted = False
+            changed = bool(removed)
+            for iid, values in new_values.items():
+                old = old_values.get(iid)
+                if old is None:
+                    # Insert with its final stripe so the striping pass below skips it
+                    i = position.get(iid)
+                    if i is None:
+                        tree.insert('', 'end', iid=iid, values=values)
+                    else:
+                        tag = 'evenrow' if i % 2 == 0 else 'oddrow'
+                        tree.insert('', 'end', iid=iid, values=values, tags=(tag,))
+                        tags[iid] = tag
+                    inserted = changed = True
+                elif old != values:
+                    for col, before, after in zip(cols, old, values):
+                        if before != after:
+                            tree.set(iid, col, after)
+                    changed = True
+
+            # Filter: attach exactly the visible items, in data order (detached items keep their values)
+            if inserted or visible != self._units_visible:
+                tree.set_children('', *visible)
+                changed = True
+
+            # Row striping: only re-tag rows whose even/odd position changed
+            for i, iid in enumerate(visible):
+                tag = 'evenrow' if i % 2 == 0 else 'oddrow'
+                if tags.get(iid) != tag:
+                    tree.item(iid, tags=(tag,))
+                    tags[iid] = tag
+
+            self._units_item_values = new_values
+            self._units_visible = visible
+            self._update_units_sort_headers()
+
+            if changed:
+                # Auto-size columns after data load
+                self.root.after(100, self.auto_size_columns)
+                # Keep custom separators aligned after refresh (especially after big data changes)
+                try:
+                    self.root.after(120, self.update_units_column_separators)
+                except Exception:
+                    pass
+        except Exception:
+            # Non-fatal UI update error; ignore
+            pass
+
+    def _units_columns(self):
+        """Treeview columns that hold fetched data (the sweep's Health column is written separately)."""
+        cols = tuple(c for c in (getattr(self.units_tree, "__getitem__", lambda _k: [])("columns") or []) if c != UNITS_HEALTH_COLUMN)
+        # Fallback if Treeview indexing fails for any reason
+        return UNIT_FIELDS if not cols or cols == UNIT_FIELDS else cols
+
+    @staticmethod
+    def _units_row_values(r, cols):
+        """Normalize a stored row to a tuple of strings matching the Treeview columns exactly."""
+        if r.__class__ is UnitRecord and cols is UNIT_FIELDS:
+            return r  # Already the right shape: shared with units_rows, not copied
+        if isinstance(r, dict):
+            row_values = [r.get(c, "") for c in cols]
+        elif isinstance(r, (list, tuple)):
+            row_values = list(r[: len(cols)])
+            if len(row_values) < len(cols):
+                row_values.extend([""] * (len(cols) - len(row_values)))
+        else:
+            # Unknown row type; best-effort: stringify into first column
+            row_values = [str(r)] + [""] * (len(cols) - 1)
+        return tuple("" if v is None else str(v) for v in row_values)
+
+    def append_units_rows(self, rows):
+        """Add rows to the stored units and insert only those into the table (streamed fetch batches)."""
+        first_idx = len(self.units_rows)
+        self.units_rows.extend(rows or [])
+        if not self.units_tab_built or not rows:
+            return
+        try:
+            tree = self.units_tree
+            cols = self._units_columns()
+            baud_idx = cols.index("baudrate") if "baudrate" in cols else 6
+            id_idx = cols.index("unit_id") if "unit_id" in cols else 0
+            values_by_iid = self._units_item_values
+            visible = self._units_visible
+            tags = self._units_item_tags
+            # With a query or sort active, new rows stay detached until the batch settles
+            # and _apply_units_view places them (the index is rebuilt once, not per batch)
+            view_active = self._units_view_active()
+            self._units_index = None
+            for idx, r in enumerate(rows, first_idx):
+                values = self._units_row_values(r, cols)
+                iid = values[id_idx] or f"row{idx}"
+                if iid in values_by_iid:
+                    iid = f"{iid}#{idx}"
+                values_by_iid[iid] = values
+                self._units_row_iids.append(iid)
+                if not view_active and (not self.hide_no_baudrate or values[baud_idx].strip()):
+                    tag = 'evenrow' if len(visible) % 2 == 0 else 'oddrow'
+                    tree.insert('', 'end', iid=iid, values=values, tags=(tag,))
+                    tags[iid] = tag
+                    visible.append(iid)
+                else:
+                    tree.insert('', 'end', iid=iid, values=values)
+                    tree.detach(iid)
+            # Auto-size once the stream settles (coalesce batches)
+            if getattr(self, "_units_autosize_job", None):
+                self.root.after_cancel(self._units_autosize_job)
+            self._units_autosize_job = self.root.after(400, self._autosize_units_after_batch)
+        except Exception:
+            # Non-fatal UI update error; ignore
+            pass
+
+    def _autosize_units_after_batch(self):
+        self._units_autosize_job = None
+        if self._units_view_active():
+            self._apply_units_view()
+        self.auto_size_columns()
+        try:
+            self.update_units_column_separators()
+        except Exception:
+            pass
+
+    def _units_view_active(self):
+        return bool(self.units_query.strip()) or self.units_sort is not None
+
+    def _get_units_index(self, cols):
+        if self._units_index is None:
+            values = self._units_item_values
+            self._units_index = UnitsIndex([values[iid] for iid in self._units_row_iids], cols)
+        return self._units_index
+
+    def _units_view_order(self, values_by_iid, cols, baud_idx):
+        """Visible iids: the baudrate filter, then the query bar, in sort order (or data order)."""
+        row_iids = self._units_row_iids
+        hide = self.hide_no_baudrate
+        if not self._units_view_active():
+            return [iid for iid in row_iids if not hide or values_by_iid[iid][baud_idx].strip()]
+        index = self._get_units_index(cols)
+        if self.units_sort is not None:
+            positions = index.sorted_positions(*self.units_sort)
+        else:
+            positions = range(len(row_iids))
+        matches = index.query(self.units_query)
+        visible = []
+        for pos in positions:
+            if matches is not None and pos not in matches:
+                continue
+            iid = row_iids[pos]
+            if not hide or values_by_iid[iid][baud_idx].strip():
+                visible.append(iid)
+        return visible
+
+    def _apply_units_view(self):
+        """Re-attach the Units rows for the current query/sort without touching cell values."""
+        if not self.units_tab_built:
+            return
         try:
-            cols = list(getattr(self.units_tree, "__getitem__", lambda _k: [])("columns") or [])
-            # Fallback if Treeview indexing fails for any reason
-            if not cols:
-                cols = ["unit_id", "unit_name", "driver_type", "driver_addr", "regulator_type", "com_port", "baudrate", "parity", "ip_address"]
+            tree = self.units_tree
+            cols = self._units_columns()
+            baud_idx = cols.index("baudrate") if "baudrate" in cols else 6
+            visible = self._units_view_order(self._units_item_values, cols, baud_idx)
+            if visible != self._units_visible:
+                tree.set_children('', *visible)
+                tags = self._units_item_tags
+                for i, iid in enumerate(visible):
+                    tag = 'evenrow' if i % 2 == 0 else 'oddrow'
+                    if tags.get(iid) != tag:
+                        tree.item(iid, tags=(tag,))
+                        tags[iid] = tag
+                self._units_visible = visible
+            self._update_units_sort_headers()
+        except Exception:
+            # Non-fatal UI update error; ignore
+            pass
+
+    def _on_units_query_changed(self, *_args):
+        # Debounce typing; the query itself is index lookups, the Tk relayout is the cost
+        if self._units_query_job:
+            self.root.after_cancel(self._units_query_job)
+        self._units_query_job = self.root.after(150, self._run_units_query)
+
+    def _run_units_query(self):
+        self._units_query_job = None
+        self.units_query = self.units_query_var.get()
+        self._apply_units_view()
+
+    def sort_units_by(self, column):
+        """Header click: sort ascending, then descending, then back to data order."""
+        if self.units_sort is None or self.units_sort[0] != column:
+            self.units_sort = (column, False)
+        elif not self.units_sort[1]:
+            self.units_sort = (column, True)
+        else:
+            self.units_sort = None
+        self._apply_units_view()
 
-            # Figure out the baudrate column index safely (fixes previous off-by-one/parity mixup)
+    def _update_units_sort_headers(self):
+        headers = getattr(self, "_units_headers", None)
+        if not headers or getattr(self, "_units_sort_shown", None) == self.units_sort:
+            return
+        self._units_sort_shown = self.units_sort
+        sort_col, descending = self.units_sort or (None, False)
+        for col, title in headers.items():
+            if col == sort_col:
+                title = f"{title} {'▼' if descending else '▲'}"
             try:
-                baud_idx = cols.index("baudrate")
-            except ValueError:
-                baud_idx = 6
+                self.units_tree.heading(col, text=title)
+            except Exception:
+                pass
+
+    def toggle_units_sweep(self):
+        if self.sweep_active:
+            self.stop_units_sweep()
+        else:
+            self.start_units_sweep()
 
-            # Determine filtered view
-            if self.hide_no_baudrate:
-                filtered = [r for r in (self.units_rows or []) if len(r) > baud_idx and str(r[baud_idx]).strip()]
+    def _plan_units_sweep(self):
+        """
+        Group the loaded units by bus: COM port for RTU units, IP host for TCP units.
+        Each unit is polled for the Basic tab's -r/-c/-t block with its own baud/parity.
+        Returns ({bus: [SweepTarget, ...] in address order}, number of units without a port or IP).
+        """
+        start_reference = self.entry_start_reference.get().strip()
+        count = self.entry_num_values.get().strip()
+        register_type = self.entry_register_data_type.get().strip()
+        start_reference = start_reference if start_reference.isdigit() else "100"
+        count = count if count.isdigit() and int(count) > 0 else "1"
+        register_type = register_type if register_type.isdigit() else "3"
+        databits = self.cmb_databits.get().strip() or "8"
+        stopbits = self.normalize_stopbits_value(self.cmb_stopbits.get())
+        block = [f"-r{start_reference}", f"-c{count}", f"-t{register_type}", "-1"]
+
+        cols = self._units_columns()
+        col = {name: i for i, name in enumerate(cols)}
+        buses = {}
+        unreachable = 0
+        for iid in self._units_row_iids:
+            values = self._units_item_values.get(iid)
+            if values is None:
+                continue
+            com_port = values[col["com_port"]].strip() if "com_port" in col else ""
+            baudrate = values[col["baudrate"]].strip() if "baudrate" in col else ""
+            ip_address = values[col["ip_address"]].strip() if "ip_address" in col else ""
+            address = unit_address_number(values[col["driver_addr"]]) if "driver_addr" in col else None
+            if com_port and baudrate.isdigit():
+                com_port = com_port_name(com_port)
+                parity = self.normalize_parity_value(values[col["parity"]].strip() if "parity" in col else "") or "none"
+                address = address if address is not None else 1
+                arguments = [self.format_com_port(com_port), f"-b{baudrate}", f"-p{parity}", f"-d{databits}",
+                             f"-s{stopbits}", f"-a{address}"] + block
+                try:
+                    floor_s = BusCapacityModel(baudrate, parity, stopbits, databits).transaction_s(register_type, int(count))
+                except ValueError:
+                    floor_s = 0.1
+                bus = port_key = com_port
+            elif ip_address:
+                address = address if address is not None else 1
+                arguments = ["-m", "tcp", ip_address, f"-a{address}"] + block
+                floor_s = 0.1
+                bus = ip_address.split(":")[0]
+                port_key = ip_address
             else:
-                filtered = list(self.units_rows or [])
-
-            # Clear existing
-            for item in self.units_tree.get_children():
-                self.units_tree.delete(item)
-
-            # Insert filtered with row striping
-            for idx, r in enumerate(filtered):
-                # Normalize row length to match the Treeview columns exactly
-                if isinstance(r, dict):
-                    row_values = [r.get(c, "") for c in cols]
-                elif isinstance(r, (list, tuple)):
-                    row_values = list(r[: len(cols)])
-                    if len(row_values) < len(cols):
-                        row_values.extend([""] * (len(cols) - len(row_values)))
-                else:
-                    # Unknown row type; best-effort: stringify into first column
-                    row_values = [str(r)] + [""] * (len(cols) - 1)
+                unreachable += 1
+                continue
+            # Same key as run_modpoll, so the sweep and normal polling share learned timeouts/backoff
+            buses.setdefault(bus, []).append(SweepTarget(iid, bus, (port_key, str(address)), arguments, floor_s))
+        for targets in buses.values():
+            targets.sort(key=lambda t: int(t.key[1]))
+        return buses, unreachable
+
+    def start_units_sweep(self):
+        """Poll every loaded unit once (or every N seconds) and write the results to the Health column."""
+        if self.is_polling:
+            messagebox.showinfo("Sweep All Units", "Stop polling first; the sweep needs the COM ports.")
+            return
+        if not self.units_rows:
+            messagebox.showinfo("Sweep All Units", "Load the units first (Get Units Data).")
+            return
+        if not os.path.exists(self.modpoll_path):
+            messagebox.showwarning("modpoll.exe missing", f"modpoll.exe was not found at:\n{self.modpoll_path}")
+            return
+        interval_text = self.entry_sweep_interval.get().strip()
+        try:
+            interval_s = float(interval_text) if interval_text else 0.0
+            if interval_s < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning("Invalid Interval", "Sweep interval must be a number of seconds (empty = sweep once).")
+            return
+        update_settings(sweep_interval_s=interval_text)
 
-                tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
-                self.units_tree.insert('', 'end', values=row_values, tags=(tag,))
+        buses, unreachable = self._plan_units_sweep()
+        if not buses:
+            messagebox.showinfo("Sweep All Units", "No units with a COM port/baudrate or an IP address in the table.")
+            return
+        total = sum(len(targets) for targets in buses.values())
+        repeat = f", repeating every {interval_s:g} s" if interval_s > 0 else ""
+        skipped = f" ({unreachable} without COM port or IP skipped)" if unreachable else ""
+        self.append_log_direct(f"Health sweep: {total} units on {len(buses)} buses{repeat}{skipped}.", 'info')
+
+        self.sweep_active = True
+        self.btn_sweep_units.configure(text="Stop Sweep", fg_color=self.accent_error, border_color=self.accent_error)
+        for targets in buses.values():
+            for target in targets:
+                self._post_sweep_status(target.iid, "Queued")
+        threading.Thread(target=self.run_units_sweep, args=(buses, interval_s), daemon=True).start()
+
+    def stop_units_sweep(self):
+        self.sweep_active = False
+        with self._sweep_lock:
+            procs = list(self._sweep_procs)
+        for proc in procs:
+            try:
+                proc.kill()
+            except Exception:
+                pass
 
-            # Auto-size columns after data load
-            self.root.after(100, self.auto_size_columns)
-            # Keep custom separators aligned after refresh (especially after big data changes)
+    def run_units_sweep(self, buses, interval_s):
+        """Sweep thread: buses in parallel (up to SWEEP_MAX_BUSES), units on one bus one after another."""
+        try:
+            while self.sweep_active:
+                t0 = time.monotonic()
+                with ThreadPoolExecutor(max_workers=min(SWEEP_MAX_BUSES, len(buses))) as pool:
+                    results = [outcome for bus_results in pool.map(self._sweep_bus, buses.values()) for outcome in bus_results]
+                if not self.sweep_active:
+                    break
+                counts = {name: results.count(name) for name in ("ok", "timeout", "error", "skipped")}
+                self.log_queue.put((
+                    'error' if counts["timeout"] or counts["error"] else 'info',
+                    f"Health sweep done in {time.monotonic() - t0:.1f} s: {counts['ok']} OK, "
+                    f"{counts['timeout']} no response, {counts['error']} errors, {counts['skipped']} backed off"
+                ))
+                if interval_s <= 0:
+                    break
+                # Interruptible sleep so Stop Sweep reacts immediately
+                while self.sweep_active and time.monotonic() < t0 + interval_s:
+                    time.sleep(0.1)
+        except Exception as e:
+            self.log_queue.put(('error', f"Health sweep failed: {e}"))
+        finally:
+            self.sweep_active = False
             try:
-                self.root.after(120, self.update_units_column_separators)
+                self.root.after(0, self._on_units_sweep_finished)
             except Exception:
                 pass
+
+    def _sweep_bus(self, targets):
+        """Poll the units of one bus in turn; returns their outcomes."""
+        popen_kwargs = hidden_window_popen_kwargs()
+        outcomes = []
+        for target in targets:
+            if not self.sweep_active:
+                break
+            t0 = time.monotonic()
+            retry_s = self.timeout_tracker.backoff_remaining(target.key, t0)
+            if retry_s > 0:
+                self._post_sweep_status(target.iid, f"Backed off - retry in {retry_s:.0f} s")
+                outcomes.append("skipped")
+                continue
+            self._post_sweep_status(target.iid, "Polling...")
+            timeout_s = self.timeout_tracker.timeout_s(target.key, target.floor_s)
+            cmd = [self.modpoll_path] + target.arguments + [f"-o{timeout_s:.2f}"]
+            out = ""
+            try:
+                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                        shell=False, **popen_kwargs)
+                with self._sweep_lock:
+                    self._sweep_procs.add(proc)
+                try:
+                    out, _ = proc.communicate(timeout=min(10.0, timeout_s * 2 + 2.0))
+                    outcome, text = sweep_status_from_output(out)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.communicate()
+                    outcome, text = "timeout", "No response"
+                finally:
+                    with self._sweep_lock:
+                        self._sweep_procs.discard(proc)
+            except OSError as e:
+                outcome, text = "error", str(e)
+            if not self.sweep_active:
+                break
+            t1 = time.monotonic()
+            backoff_s = self.timeout_tracker.record(target.key, t1 - t0, outcome == "ok", t1, timeout_s)
+            if outcome == "ok":
+                text = f"OK {(t1 - t0) * 1000:.0f} ms  {text}"
+            elif backoff_s:
+                text = f"{text} - backed off {backoff_s:.0f} s"
+            self._post_sweep_status(target.iid, text)
+            outcomes.append(outcome)
+        return outcomes
+
+    def _post_sweep_status(self, iid, text):
+        """Queue a Health cell update (any thread); the table is written in batches on the UI thread."""
+        with self._sweep_lock:
+            self._sweep_pending[iid] = text
+            if self._sweep_flush_scheduled:
+                return
+            self._sweep_flush_scheduled = True
+        try:
+            self.root.after(SWEEP_FLUSH_MS, self._flush_sweep_status)
+        except Exception:
+            pass
+
+    def _flush_sweep_status(self):
+        with self._sweep_lock:
+            pending, self._sweep_pending = self._sweep_pending, {}
+            self._sweep_flush_scheduled = False
+        if not self.units_tab_built:
+            return
+        tree = self.units_tree
+        for iid, text in pending.items():
+            if iid in self._units_item_values:
+                try:
+                    tree.set(iid, UNITS_HEALTH_COLUMN, text)
+                except Exception:
+                    pass
+
+    def _on_units_sweep_finished(self):
+        try:
+            self.btn_sweep_units.configure(text="Sweep All Units", fg_color=self.bg_tertiary, border_color=self.bg_card)
         except Exception:
-            # Non-fatal UI update error; ignore
             pass
 
     def select_first_equipment(self, event=None):
@@ -3358,8 +7280,7 @@ Ready to poll..."""
                 elif str(driver_addr).isdigit():
                     address = str(driver_addr)
                 else:
-                    import re as _re
-                    m = _re.search(r"(\d+)$", str(driver_addr))
+                    m = _TRAILING_DIGITS_RE.search(str(driver_addr))
                     if m:
                         address = m.group(1)
 
@@ -3441,6 +7362,58 @@ Ready to poll..."""
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    def plan_bus_capacity(self):
+        """Predict the cycle time of each COM line in the Units table polling the current -c/-t block per unit."""
+        if not self.units_rows:
+            messagebox.showinfo("Bus Capacity", "Load the units first (Get Units Data).")
+            return
+        register_type = self.entry_register_data_type.get().strip() or "3"
+        try:
+            count = max(1, int(self.entry_num_values.get().strip()))
+        except ValueError:
+            count = 1
+        stopbits = self.normalize_stopbits_value(self.cmb_stopbits.get())
+        databits = self.cmb_databits.get().strip() or "8"
+
+        # Columns: unit_id(0), unit_name(1), driver_type(2), driver_addr(3), regulator_type(4),
+        #          com_port(5), baudrate(6), parity(7), ip_address(8)
+        buses = {}
+        for r in self.units_rows:
+            if not isinstance(r, (list, tuple)) or len(r) < 8:
+                continue
+            com_port = str(r[5]).strip()
+            baudrate = str(r[6]).strip()
+            if not com_port or not baudrate.isdigit():
+                continue
+            if com_port.isdigit():
+                com_port = f"COM{com_port}"
+            parity = self.normalize_parity_value(str(r[7]).strip()) or "none"
+            buses.setdefault((com_port.upper(), baudrate, parity), []).append(r)
+
+        if not buses:
+            messagebox.showinfo("Bus Capacity", "No units with a COM port and baudrate in the table.")
+            return
+
+        turnaround = self.measured_turnaround_s
+        source = "measured, modpoll start-up excluded" if turnaround is not None else "assumed"
+        self.append_log_direct(
+            f"Bus capacity ({count} x type {register_type} per unit, turnaround "
+            f"{(turnaround if turnaround is not None else BusCapacityModel.DEFAULT_TURNAROUND_S) * 1000:.0f} ms {source}):",
+            'info'
+        )
+        for (com_port, baudrate, parity), units in sorted(buses.items(), key=lambda kv: natural_sort_key(kv[0][0])):
+            try:
+                model = BusCapacityModel(baudrate, parity, stopbits, databits, turnaround)
+            except ValueError:
+                continue
+            cycle_s = model.cycle_s([(register_type, count)] * len(units))
+            verdict = "OK for 1 s polling" if cycle_s <= 1.0 * model.SATURATION_LOAD else "cannot be polled every second"
+            self.append_log_direct(
+                f"  {com_port} @ {model.line_label}: {len(units)} units -> cycle {cycle_s:.2f} s "
+                f"({len(units) / cycle_s:.1f} polls/s max) - {verdict}",
+                'info' if cycle_s <= 1.0 * model.SATURATION_LOAD else 'error'
+            )
+
     def apply_custom_command(self):
         """Apply custom command from the command line entry"""
         custom_cmd = self.cmd_var.get().strip()
@@ -3448,7 +7421,6 @@ Ready to poll..."""
             # Parse the custom command into arguments
             try:
                 # Split the command into arguments, handling quotes properly
-                import shlex
                 # Windows-safe parsing (preserve backslashes like \\\\.\\COM10)
                 self.custom_arguments = shlex.split(custom_cmd, posix=False)
                 self.log_queue.put(('info', f"Custom command applied: {custom_cmd}"))
@@ -3464,12 +7436,8 @@ Ready to poll..."""
         if not text:
             return ''
         
-        import re
-        # Pattern to match IPv4 addresses
-        ip_pattern = r'[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}'
-        
-        # Find the first IP address in the text
-        match = re.search(ip_pattern, text)
+        # Find the first IPv4 address in the text
+        match = _IPV4_RE.search(text)
         if match:
             ip_address = match.group(0)
             # Always hide 127.0.0.1 addresses (localhost)
@@ -3538,259 +7506,275 @@ Ready to poll..."""
             
 
             
-            # Try primary credentials first (iwmac with blank password)
-            cmd = [
-                self.mysql_exe_path,
-                "-h", "127.0.0.1",
-                "-u", "iwmac",
-                "--password=",
-                "-D", "iw_plant_server3",
-                "-N", "-B",
-                "--protocol=tcp",
-                "--default-character-set=utf8mb4",
-                "--connect-timeout=5",
-                "-e", query,
-            ]
-            
             def run_query_with_fallback():
-                try:
-                    # Prevent window popup
-                    startupinfo = subprocess.STARTUPINFO()
-                    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                    creationflags = subprocess.CREATE_NO_WINDOW
-                    
-                    result = subprocess.run(
-                        cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        encoding='utf-8',
-                        errors='replace',
-                        shell=False,
-                        startupinfo=startupinfo,
-                        creationflags=creationflags,
-                    )
-                    
-                    if result.returncode != 0:
-                        err = result.stderr.strip() or "Unknown MySQL error"
-                        self.log_queue.put(('info', f"Primary MySQL query failed (iwmac/blank): rc={result.returncode}, stderr='{err}'. Trying fallback credentials..."))
-                        try_fallback_credentials()
-                        return
-                    
-                    # Debug: count raw lines
-                    raw_output = result.stdout or ''
-                    raw_lines = raw_output.splitlines()
-                    if self.debug_mysql_logs:
-                        self.log_queue.put(('info', f"MySQL returned {len(raw_lines)} raw lines (iwmac/blank). Parsing... (stdout {len(raw_output)} bytes, stderr {len((result.stderr or '').strip())} bytes)"))
-
-                    # Build rows using a map to deduplicate by unit_id and prefer entries with IP
-                    rows_map = {}
-                    for line in raw_lines:
-                        if not line.strip():
-                            continue
-                        parts = line.split('\t')
-
-                        # Safely unpack with defaults for optional columns
-                        unit_id = parts[0] if len(parts) > 0 else ''
-                        unit_name = parts[1] if len(parts) > 1 else ''
-                        driver_type = parts[2] if len(parts) > 2 else ''
-                        driver_addr = parts[3] if len(parts) > 3 else ''
-                        regulator_type = parts[4] if len(parts) > 4 else ''
-                        com_port_value = parts[5] if len(parts) > 5 else ''
-                        full_ip_value = parts[6] if len(parts) > 6 else ''
-                        mb_mode = parts[7] if len(parts) > 7 else '0'
-                        mb_tcp_servers = parts[8] if len(parts) > 8 else ''
-                        baudrate_value = parts[9] if len(parts) > 9 else ''
-                        parity_value_raw = parts[10] if len(parts) > 10 else ''
-                        parity_value = self.normalize_parity_value(parity_value_raw)
-
-                        clean_ip_address = self.extract_ip_address(full_ip_value)
-
-                        # Handle TCP mode (mb_mode=2): clear COM and, if needed, extract IP from mb_tcp_servers
-                        if mb_mode == '2':
-                            com_port_value = ''
-                            if not clean_ip_address and mb_tcp_servers:
-                                tcp_parts = mb_tcp_servers.split(';')
-                                if len(tcp_parts) >= 2:
-                                    tcp_ip = tcp_parts[1].strip()
-                                    if self.extract_ip_address(tcp_ip):
-                                        clean_ip_address = tcp_ip
-
-                        # Skip AK2 entries without IP address
-                        if driver_type == 'AK2' and not clean_ip_address:
-                            continue
-
-                        reordered_row = [
-                            unit_id,
-                            unit_name,
-                            driver_type,
-                            driver_addr,
-                            regulator_type,
-                            com_port_value,
-                            baudrate_value,
-                            parity_value,
-                            clean_ip_address,
-                        ]
-
-                        existing = rows_map.get(unit_id)
-                        if existing is None:
-                            rows_map[unit_id] = reordered_row
-                        else:
-                            existing_ip = existing[-1]
-                            if not existing_ip and clean_ip_address:
-                                rows_map[unit_id] = reordered_row
-
-                    rows = list(rows_map.values())
-                    if self.debug_mysql_logs:
-                        self.log_queue.put(('info', f"Parsed {len(rows)} rows from MySQL (iwmac/blank)."))
-
-                    # If primary returns zero rows, attempt fallback immediately
-                    if len(rows) == 0:
-                        self.log_queue.put(('info', "No rows from iwmac/blank; trying fallback credentials (root/blank)..."))
-                        try_fallback_credentials()
+                # Remembered credentials for this host first (one connection in the common case)
+                remembered = (load_settings().get("mysql_credentials") or {}).get(MYSQL_HOST)
+                if remembered in MYSQL_UNITS_USERS:
+                    try:
+                        returncode, stderr_text, count = self._stream_units_query(self._mysql_units_command(remembered, query), remembered)
+                    except Exception as e:
+                        returncode, stderr_text, count = -1, str(e), 0
+                    if returncode == 0 and count:
+                        self.log_queue.put(('info', f"Successfully loaded {count} units with COM port and IP address information!"))
                         return
-                    
-                    def update_table():
-                        # Enable Modbus-supported units filter by default on fetch
-                        self.hide_no_baudrate = True
-                        # CustomTkinter uses .configure (not .config)
-                        self.btn_toggle_baud_filter.configure(text="🔍  Show All Units")
-                        self.set_units_rows(rows)
-                    self.root.after(0, update_table)
-                    self.log_queue.put(('info', f"Successfully loaded {len(rows)} units with COM port and IP address information!"))
-                    
-                except Exception as e:
-                    # If primary credentials fail for any reason, try fallback credentials
-                    self.log_queue.put(('info', f"Primary database connection failed (iwmac/blank). Trying fallback credentials..."))
-                    try_fallback_credentials()
-            
-            def try_fallback_credentials():
-                """Try connecting with fallback database credentials."""
-                try:
-                    # Prevent window popup
-                    startupinfo = subprocess.STARTUPINFO()
-                    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                    creationflags = subprocess.CREATE_NO_WINDOW
-
-                    # Fallback: root with blank password (validated)
-                    fallback_cmd = [
-                        self.mysql_exe_path,
-                        "-h", "127.0.0.1",
-                        "-u", "root",
-                        "--password=",
-                        "-D", "iw_plant_server3",
-                        "-N", "-B",
-                        "--protocol=tcp",
-                        "--default-character-set=utf8mb4",
-                        "--connect-timeout=5",
-                        "-e", query,
-                    ]
-                    
-                    self.log_queue.put(('info', "Attempting connection with fallback credentials (root/blank)..."))
-                    
-                    result = subprocess.run(
-                        fallback_cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        encoding='utf-8',
-                        errors='replace',
-                        shell=False,
-                        startupinfo=startupinfo,
-                        creationflags=creationflags,
-                    )
-                    
-                    if result.returncode != 0:
-                        err = result.stderr.strip() or "Unknown MySQL error"
-                        self.log_queue.put(('error', f"Fallback MySQL query failed (root/blank): rc={result.returncode}, stderr='{err}'"))
+                    if returncode != 0 and is_mysql_connect_error(stderr_text):
+                        # Unreachable server: probing would only wait out another connect timeout
+                        self.log_queue.put(('error', f"Cannot reach the MySQL server at {MYSQL_HOST}: {stderr_text}"))
+                        self.root.after(0, lambda: messagebox.showerror(
+                            "Database Error", f"Cannot reach the MySQL server at {MYSQL_HOST}:\n{stderr_text}"))
                         return
-                    
-                    # Debug: count raw lines
-                    raw_output = result.stdout or ''
-                    raw_lines = raw_output.splitlines()
-                    if self.debug_mysql_logs:
-                        self.log_queue.put(('info', f"MySQL returned {len(raw_lines)} raw lines (root/blank). Parsing... (stdout {len(raw_output)} bytes, stderr {len((result.stderr or '').strip())} bytes)"))
-
-                    # Build rows using a map to deduplicate by unit_id and prefer entries with IP
-                    rows_map = {}
-                    for line in raw_lines:
-                        if not line.strip():
-                            continue
-                        parts = line.split('\t')
-
-                        # Safely unpack with defaults for optional columns
-                        unit_id = parts[0] if len(parts) > 0 else ''
-                        unit_name = parts[1] if len(parts) > 1 else ''
-                        driver_type = parts[2] if len(parts) > 2 else ''
-                        driver_addr = parts[3] if len(parts) > 3 else ''
-                        regulator_type = parts[4] if len(parts) > 4 else ''
-                        com_port_value = parts[5] if len(parts) > 5 else ''
-                        full_ip_value = parts[6] if len(parts) > 6 else ''
-                        mb_mode = parts[7] if len(parts) > 7 else '0'
-                        mb_tcp_servers = parts[8] if len(parts) > 8 else ''
-                        baudrate_value = parts[9] if len(parts) > 9 else ''
-                        parity_value_raw = parts[10] if len(parts) > 10 else ''
-                        parity_value = self.normalize_parity_value(parity_value_raw)
-
-                        clean_ip_address = self.extract_ip_address(full_ip_value)
-
-                        # Handle TCP mode (mb_mode=2)
-                        if mb_mode == '2':
-                            com_port_value = ''
-                            if not clean_ip_address and mb_tcp_servers:
-                                tcp_parts = mb_tcp_servers.split(';')
-                                if len(tcp_parts) >= 2:
-                                    tcp_ip = tcp_parts[1].strip()
-                                    if self.extract_ip_address(tcp_ip):
-                                        clean_ip_address = tcp_ip
-
-                        # Skip AK2 entries without IP address
-                        if driver_type == 'AK2' and not clean_ip_address:
-                            continue
-
-                        reordered_row = [
-                            unit_id,
-                            unit_name,
-                            driver_type,
-                            driver_addr,
-                            regulator_type,
-                            com_port_value,
-                            baudrate_value,
-                            parity_value,
-                            clean_ip_address,
-                        ]
+                    self.log_queue.put(('info', f"Remembered credentials ({remembered}/blank) failed or returned no rows; probing all credentials..."))
+
+                # Probe every credential set at once with SELECT 1, then query with the working ones in preference order
+                working, errors = self._probe_mysql_users(MYSQL_UNITS_USERS)
+                if not working:
+                    details = "; ".join(f"{user}/blank: {err}" for user, err in errors.items())
+                    self.log_queue.put(('error', f"MySQL login failed for all credentials ({details})"))
+                    self.root.after(0, lambda: messagebox.showerror(
+                        "Database Error", f"All database credentials failed:\n{details}"))
+                    return
 
-                        existing = rows_map.get(unit_id)
-                        if existing is None:
-                            rows_map[unit_id] = reordered_row
-                        else:
-                            existing_ip = existing[-1]
-                            if not existing_ip and clean_ip_address:
-                                rows_map[unit_id] = reordered_row
+                for user in working:
+                    try:
+                        returncode, stderr_text, count = self._stream_units_query(self._mysql_units_command(user, query), user)
+                    except Exception as e:
+                        self.log_queue.put(('error', f"Units query failed ({user}/blank): {e}"))
+                        continue
+                    if returncode != 0:
+                        err = stderr_text or "Unknown MySQL error"
+                        self.log_queue.put(('error', f"Units query failed ({user}/blank): rc={returncode}, stderr='{err}'"))
+                        continue
+                    if count == 0:
+                        self.log_queue.put(('info', f"No rows from {user}/blank; trying the next credentials..."))
+                        continue
+                    if user != remembered:
+                        credentials = dict(load_settings().get("mysql_credentials") or {})
+                        credentials[MYSQL_HOST] = user
+                        update_settings(mysql_credentials=credentials)
+                    self.log_queue.put(('info', f"Successfully loaded {count} units with COM port and IP address information!"))
+                    return
 
-                    rows = list(rows_map.values())
-                    if self.debug_mysql_logs:
-                        self.log_queue.put(('info', f"Parsed {len(rows)} rows from MySQL (root/blank)."))
-                    
-                    def update_table():
-                        # Enable Modbus-supported units filter by default on fetch
-                        self.hide_no_baudrate = True
-                        # CustomTkinter uses .configure (not .config)
-                        self.btn_toggle_baud_filter.configure(text="🔍  Show All Units")
-                        self.set_units_rows(rows)
-                    self.root.after(0, update_table)
-                    self.log_queue.put(('info', f"Successfully loaded {len(rows)} units with COM port and IP address information!"))
-                    
-                except Exception as e:
-                    self.log_queue.put(('error', f"Fallback database connection also failed: {e}"))
-                    messagebox.showerror("Database Error", f"Both primary and fallback database connections failed:\n{str(e)}")
-            
             threading.Thread(target=run_query_with_fallback, daemon=True).start()
             
         except Exception as e:
             self.log_queue.put(('error', f"Error starting units fetch: {e}"))
             messagebox.showerror("Error", str(e))
 
+    def _mysql_units_command(self, user, query):
+        """mysql.exe command line for the units query (tab-separated, no headers)."""
+        return [
+            self.mysql_exe_path,
+            "-h", MYSQL_HOST,
+            "-u", user,
+            "--password=",
+            "-D", "iw_plant_server3",
+            "-N", "-B",
+            "--protocol=tcp",
+            "--default-character-set=utf8mb4",
+            "--connect-timeout=5",
+            "-e", query,
+        ]
+
+    def _probe_mysql_users(self, users):
+        """
+        Log in with every user at once (SELECT 1, blank passwords), so a bad login costs
+        one connect timeout instead of one per credential set.
+        Returns (working users in the given preference order, {failed user: error}).
+        """
+        popen_kwargs = hidden_window_popen_kwargs()
+        procs = {}
+        errors = {}
+        for user in users:
+            try:
+                procs[user] = subprocess.Popen(
+                    self._mysql_units_command(user, "SELECT 1"),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    encoding='utf-8',
+                    errors='replace',
+                    shell=False,
+                    **popen_kwargs,
+                )
+            except OSError as e:
+                errors[user] = str(e)
+        working = []
+        for user in users:
+            proc = procs.get(user)
+            if proc is None:
+                continue
+            try:
+                out, err = proc.communicate(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                errors[user] = "timed out"
+                continue
+            if proc.returncode == 0 and out.strip() == "1":
+                working.append(user)
+            else:
+                errors[user] = (err or "").strip() or f"rc={proc.returncode}"
+        if self.debug_mysql_logs:
+            self.log_queue.put(('info', f"MySQL credential probe: working={working}, failed={list(errors)}"))
+        return working, errors
+
+    def parse_unit_row(self, line):
+        """
+        Normalize one tab-separated units query line into a UnitRecord:
+        (unit_id, unit_name, driver_type, driver_addr, regulator_type, com_port, baudrate, parity, ip_address).
+        Returns None for blank lines and AK2 units without an IP address.
+        """
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            return None
+        parts = line.split('\t')
+
+        # Safely unpack with defaults for optional columns
+        parts.extend([''] * (11 - len(parts)))
+        (unit_id, unit_name, driver_type, driver_addr, regulator_type, com_port_value,
+         full_ip_value, mb_mode, mb_tcp_servers, baudrate_value, parity_value_raw) = parts[:11]
+        mb_mode = mb_mode or '0'
+        parity_value = self.normalize_parity_value(parity_value_raw)
+
+        clean_ip_address = self.extract_ip_address(full_ip_value)
+
+        # Handle TCP mode (mb_mode=2): clear COM and, if needed, extract IP from mb_tcp_servers
+        if mb_mode == '2':
+            com_port_value = ''
+            if not clean_ip_address and mb_tcp_servers:
+                tcp_parts = mb_tcp_servers.split(';')
+                if len(tcp_parts) >= 2:
+                    tcp_ip = tcp_parts[1].strip()
+                    if self.extract_ip_address(tcp_ip):
+                        clean_ip_address = tcp_ip
+
+        # Skip AK2 entries without IP address
+        if driver_type == 'AK2' and not clean_ip_address:
+            return None
+
+        return make_unit_record(
+            unit_id,
+            unit_name,
+            driver_type,
+            driver_addr,
+            regulator_type,
+            com_port_value,
+            baudrate_value,
+            parity_value,
+            clean_ip_address,
+        )
+
+    UNITS_BATCH_INTERVAL_S = 0.3
+
+    def _stream_units_query(self, cmd, user):
+        """
+        Run the units query and push rows to the table while mysql is still writing them.
+
+        The query is ordered by unit_id, so duplicate lines of a unit (one per matching
+        IP setting) arrive together. The current unit is held back until the next one
+        starts, preferring a line with an IP, and is then final. The first row is shown
+        immediately, later rows in batches every UNITS_BATCH_INTERVAL_S.
+        Returns (returncode, stderr text, row count).
+        """
+        # Prevent window popup
+        popen_kwargs = hidden_window_popen_kwargs()
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            shell=False,
+            **popen_kwargs,
+        )
+        # Drain stderr on the side so a chatty error stream can never block stdout
+        stderr_chunks = []
+        stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+        stderr_thread.start()
+
+        seen = {}  # unit_id -> emitted row (late duplicates out of order are merged at the end)
+        batch = []
+        pending = None
+        count = lines = 0
+        late_updates = False
+        first_push = True
+        last_push = time.perf_counter()
+
+        def push(rows, replace):
+            def _apply():
+                if replace:
+                    # Enable Modbus-supported units filter by default on fetch
+                    self.hide_no_baudrate = True
+                    try:
+                        # CustomTkinter uses .configure (not .config)
+                        self.btn_toggle_baud_filter.configure(text="🔍  Show All Units")
+                    except Exception:
+                        pass
+                    self.set_units_rows(rows)
+                else:
+                    self.append_units_rows(rows)
+            self.root.after(0, _apply)
+
+        def emit(row):
+            nonlocal count, late_updates
+            existing = seen.get(row[0])
+            if existing is not None:
+                # Duplicate unit_id that did not arrive adjacent: keep the variant with an IP
+                if not existing[-1] and row[-1]:
+                    seen[row[0]] = row
+                    late_updates = True
+                return
+            seen[row[0]] = row
+            batch.append(row)
+            count += 1
+
+        try:
+            for line in proc.stdout:
+                lines += 1
+                row = self.parse_unit_row(line)
+                if row is None:
+                    continue
+                if pending is not None and pending[0] == row[0]:
+                    if not pending[-1] and row[-1]:
+                        pending = row
+                    continue
+                if pending is not None:
+                    emit(pending)
+                pending = row
+                now = time.perf_counter()
+                if batch and (first_push or now - last_push >= self.UNITS_BATCH_INTERVAL_S):
+                    push(list(batch), first_push)
+                    batch.clear()
+                    first_push = False
+                    last_push = now
+            if pending is not None:
+                emit(pending)
+        except BaseException:
+            # Nobody reads stdout any more: stop mysql instead of waiting for it to finish the result
+            try:
+                proc.kill()
+            except OSError:
+                pass
+            raise
+        finally:
+            try:
+                proc.stdout.close()
+            except Exception:
+                pass
+            returncode = proc.wait()
+            stderr_thread.join(timeout=1.0)
+
+        if returncode == 0 and count:
+            if late_updates:
+                push(list(seen.values()), True)
+            elif batch or first_push:
+                push(list(batch), first_push)
+        stderr_text = "".join(stderr_chunks).strip()
+        if self.debug_mysql_logs:
+            self.log_queue.put(('info', f"MySQL streamed {lines} raw lines ({user}/blank), {count} rows (stderr {len(stderr_text)} bytes)."))
+        return returncode, stderr_text, count
+
     def toggle_equipment_pane(self):
         if not self.equipment_pane_visible:
             self.show_equipment_pane()
@@ -3847,6 +7831,7 @@ Ready to poll..."""
     def blink_indicator(self):
         if not self.blinking:
             return
+        t_stage = time.perf_counter() if self.stage_timers.enabled else 0.0
 
         if self.blink_state:
             # Set to dim color with glow
@@ -3859,6 +7844,8 @@ Ready to poll..."""
 
         self.blink_state = not self.blink_state
         self.blink_count += 1
+        if t_stage:
+            self.stage_timers.record("status", time.perf_counter() - t_stage)
 
         # Schedule the next blink
         self.blink_job = self.root.after(400, self.blink_indicator)  # Faster blink for modern feel
@@ -3879,8 +7866,517 @@ Ready to poll..."""
 
 
 
-if __name__ == "__main__":
+# ---------------- Benchmarks ----------------
+
+class _BenchRoot:
+    """Stand-in for the Tk root when benchmarking parser paths without a display."""
+
+    def after(self, _ms, _func=None, *_args):
+        return None
+
+    def after_idle(self, _func, *_args):
+        return None
+
+
+def _bench_parser_tool():
+    """A ModpollingTool with just the state read_stream() needs (no widgets, writes stay queued)."""
+    tool = ModpollingTool.__new__(ModpollingTool)
+    tool.root = _BenchRoot()
+    tool.terminal_write_queue = queue.Queue()
+    tool.terminal_flush_scheduled = True  # Never schedule a flush; the queue is drained by the benchmark
+    tool.deadband_filter = None
+    tool._pending_attempt_line = None
+    tool.compiled_register_map = None
+    tool._register_block = {}
+    tool.last_status_update = None
+    tool.last_status_time = 0.0
+    tool.message_counts = {}
+    tool.is_polling = True
+    tool.poll_attempt_counter = 0
+    tool._polling_slave_banner_shown = False
+    tool.last_seen_reference = None
+    tool._oneshot_mode = True
+    tool.last_poll_outcome = None
+    tool.stage_timers = StageTimers()
+    return tool
+
+
+def _bench_transcript_runs(paths, runs=2000, registers=20):
+    """modpoll stdout chunks from capture files, or a synthetic transcript with occasional errors."""
+    chunks = []
+    for path in paths or []:
+        chunks.extend(payload.decode("utf-8", errors="replace")
+                      for _ts, kind, payload in read_capture(path) if kind == CAPTURE_OUTPUT)
+    if chunks:
+        return chunks
+    header = "modpoll - FieldTalk(tm) Modbus(R) Polling Utility\nProtocol opened successfully.\nPolling slave (Ctrl-C to stop) ...\n"
+    for run in range(runs):
+        if run % 97 == 13:
+            chunks.append(header + "Reply time-out!\n")
+        elif run % 211 == 7:
+            chunks.append(header + "Checksum error!\n")
+        else:
+            chunks.append(header + "".join(f"[{100 + i}]: {(run * 7 + i * 13) % 65536}\n" for i in range(registers)))
+    return chunks
+
+
+def _best_of(func, repeats):
+    best = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _bench_units_rows(count):
+    parities = ("none", "even", "odd")
+    return [
+        make_unit_record(str(1000 + i), f"Unit {i} AHU-{i % 37}", "modbus", f"1_{i % 247 + 1}", f"REG{i % 11}",
+                         f"COM{i % 8 + 1}", ("9600", "19200", "38400")[i % 3], parities[i % 3], f"10.0.{i // 250}.{i % 250}")
+        for i in range(count)
+    ]
+
+
+def _bench_units_memory(count):
+    """Bytes per unit held after a units fetch: the parsed rows plus the Units table's per-item values."""
+    import tracemalloc
+
+    lines = [
+        f"{1000 + i}\tUnit {i} AHU-{i % 37}\tmodbus\t1_{i % 247 + 1}\tREG{i % 11}\tCOM{i % 8 + 1}\t"
+        f"10.0.{i // 250}.{i % 250}\t1\t\t{('9600', '19200', '38400')[i % 3]}\t{i % 3}\n"
+        for i in range(count)
+    ]
+    tool = _bench_parser_tool()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        rows = [tool.parse_unit_row(line) for line in lines]
+        item_values = {row[0]: ModpollingTool._units_row_values(row, UNIT_FIELDS) for row in rows}
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del rows, item_values
+    return held / count
+
+
+_BENCH_FAKE_MODPOLL = '''\
+import os, sys, time
+args = sys.argv[1:]
+count = int(next((a[2:] for a in args if a.startswith("-c")), "10"))
+ref = int(next((a[2:] for a in args if a.startswith("-r")), "100"))
+samples = 1 if "-1" in args else int(os.environ.get("FAKE_MODPOLL_SAMPLES", "0")) or None
+interval = float(os.environ.get("FAKE_MODPOLL_INTERVAL", "0"))
+print("modpoll - FieldTalk(tm) Modbus(R) Polling Utility")
+print("Protocol opened successfully.")
+print("Polling slave (Ctrl-C to stop) ...")
+n = 0
+while samples is None or n < samples:
+    for i in range(count):
+        print(f"[{ref + i}]: {(n * 7 + i) & 0xFFFF}")
+    n += 1
+    if interval and (samples is None or n < samples):
+        time.sleep(interval)
+'''
+
+
+def _bench_fake_modpoll(directory):
+    """Write a modpoll stand-in (prints -c registers per sample; -1 = one sample) and return its path."""
+    path = os.path.join(directory, "fake_modpoll.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(_BENCH_FAKE_MODPOLL)
+    return path
+
+
+def _bench_first_line_s(proc, stream):
+    """Seconds until the first register line can be read from a just-started process."""
+    t0 = time.perf_counter()
+    first = None
+    for line in iter(stream.readline, ""):
+        if first is None and _DATA_LINE_RE.match(line):
+            first = time.perf_counter() - t0
+    proc.wait()
+    stream.close()
+    return first if first is not None else float("nan")
+
+
+def run_benchmarks(quick=False, transcripts=None):
+    """Run the benchmark cases; returns {"meta", "results", "skipped"} (results: value, unit, better)."""
+    import platform
+
+    results, skipped = {}, {}
+    repeats = 3 if quick else 5
+
+    def record(name, value, unit, better):
+        results[name] = {"value": round(value, 4), "unit": unit, "better": better}
+        print(f"  {name:<40} {value:>12.3f} {unit}", flush=True)
+
+    # ---- Parser / decoder (no display needed) ----
+    chunks = _bench_transcript_runs(transcripts, runs=500 if quick else 2000)
+    total_lines = sum(c.count("\n") for c in chunks)
+    tool = _bench_parser_tool()
+
+    def parse_all():
+        for chunk in chunks:
+            tool.read_stream(io.StringIO(chunk))
+        while not tool.terminal_write_queue.empty():
+            tool.terminal_write_queue.get_nowait()
+
+    record("read_stream", total_lines / _best_of(parse_all, repeats), "lines/s", "higher")
+    tool.deadband_filter = DeadbandFilter(percent=1.0)
+    record("read_stream_change_only", total_lines / _best_of(parse_all, repeats), "lines/s", "higher")
+    tool.deadband_filter = None
+
+    register_map = [{"ref": 100 + 2 * i, "name": f"F{i}", "type": "float32", "scale": 0.1, "unit": "V"} for i in range(62)]
+    compiled = CompiledRegisterMap(register_map, 100, 125)
+    block = {100 + i: (i * 2654435761) & 0xFFFF for i in range(125)}
+    decodes = 2000 if quick else 10000
+    record("register_decode_125", _best_of(lambda: [compiled.decode(block) for _ in range(decodes)], repeats) / decodes * 1e6,
+           "us/block", "lower")
+
+    names = [f"{('ABB', 'SCHNEIDER', 'CARLO GAVAZZI', 'SIEMENS', 'DANFOSS')[i % 5]} MODEL-{i} {('METER', 'VFD', 'SENSOR')[i % 3]}"
+             for i in range(10000)]
+    index = PresetSearchIndex(names)
+    keystrokes = [("schneider model-12"[:n]) for n in range(1, 19)]
+    record("preset_search_keystroke", _best_of(lambda: [index.search(k) for k in keystrokes], repeats) / len(keystrokes) * 1000,
+           "ms/key", "lower")
+
+    record("units_memory@50000", _bench_units_memory(50000), "B/unit", "lower")
+
+    # ---- Simulator round trip and end-to-end modpoll polling ----
+    import shutil
+    import socket
+
+    simulator = ModbusSimulator([SimulatedSlave(1)])
+    server = simulator.serve_tcp(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        host, port = server.server_address[:2]
+        requests = 500 if quick else 2000
+        request = struct.pack(">HHHBBHH", 1, 0, 6, 1, 3, 0, 10)
+
+        def roundtrips():
+            with socket.create_connection((host, port)) as sock:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                for _ in range(requests):
+                    sock.sendall(request)
+                    header = _recv_exact(sock, 7)
+                    _recv_exact(sock, struct.unpack(">H", header[4:6])[0] - 1)
+
+        record("simulator_tcp_roundtrip", requests / _best_of(roundtrips, repeats), "req/s", "higher")
+
+        modpoll = shutil.which("modpoll")
+        if modpoll:
+            polls = 20 if quick else 100
+            cmd = [modpoll, "-m", "tcp", f"{host}:{port}", "-a1", "-r1", "-c10", "-1"]
+
+            def poll_loop():
+                for _ in range(polls):
+                    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **hidden_window_popen_kwargs())
+
+            record("e2e_modpoll_poll_rate", polls / _best_of(poll_loop, 1 if quick else 3), "polls/s", "higher")
+        else:
+            skipped["e2e_modpoll_poll_rate"] = "modpoll not found on PATH"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # ---- One-shot runs vs. one continuous modpoll on a pseudo-terminal (fake modpoll script) ----
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as fake_dir:
+        base_cmd = [sys.executable, _bench_fake_modpoll(fake_dir), "-m", "tcp", "127.0.0.1", "-a1", "-r100", "-c10"]
+        samples = 20 if quick else 100
+        fake_env = {k: v for k, v in os.environ.items() if k != "PYTHONUNBUFFERED"}  # buffer like a C program
+
+        def drain():
+            while not tool.terminal_write_queue.empty():
+                tool.terminal_write_queue.get_nowait()
+
+        def oneshot_runs():
+            for _ in range(samples):
+                out = subprocess.run(base_cmd + ["-1"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                     env=fake_env, **hidden_window_popen_kwargs()).stdout
+                tool.read_stream(io.StringIO(out))
+            drain()
+
+        record("modpoll_oneshot_sample", _best_of(oneshot_runs, 1 if quick else 3) / samples * 1000, "ms/sample", "lower")
+
+        # Critical path of a one-shot attempt (Popen -> output read), as in run_modpoll.
+        # The gap between attempts (parse + scheduler wait) is outside the timing.
+        def critical_path():
+            total = 0.0
+            for _ in range(samples):
+                t0 = time.perf_counter()
+                proc = subprocess.Popen(base_cmd + ["-1"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                        env=fake_env, **hidden_window_popen_kwargs())
+                read_process_output(proc, 10.0)
+                total += time.perf_counter() - t0
+                time.sleep(0.02)
+            return total / samples * 1000
+
+        record("oneshot_critical_path", min(critical_path() for _ in range(1 if quick else 3)), "ms/attempt", "lower")
+
+        if pty_streaming_available():
+            def continuous_run():
+                proc, stream = spawn_pty_process(base_cmd, dict(fake_env, FAKE_MODPOLL_SAMPLES=str(samples)))
+                try:
+                    tool.read_stream(stream)
+                    proc.wait()
+                finally:
+                    stream.close()
+                drain()
+
+            record("modpoll_pty_sample", _best_of(continuous_run, 1 if quick else 3) / samples * 1000, "ms/sample", "lower")
+
+            # Continuous output over a pipe is block-buffered: the first value shows up only when
+            # the buffer fills or the process exits. On a pty it arrives with the first sample.
+            paced = dict(fake_env, FAKE_MODPOLL_SAMPLES="25", FAKE_MODPOLL_INTERVAL="0.02")
+            piped = subprocess.Popen(base_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=paced,
+                                     **hidden_window_popen_kwargs())
+            record("modpoll_pipe_first_line", _bench_first_line_s(piped, piped.stdout) * 1000, "ms", "lower")
+            record("modpoll_pty_first_line", _bench_first_line_s(*spawn_pty_process(base_cmd, paced)) * 1000, "ms", "lower")
+        else:
+            for name in ("modpoll_pty_sample", "modpoll_pipe_first_line", "modpoll_pty_first_line"):
+                skipped[name] = "no pseudo-terminal (on Windows: pip install pywinpty)"
+
+    # ---- Tk rendering paths (need CustomTkinter and a display; run under xvfb-run on Linux) ----
+    gui_tool = root = None
+    try:
+        if os.name != "nt" and sys.platform != "darwin" and not os.environ.get("DISPLAY"):
+            raise RuntimeError("no DISPLAY (run under xvfb-run)")
+        load_gui_toolkit()
+        root = ctk.CTk()
+        root.withdraw()
+        gui_tool = ModpollingTool(root)
+        root.update()
+    except Exception as e:
+        tk_reason = f"Tk unavailable: {e}"
+        for name in ("flush_terminal_writes", "refresh_units_table", "auto_size_columns", "filter_equipment_keystroke"):
+            skipped[name] = tk_reason
+    if gui_tool is not None:
+        try:
+            lb = gui_tool.txt_log
+            tags = (None, 'response_ok', 'normal', 'error')
+            for backlog in ((1000, 10000) if quick else (1000, 10000, 50000)):
+                def flush_backlog():
+                    lb.delete(0, "end")
+                    for i in range(backlog):
+                        gui_tool.terminal_write_queue.put((f"[{100 + i % 125}]: {i} - Device is responding", tags[i % 4]))
+                    t0 = time.perf_counter()
+                    while not gui_tool.terminal_write_queue.empty():
+                        gui_tool._flush_terminal_writes()
+                    return time.perf_counter() - t0
+
+                best = min(flush_backlog() for _ in range(repeats))
+                record(f"flush_terminal_writes@{backlog}", best / backlog * 1000 * 1000, "ms/1k lines", "lower")
+
+            gui_tool._ensure_units_tab_built()
+            for count in ((1000, 10000) if quick else (1000, 10000, 50000)):
+                rows = _bench_units_rows(count)
+                record(f"refresh_units_table@{count}", _best_of(lambda: gui_tool.set_units_rows(rows), 1 if count > 10000 else repeats) * 1000,
+                       "ms", "lower")
+                record(f"auto_size_columns@{count}", _best_of(gui_tool.auto_size_columns, 1 if count > 10000 else repeats) * 1000,
+                       "ms", "lower")
+
+            gui_tool.all_equipment = sorted(names)
+            gui_tool.equipment_index = PresetSearchIndex(gui_tool.all_equipment)
+
+            def type_term():
+                for k in keystrokes:
+                    gui_tool.search_var.set(k)  # trace -> filter_equipment()
+                gui_tool.search_var.set("")
+
+            record("filter_equipment_keystroke", _best_of(type_term, repeats) / (len(keystrokes) + 1) * 1000, "ms/key", "lower")
+        finally:
+            try:
+                root.destroy()
+            except Exception:
+                pass
+
+    meta = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": bool(quick),
+        "transcript_lines": total_lines,
+    }
+    for name, reason in skipped.items():
+        print(f"  {name:<40} skipped ({reason})", flush=True)
+    return {"meta": meta, "results": results, "skipped": skipped}
+
+
+def compare_benchmarks(current, baseline, threshold=0.10):
+    """Print current vs baseline per case; returns the names that regressed by more than `threshold`."""
+    regressions = []
+    base_results = baseline.get("results", {})
+    for name, cur in current.get("results", {}).items():
+        base = base_results.get(name)
+        if not base or not base.get("value"):
+            continue
+        ratio = cur["value"] / base["value"]
+        change = (1.0 - ratio) if cur.get("better") == "higher" else (ratio - 1.0)  # > 0 means worse
+        flag = "REGRESSION" if change > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"  {name:<40} {base['value']:>12.3f} -> {cur['value']:>12.3f} {cur['unit']:<12} "
+              f"{-change:+.1%} {flag}", flush=True)
+    return regressions
+
+
+def bench_main(output, baseline=None, threshold=0.10, quick=False, transcripts=None):
+    """--bench entry point: run, write JSON, optionally compare; exit code 1 on regressions."""
+    print("Running benchmarks...", flush=True)
+    report = run_benchmarks(quick=quick, transcripts=transcripts)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", flush=True)
+    if baseline:
+        with open(baseline, "r", encoding="utf-8") as f:
+            base_report = json.load(f)
+        print(f"Compared with {baseline} (threshold {threshold:.0%}):", flush=True)
+        regressions = compare_benchmarks(report, base_report, threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr, flush=True)
+            return 1
+    return 0
+
+
+def install_startup_trace(root, tool, exit_after_first_frame=False):
+    """
+    Report startup milestones once the main window is first mapped.
+
+    Pair with `python -X importtime` for a per-module import breakdown:
+        python -X importtime "modpoll v3.py" --startup-trace --exit-after-first-frame 2> importtime.log
+    """
+    state = {"done": False, "over_budget": False}
+
+    def _on_map(event=None):
+        if state["done"] or (event is not None and event.widget is not root):
+            return
+        state["done"] = True
+        marks = dict(tool.startup_marks)
+        marks["first_frame"] = time.perf_counter() - _STARTUP_T0
+        state["over_budget"] = marks["first_frame"] > STARTUP_BUDGET_S
+        verdict = "EXCEEDED" if state["over_budget"] else "OK"
+        summary = ", ".join(f"{name}={secs * 1000:.0f}ms" for name, secs in marks.items())
+        print(f"startup: {summary} (budget {STARTUP_BUDGET_S * 1000:.0f}ms: {verdict})", file=sys.stderr, flush=True)
+        if exit_after_first_frame:
+            # Report what deferring the Units tab and the Advanced extras keeps off the time-to-interactive path
+            for label, build in (("units tab", tool._ensure_units_tab_built),
+                                 ("advanced capture/diagnostics", tool._ensure_advanced_extras_built)):
+                try:
+                    t0 = time.perf_counter()
+                    build()
+                    root.update_idletasks()
+                    print(f"startup: {label} (deferred to first open) = {(time.perf_counter() - t0) * 1000:.0f}ms",
+                          file=sys.stderr, flush=True)
+                except Exception:
+                    pass
+            root.after(0, root.destroy)
+
+    root.bind("<Map>", _on_map, add="+")
+    return state
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ModPolling Tool - GUI front-end for modpoll")
+    parser.add_argument("--startup-trace", action="store_true",
+                        help="print import/widget/first-frame timings to stderr")
+    parser.add_argument("--exit-after-first-frame", action="store_true",
+                        help="quit as soon as the main window is mapped (exit code 1 if over the startup budget)")
+    parser.add_argument("--replay", metavar="CAPTURE",
+                        help="replay a session capture (.mpcap) through the parser once the window is up")
+    parser.add_argument("--speed", default="1x", choices=["1x", "10x", "max"],
+                        help="replay speed (default 1x)")
+    bench = parser.add_argument_group("benchmarks (no GUI window)")
+    bench.add_argument("--bench", nargs="?", const="bench-results.json", metavar="OUT",
+                       help="run the benchmark suite and write JSON results (default bench-results.json)")
+    bench.add_argument("--bench-compare", metavar="BASELINE", help="compare with a previous results file")
+    bench.add_argument("--bench-threshold", type=float, default=0.10,
+                       help="allowed slowdown before a case counts as a regression (default 0.10 = 10%%)")
+    bench.add_argument("--bench-quick", action="store_true", help="fewer iterations and sizes")
+    bench.add_argument("--bench-transcript", action="append", metavar="CAPTURE",
+                       help="parse recorded .mpcap captures instead of the synthetic transcript (repeatable)")
+    sim = parser.add_argument_group("simulator (no GUI)")
+    sim.add_argument("--simulate", metavar="MODE",
+                     help="serve simulated Modbus slaves: tcp[:port] (default 5020) or rtu[:baud] on a pty")
+    sim.add_argument("--sim-slaves", default="1", metavar="LIST", help="slave addresses, e.g. 1-10,20 (default 1)")
+    sim.add_argument("--sim-latency-ms", type=float, default=0.0, help="reply delay per request")
+    sim.add_argument("--sim-timeout-rate", type=float, default=0.0, help="fraction of requests left unanswered")
+    sim.add_argument("--sim-crc-rate", type=float, default=0.0, help="fraction of RTU replies with a bad CRC")
+    sim.add_argument("--sim-exception-rate", type=float, default=0.0, help="fraction of requests answered with an exception")
+    sim.add_argument("--sim-exception-code", type=int, default=MODBUS_ILLEGAL_DATA_ADDRESS, choices=[1, 2, 3],
+                     help="exception code to inject (1 function, 2 address, 3 value)")
+    sim.add_argument("--sim-seed", type=int, default=None, help="random seed for repeatable fault injection")
+    gw = parser.add_argument_group("TCP-to-RTU gateway (no GUI)")
+    gw.add_argument("--gateway", metavar="DEVICE",
+                    help="own this serial port and serve it to Modbus TCP clients (e.g. COM3 or /dev/ttyUSB0)")
+    gw.add_argument("--gw-baud", type=int, default=9600, help="bus baudrate (default 9600)")
+    gw.add_argument("--gw-parity", default="none", choices=["none", "even", "odd"], help="bus parity (default none)")
+    gw.add_argument("--gw-stopbits", type=int, default=1, choices=[1, 2], help="bus stop bits (default 1)")
+    gw.add_argument("--gw-listen", default="127.0.0.1:5020", metavar="HOST:PORT",
+                    help="Modbus TCP listen address (default 127.0.0.1:5020)")
+    gw.add_argument("--gw-timeout-ms", type=float, default=1000.0, help="slave reply timeout on the bus (default 1000)")
+    gw.add_argument("--gw-queue-timeout-ms", type=float, default=5000.0,
+                    help="longest a request may wait for the bus before it fails (default 5000)")
+    gw.add_argument("--gw-cache-ms", type=float, default=0.0,
+                    help="serve repeated or overlapping reads from replies up to this old (default 0 = off)")
+    gw.add_argument("--gateway-load", metavar="HOST:PORT", help="run the load generator against a gateway")
+    gw.add_argument("--load-clients", type=int, default=4, help="load generator connections (default 4)")
+    gw.add_argument("--load-seconds", type=float, default=10.0, help="load duration (default 10)")
+    gw.add_argument("--load-unit", type=int, default=1, help="slave address to read (default 1)")
+    gw.add_argument("--load-count", type=int, default=10, help="holding registers per request (default 10)")
+    gw.add_argument("--load-greedy", type=int, default=0, metavar="N",
+                    help="first client keeps N requests outstanding (fairness check)")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        return bench_main(args.bench, args.bench_compare, args.bench_threshold, args.bench_quick, args.bench_transcript)
+
+    if args.simulate:
+        try:
+            return run_simulator(
+                args.simulate, args.sim_slaves, args.sim_latency_ms, args.sim_timeout_rate,
+                args.sim_crc_rate, args.sim_exception_rate, args.sim_exception_code, args.sim_seed,
+            )
+        except (OSError, ValueError) as e:
+            print(f"Simulator error: {e}", file=sys.stderr)
+            return 2
+
+    if args.gateway:
+        try:
+            return run_gateway(args.gateway, args.gw_baud, args.gw_parity, args.gw_stopbits, args.gw_listen,
+                               args.gw_timeout_ms, args.gw_queue_timeout_ms, args.gw_cache_ms)
+        except (OSError, ValueError) as e:
+            print(f"Gateway error: {e}", file=sys.stderr)
+            return 2
+
+    if args.gateway_load:
+        try:
+            return run_gateway_load(args.gateway_load, args.load_clients, args.load_seconds, args.load_unit,
+                                    args.load_count, args.load_greedy)
+        except (OSError, ValueError) as e:
+            print(f"Load generator error: {e}", file=sys.stderr)
+            return 2
+
+    load_gui_toolkit()
     root = ctk.CTk()
     tool = ModpollingTool(root)
     root.protocol("WM_DELETE_WINDOW", tool.on_closing)
+    trace = None
+    if args.startup_trace or args.exit_after_first_frame:
+        trace = install_startup_trace(root, tool, exit_after_first_frame=args.exit_after_first_frame)
+    if args.replay:
+        root.after(500, lambda: tool.start_replay(args.replay, args.speed))
     root.mainloop()
+    if trace is not None and args.exit_after_first_frame and trace["over_budget"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())